@@ -0,0 +1,131 @@
+from datetime import datetime
+from operator import attrgetter
+from typing import Optional, Dict, List, Tuple, Any, Iterable, Sequence
+
+from utils import format_seconds, to_epoch
+
+# これより少ない件数では、NumPy配列への変換の方が集計より高くつくため標準ライブラリで集計する
+NUMPY_MIN_ROWS = 256
+
+_np: Any = False # 未読み込みはFalse、NumPyがない環境ではNone
+
+def get_numpy():
+    """
+    NumPyモジュールを返す。NumPyがない環境では標準ライブラリだけで集計するためNoneを返す。
+    NumPyの読み込みには時間がかかるため、件数の多い集計で初めて必要になったときに読み込む。
+    """
+    global _np
+    if _np is False:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = None
+    return _np
+
+def to_columns(rows: Iterable[Any], *names: str) -> Tuple[List[Any], ...]:
+    """
+    行(models.pyの値クラスなど)のリストを、指定した属性ごとの列に変換する。
+
+    例: starts, ends, task_ids = to_columns(logs, 'start_time', 'end_time', 'task_id')
+    """
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return ([getter(row) for row in rows],)
+    columns = tuple(zip(*map(getter, rows)))
+    if not columns:
+        return tuple([] for _ in names)
+    return tuple(list(column) for column in columns)
+
+def sum_durations_by(starts: Sequence[int], ends: Sequence[int], *keys: Sequence[Any]) -> Dict[Any, int]:
+    """
+    開始・終了時刻の列を、キーの列ごとにグループ化して作業時間の合計秒数を返す。
+
+    Args:
+        starts (Sequence[int]): 開始時刻(エポック秒)の列。
+        ends (Sequence[int]): 終了時刻(エポック秒)の列。
+        *keys (Sequence[Any]): グループ化に使うキーの列 (task_id, work_date など)。
+            2つ以上指定した場合は、キーの組ごとに集計する。
+
+    Returns:
+        Dict[Any, int]: キー(2つ以上の場合はタプル) -> 合計秒数。
+    """
+    if not keys:
+        raise ValueError("グループ化に使うキーの列を指定してください。")
+    if len(starts) >= NUMPY_MIN_ROWS and get_numpy() is not None:
+        return _sum_durations_by_numpy(starts, ends, keys)
+
+    totals: Dict[Any, int] = {}
+    group_keys = keys[0] if len(keys) == 1 else zip(*keys)
+    for key, start, end in zip(group_keys, starts, ends):
+        totals[key] = totals.get(key, 0) + end - start
+    return totals
+
+def _sum_durations_by_numpy(starts: Sequence[int], ends: Sequence[int], keys: Sequence[Sequence[Any]]) -> Dict[Any, int]:
+    """sum_durations_by のNumPy版。キーを一意な番号に置き換え、bincountで一度に集計する。"""
+    np = get_numpy()
+    durations = np.asarray(ends, dtype=np.int64) - np.asarray(starts, dtype=np.int64)
+    if len(keys) == 1:
+        unique_keys, inverse = np.unique(np.asarray(keys[0]), return_inverse=True)
+        group_keys = unique_keys.tolist()
+    else:
+        # 複数のキーは、キーごとの番号を組み合わせて1つの番号にする
+        inverse = np.zeros(len(durations), dtype=np.int64)
+        key_values = []
+        for column in keys:
+            unique_values, codes = np.unique(np.asarray(column), return_inverse=True)
+            inverse = inverse * len(unique_values) + codes.reshape(-1)
+            key_values.append((unique_values.tolist(), len(unique_values)))
+        used, inverse = np.unique(inverse, return_inverse=True)
+        group_keys = []
+        for code in used.tolist():
+            parts = []
+            for values, size in reversed(key_values):
+                code, index = divmod(code, size)
+                parts.append(values[index])
+            group_keys.append(tuple(reversed(parts)))
+    # 合計秒数は2**53未満なので、float64の重みでも誤差なく集計できる
+    sums = np.bincount(inverse.reshape(-1), weights=durations, minlength=len(group_keys))
+    return dict(zip(group_keys, (int(round(total)) for total in sums.tolist())))
+
+def net_work_seconds(business_start: Optional[int], business_end: Optional[int], break_time_minutes: int) -> Optional[int]:
+    """
+    業務の開始・終了時刻(エポック秒)から休憩時間を差し引いた実働時間の秒数を返す。
+    どちらかの時刻が未記録の場合はNone。
+    """
+    if not business_start or not business_end:
+        return None
+    return business_end - business_start - break_time_minutes * 60
+
+def other_seconds(net_seconds: Optional[int], total_task_seconds: int) -> Optional[int]:
+    """「その他」時間 = 実働時間 - タスク合計時間。実働時間が不明な場合はNone。"""
+    if net_seconds is None:
+        return None
+    return net_seconds - total_task_seconds
+
+def build_day_summary(task_totals: Iterable[Tuple[str, int]], business_start_time: datetime, business_end_time: datetime, break_time_minutes: int) -> Dict[str, Any]:
+    """
+    工数ごとの合計秒数から業務日のサマリーを組み立てる。
+
+    Args:
+        task_totals (Iterable[Tuple[str, int]]): (工数名, 合計秒数) の組。
+        business_start_time (datetime): 業務全体の開始時刻。
+        business_end_time (datetime): 業務全体の終了時刻。
+        break_time_minutes (int): 休憩時間（分）。
+
+    Returns:
+        Dict[str, Any]: total_work_time, net_work_time, total_task_time, other_time, task_details を持つサマリーデータ。
+    """
+    task_totals = sorted(task_totals)
+    total_task_seconds = sum(seconds for _, seconds in task_totals)
+
+    business_start, business_end = to_epoch(business_start_time), to_epoch(business_end_time)
+    net_seconds = net_work_seconds(business_start, business_end, break_time_minutes)
+
+    return {
+        'total_work_time': format_seconds(business_end - business_start),
+        'net_work_time': format_seconds(net_seconds),
+        'total_task_time': format_seconds(total_task_seconds),
+        'other_time': format_seconds(other_seconds(net_seconds, total_task_seconds)),
+        'task_details': [{'name': name, 'duration_str': format_seconds(seconds)} for name, seconds in task_totals]
+    }
@@ -1,6 +1,8 @@
 from datetime import datetime, date
 from typing import Optional, Dict, Any
 
+from day_ledger import DayLedger
+
 class AppState:
     """
     アプリケーション全体の状態を管理するシングルトンクラス。
@@ -30,6 +32,8 @@ class AppState:
         self.current_task_name: Optional[str] = None
         self.current_task_start_time: Optional[datetime] = None
         self.current_log_id: Optional[int] = None
+        # その日の工数ごとの合計とログ。DBへの書き込みが成功するたびにその場で更新する
+        self.day_ledger: DayLedger = DayLedger()
 
     def start_business(self):
         """業務開始時刻を記録する"""
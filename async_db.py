@@ -0,0 +1,137 @@
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, Callable, List
+
+from db_manager import DatabaseManager
+
+class AsyncDatabase:
+    """
+    DatabaseManager を非同期に呼び出すためのファサード。
+
+    クエリはDatabaseManagerのワーカー(読み込みはプール、書き込みはライタースレッド)で実行し、
+    結果はTkのメインスレッドで after() を使ってコールバックに渡す。
+    Tkはメインスレッド以外から操作できないため、ワーカー側からはTkに一切触れず、
+    メインスレッドで完了したFutureをポーリングして受け取る。
+    """
+    POLL_INTERVAL_MS = 20
+
+    def __init__(self, root, db: DatabaseManager, on_busy_change: Optional[Callable[[bool], None]] = None):
+        """
+        Args:
+            root: after() を呼び出すTkウィジェット (通常はメインウィンドウ)。
+            db (DatabaseManager): 呼び出し先のデータベースマネージャー。
+            on_busy_change (Optional[Callable[[bool], None]]): 実行中のリクエストの有無が
+                変わったときに呼ばれるコールバック。読み込み中表示の切り替えに使う。
+        """
+        self.root = root
+        self.db = db
+        self.on_busy_change = on_busy_change
+
+        self._pending: List[Dict[str, Any]] = []
+        self._generations: Dict[str, int] = {} # key -> 最新リクエストの世代
+        self._poll_job: Optional[str] = None
+        self._closed = False
+
+    def read(self, func: Callable[..., Any], *args, on_success: Optional[Callable[[Any], None]] = None,
+             on_error: Optional[Callable[[BaseException], None]] = None, key: Optional[str] = None) -> Future:
+        """
+        funcを読み込み用ワーカーで実行する。
+
+        Args:
+            func (Callable): ワーカーで実行する関数。Tkのウィジェットに触れてはいけない。
+            *args: funcに渡す引数。
+            on_success (Optional[Callable]): 結果を受け取るコールバック (メインスレッドで実行)。
+            on_error (Optional[Callable]): 例外を受け取るコールバック (メインスレッドで実行)。
+            key (Optional[str]): 同じkeyで新しいリクエストが発行されると、古いリクエストは
+                キャンセルされ、結果も破棄される。
+
+        Returns:
+            Future: 実行中のリクエスト。
+        """
+        return self._track(self.db.submit_read(func, *args), on_success, on_error, key)
+
+    def write(self, func: Callable[..., Any], *args, on_success: Optional[Callable[[Any], None]] = None,
+              on_error: Optional[Callable[[BaseException], None]] = None, key: Optional[str] = None) -> Future:
+        """
+        funcをライタースレッドで実行する。引数の意味は read() と同じ。
+        funcの中で行われた書き込みは1つのトランザクションにまとめられる。
+        """
+        return self._track(self.db.submit_write(func, *args), on_success, on_error, key)
+
+    def is_pending(self, key: str) -> bool:
+        """指定したkeyのリクエストが実行中かどうかを返す。"""
+        return any(request['key'] == key for request in self._pending)
+
+    def cancel(self, key: str):
+        """指定したkeyのリクエストをキャンセルし、結果を破棄する。"""
+        self._generations[key] = self._generations.get(key, 0) + 1
+        for request in self._pending:
+            if request['key'] == key:
+                request['future'].cancel()
+
+    def close(self):
+        """
+        ポーリングを停止し、未完了のリクエストの結果をすべて破棄する。
+        キュー済みの書き込みはキャンセルしない (DatabaseManager.close() が完了を待つ)。
+        """
+        self._closed = True
+        if self._poll_job:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self._pending.clear()
+
+    def _track(self, future: Future, on_success, on_error, key: Optional[str]) -> Future:
+        """Futureを監視対象に追加し、必要ならポーリングを開始する。"""
+        generation = None
+        if key is not None:
+            # 同じkeyの古いリクエストは不要になるのでキャンセルする
+            self.cancel(key)
+            generation = self._generations[key]
+
+        was_busy = bool(self._pending)
+        self._pending.append({
+            'future': future,
+            'on_success': on_success,
+            'on_error': on_error,
+            'key': key,
+            'generation': generation,
+        })
+        if not was_busy and self.on_busy_change:
+            self.on_busy_change(True)
+        if self._poll_job is None and not self._closed:
+            self._poll_job = self.root.after(self.POLL_INTERVAL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        """完了したリクエストのコールバックをメインスレッドで実行する。"""
+        self._poll_job = None
+        if self._closed:
+            return
+
+        done, pending = [], []
+        for request in self._pending:
+            (done if request['future'].done() else pending).append(request)
+        self._pending = pending
+
+        for request in done:
+            future = request['future']
+            key = request['key']
+            # キャンセル済み、または同じkeyの新しいリクエストがあれば結果を捨てる
+            if future.cancelled() or (key is not None and request['generation'] != self._generations.get(key)):
+                continue
+            error = future.exception()
+            if error is not None:
+                if request['on_error']:
+                    request['on_error'](error)
+                else:
+                    print(f"非同期データベース処理エラー: {error}")
+            elif request['on_success']:
+                request['on_success'](future.result())
+            if self._closed: # コールバック内でウィンドウが閉じられた場合
+                return
+
+        if self._pending:
+            # コールバック内で新しいリクエストが発行され、既に再開済みの場合もある
+            if self._poll_job is None:
+                self._poll_job = self.root.after(self.POLL_INTERVAL_MS, self._poll)
+        elif self.on_busy_change:
+            self.on_busy_change(False)
@@ -9,7 +9,9 @@ class ConfigManager:
     def __init__(self, config_file_path: Path):
         self.config_file = config_file_path
         self.defaults = {
-            'break_time_minutes': 60
+            'break_time_minutes': 60,
+            # この日数以内に使った工数を、メイン画面に常に表示する
+            'active_task_days': 30
         }
         self.config = self._load_config()
 
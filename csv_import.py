@@ -0,0 +1,186 @@
+import csv
+from functools import lru_cache
+from pathlib import Path
+from datetime import datetime, date, time
+from typing import Optional, List, Tuple, Iterable, Iterator, Dict
+
+from db_manager import DatabaseManager
+
+# CSVの必須カラム
+REQUIRED_COLUMNS = ('date', 'task_name', 'start', 'end')
+# 省略可能なカラム (業務開始・終了時刻)
+OPTIONAL_COLUMNS = ('business_start', 'business_end')
+
+class ImportReport:
+    """
+    CSV取り込みの結果。
+    エラーは行番号とメッセージの組で、先頭から max_errors 件まで保持する(件数はすべて数える)。
+    """
+    def __init__(self, max_errors: int = 1000):
+        self.max_errors = max_errors
+        self.total_rows = 0 # 読み込んだデータ行の数
+        self.imported = 0 # 追加した時間ログの数
+        self.skipped = 0 # 既に同じログがあったため追加しなかった数
+        self.error_count = 0
+        self.errors: List[Tuple[int, str]] = []
+
+    def add_error(self, line_number: int, message: str):
+        """エラーを記録する。"""
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_number, message))
+
+    def summary(self) -> str:
+        """結果を1行の文字列で返す。"""
+        return f"{self.total_rows}行中 {self.imported}件を取り込みました (重複 {self.skipped}件、エラー {self.error_count}件)。"
+
+    def write_errors(self, path: Path):
+        """保持しているエラーを line, error の2列のCSVに書き出す。"""
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['line', 'error'])
+            writer.writerows(self.errors)
+
+# 同じ日付・時刻の文字列は何度も現れるため、読み取り結果をキャッシュする
+@lru_cache(maxsize=4096)
+def parse_date(text: str) -> date:
+    """'YYYY-MM-DD' または 'YYYY/MM/DD' 形式の日付を読み取る。"""
+    return date.fromisoformat(text.strip().replace('/', '-'))
+
+@lru_cache(maxsize=4096)
+def _parse_clock(text: str) -> time:
+    """'HH:MM' または 'HH:MM:SS' 形式の時刻を読み取る。"""
+    parts = text.split(':')
+    if len(parts) not in (2, 3):
+        raise ValueError(f"時刻の形式が正しくありません: '{text}'")
+    return time(*(int(part) for part in parts))
+
+def parse_time(text: str, work_date: date) -> datetime:
+    """
+    'HH:MM'、'HH:MM:SS'、または日付つきのISO 8601形式の時刻を読み取る。
+    時刻だけの場合は work_date の時刻とみなす。UTCからのオフセットつきの時刻は、
+    ほかの時刻と比較・保存できるようローカル時刻 (タイムゾーンなし) に変換する。
+    """
+    text = text.strip()
+    if 'T' in text or ' ' in text:
+        parsed = datetime.fromisoformat(text)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed
+    return datetime.combine(work_date, _parse_clock(text))
+
+def _parse_row(row: List[str], columns: Dict[str, int]) -> Tuple[date, str, datetime, datetime, Optional[datetime], Optional[datetime]]:
+    """
+    CSVの1行を検証し、DatabaseManager.import_time_log_entries に渡す形に変換する。
+    不正な行はValueErrorを送出する。
+
+    Args:
+        row (List[str]): CSVの1行。
+        columns (Dict[str, int]): カラム名 -> 列番号。
+    """
+    values = {column: (row[index].strip() if index < len(row) else '') for column, index in columns.items()}
+    for column in REQUIRED_COLUMNS:
+        if not values[column]:
+            raise ValueError(f"'{column}' が空です")
+
+    work_date = parse_date(values['date'])
+    start = parse_time(values['start'], work_date)
+    end = parse_time(values['end'], work_date)
+    if end <= start:
+        raise ValueError(f"終了時刻 '{values['end']}' が開始時刻 '{values['start']}' 以前です")
+
+    business_start = parse_time(values['business_start'], work_date) if values.get('business_start') else None
+    business_end = parse_time(values['business_end'], work_date) if values.get('business_end') else None
+    return work_date, values['task_name'], start, end, business_start, business_end
+
+def _batches(entries: Iterable, batch_size: int) -> Iterator[List]:
+    """entriesをbatch_size件ずつのリストに分ける。"""
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def import_time_logs_csv(db: DatabaseManager, csv_path: Path, batch_size: int = 10000,
+                         skip_duplicates: bool = True, encoding: str = 'utf-8-sig') -> ImportReport:
+    """
+    CSVファイルから完了した時間ログを取り込む。
+
+    ファイルは1行ずつ読み込み、batch_size 行ごとに1つのトランザクションでまとめて書き込むため、
+    行数が多くてもメモリ使用量は一定に保たれる。書き込みはライタースレッドで行い、その間に次の
+    batch_size 行を読み込む。不正な行は取り込まずにレポートに記録する。
+    アーカイブ済みの年の行も、アーカイブのログと重複しないよう取り込まずにエラーとして記録する
+    (取り込む場合は先に DatabaseManager.restore_year で戻すこと)。
+
+    CSVの1行目はヘッダーで、次のカラムを持つこと (順序は問わない):
+        date (YYYY-MM-DD), task_name, start (HH:MM[:SS]), end (HH:MM[:SS]),
+        business_start, business_end (省略可)
+
+    Args:
+        db (DatabaseManager): 取り込み先のデータベース。
+        csv_path (Path): 取り込むCSVファイル。
+        batch_size (int): 1トランザクションで書き込む行数。
+        skip_duplicates (bool): Trueなら、既に同じログがあれば追加しない。
+        encoding (str): CSVファイルの文字コード。
+
+    Returns:
+        ImportReport: 取り込みの結果。
+    """
+    report = ImportReport()
+    pending = None # 書き込み中のバッチ (Future, 件数, 最終行番号)
+
+    def finish():
+        """書き込み中のバッチの完了を待って結果をレポートに反映する。"""
+        nonlocal pending
+        # 結果の取得で例外が送出されても finally で再び待たないよう、先に取り除く
+        (future, count, line_number), pending = pending, None
+        inserted = future.result()
+        if inserted is None:
+            report.add_error(line_number, f"{line_number}行目までの{count}行の書き込みに失敗しました")
+            return
+        report.imported += inserted
+        report.skipped += count - inserted
+
+    try:
+        with open(csv_path, 'r', encoding=encoding, newline='') as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader, [])]
+            missing = [column for column in REQUIRED_COLUMNS if column not in header]
+            if missing:
+                report.add_error(1, f"必須のカラムがありません: {', '.join(missing)}")
+                return report
+            columns = {column: header.index(column) for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if column in header}
+            archived_years = {status.year for status in db.get_archive_status() if status.state == 'archived'}
+
+            def valid_entries():
+                for row in reader:
+                    if not row:
+                        continue # 空行は無視する
+                    report.total_rows += 1
+                    try:
+                        entry = _parse_row(row, columns)
+                    except ValueError as e:
+                        report.add_error(reader.line_num, str(e))
+                        continue
+                    if entry[0].year in archived_years:
+                        report.add_error(reader.line_num, f"{entry[0].year}年はアーカイブ済みです。restore_year で戻してから取り込んでください")
+                        continue
+                    yield entry
+
+            for batch in _batches(valid_entries(), batch_size):
+                # 前のバッチの書き込み完了を待ってから次を登録する (書き込み中に次のバッチを読み込む)
+                if pending:
+                    finish()
+                pending = (db.submit_write(db.import_time_log_entries, batch, skip_duplicates), len(batch), reader.line_num)
+            if pending:
+                finish()
+    except (IOError, UnicodeDecodeError, csv.Error) as e:
+        print(f"CSVの取り込みに失敗しました: {e}")
+        report.add_error(0, str(e))
+    finally:
+        if pending:
+            finish() # 読み込みに失敗しても、登録済みのバッチの結果は反映する
+    return report
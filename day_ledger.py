@@ -0,0 +1,131 @@
+from bisect import insort
+from typing import Optional, Dict, List, Tuple, Iterable
+
+from utils import from_epoch
+from aggregation import to_columns, sum_durations_by
+
+class DayLedger:
+    """
+    その日の工数ごとの作業時間とログを保持する台帳。
+
+    起動時に一度だけDBから読み込み、以降はタスクの開始・終了やログの編集が
+    DBにコミットされるたびにその場で更新する。メイン画面と業務終了時のサマリーは
+    この台帳から表示するため、ログが増えてもDBへの問い合わせや再集計は発生しない。
+    時刻はDBと同じくエポック秒で保持する。
+    """
+    def __init__(self):
+        self.work_day_id: Optional[int] = None
+        self.loaded = False
+        # 内容が変わるたびに増える。DBとの比較中に更新されたかどうかの判定に使う
+        self.version = 0
+        # task_id -> 完了したログ (start, end, log_id) のリスト。開始時刻順に並べる
+        self._intervals: Dict[int, List[Tuple[int, int, int]]] = {}
+        # task_id -> 完了したログの合計秒数
+        self._totals: Dict[int, int] = {}
+        # task_id -> 表示用のログ文字列 ("HH:MM~HH:MM, ...")。変更のあったタスクだけ作り直す
+        self._log_texts: Dict[int, str] = {}
+        # log_id -> (task_id, start, end)。endがNoneのものは計測中
+        self._logs: Dict[int, Tuple[int, int, Optional[int]]] = {}
+
+    def load(self, work_day_id: int, logs: Iterable):
+        """
+        DBから読み込んだその日のログで台帳を作り直す。
+
+        Args:
+            work_day_id (int): work_daysテーブルのID。
+            logs (Iterable): id, task_id, start_time, end_time を持つ行。
+        """
+        self.work_day_id = work_day_id
+        self._intervals.clear()
+        self._totals.clear()
+        self._log_texts.clear()
+        self._logs.clear()
+        completed = []
+        for log in logs:
+            self._logs[log.id] = (log.task_id, log.start_time, log.end_time)
+            if log.end_time is not None:
+                completed.append(log)
+
+        # 合計はまとめて集計し、ログは工数ごとに開始時刻順に並べる
+        log_ids, task_ids, starts, ends = to_columns(completed, 'id', 'task_id', 'start_time', 'end_time')
+        self._totals = sum_durations_by(starts, ends, task_ids)
+        for task_id, start_time, end_time, log_id in sorted(zip(task_ids, starts, ends, log_ids)):
+            self._intervals.setdefault(task_id, []).append((start_time, end_time, log_id))
+        self.loaded = True
+        self.version += 1
+
+    # --- 更新 (DBへのコミット後に呼び出す) ---
+
+    def start_log(self, log_id: int, task_id: int, start_time: int):
+        """計測を開始したログを記録する。完了するまで合計には含めない。"""
+        self._logs[log_id] = (task_id, start_time, None)
+
+    def update_log(self, log_id: int, task_id: int, start_time: int, end_time: Optional[int]):
+        """ログが完了したときや工数・時刻が編集されたときに、変更前の値を差し引いて変更後の値を反映する。"""
+        self._remove(log_id)
+        self._logs[log_id] = (task_id, start_time, end_time)
+        if end_time is not None:
+            self._add(task_id, start_time, end_time, log_id)
+        self.version += 1
+
+    def _remove(self, log_id: int):
+        log = self._logs.pop(log_id, None)
+        if log is None:
+            return
+        task_id, start_time, end_time = log
+        if end_time is None:
+            return
+        self._intervals[task_id].remove((start_time, end_time, log_id))
+        self._totals[task_id] -= end_time - start_time
+        self._log_texts.pop(task_id, None)
+        if not self._intervals[task_id]:
+            del self._intervals[task_id]
+            del self._totals[task_id]
+
+    def _add(self, task_id: int, start_time: int, end_time: int, log_id: int):
+        # 通常は開始時刻順に追加されるため、末尾への追加で済む
+        insort(self._intervals.setdefault(task_id, []), (start_time, end_time, log_id))
+        self._totals[task_id] = self._totals.get(task_id, 0) + end_time - start_time
+        self._log_texts.pop(task_id, None)
+
+    # --- 参照 ---
+
+    def total_seconds(self, task_id: int) -> int:
+        """工数の完了したログの合計秒数を返す。"""
+        return self._totals.get(task_id, 0)
+
+    def log_count(self, task_id: int) -> int:
+        """工数の完了したログの件数を返す。"""
+        return len(self._intervals.get(task_id, ()))
+
+    def log_text(self, task_id: int) -> str:
+        """工数の完了したログを "HH:MM~HH:MM, ..." の形式で返す。"""
+        text = self._log_texts.get(task_id)
+        if text is None:
+            text = ", ".join(
+                f"{from_epoch(start).strftime('%H:%M')}~{from_epoch(end).strftime('%H:%M')}"
+                for start, end, _ in self._intervals.get(task_id, ())
+            )
+            self._log_texts[task_id] = text
+        return text
+
+    def task_totals(self) -> Dict[int, int]:
+        """task_id -> 合計秒数 の辞書を返す。ログのない工数は含まない。"""
+        return dict(self._totals)
+
+    def find_drift(self, daily_task_totals: Iterable) -> List[int]:
+        """
+        DBの集計(daily_task_totals)と台帳を比較し、食い違っている工数のIDを返す。
+
+        Args:
+            daily_task_totals (Iterable): task_id, total_seconds, log_count を持つその日の行。
+
+        Returns:
+            List[int]: 合計秒数または件数が一致しない工数のIDのリスト。一致していれば空。
+        """
+        db_totals = {row.task_id: (row.total_seconds, row.log_count) for row in daily_task_totals}
+        task_ids = set(db_totals) | set(self._totals)
+        return sorted(
+            task_id for task_id in task_ids
+            if db_totals.get(task_id, (0, 0)) != (self.total_seconds(task_id), self.log_count(task_id))
+        )
@@ -1,14 +1,350 @@
 import sqlite3
+import queue
+import threading
+import functools
+import heapq
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import date, datetime, timedelta
-from typing import Optional, List, Tuple, Dict, Any
+from datetime import date, datetime
+from typing import Optional, List, Tuple, Dict, Any, Callable, Iterator, Iterable, Sequence
 
-from utils import format_timedelta
+from utils import to_epoch
+from aggregation import build_day_summary
+from models import _Model, Task, WorkDay, TimeLog, CompletedLog, TaskTotal, TaskLogSummary, DayTotal, TaskPeriodTotal, ArchiveStatus
+from read_cache import ReadCache
+
+_cached_read_state = threading.local()
+
+def cached_read(error_message: Optional[str], default: Optional[Callable[[], Any]] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    DatabaseManager の読み込みメソッドの結果をキャッシュするデコレーター。
+    キーはメソッド名・引数・DBの data_version の組で、DBが更新されると自動的に別のキーになる。
+    呼び出し元での変更がキャッシュに影響しないよう、モデルやリスト、辞書は複製を返す。
+
+    メソッド本体は sqlite3.Error をそのまま送出する。失敗時の値はキャッシュせず、
+    ここでエラーメッセージを表示してから default() (defaultがNoneならNone) を返す。
+    キャッシュされる別のメソッドの中から呼ばれた場合は、外側の結果に失敗時の値が
+    混ざってキャッシュされないよう、エラーをそのまま送出する。
+
+    Args:
+        error_message (Optional[str]): 読み込みエラー時に表示するメッセージ。
+        default (Optional[Callable[[], Any]]): 読み込みエラー時の戻り値を作る関数。
+    """
+    def decorator(method: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(method)
+        def wrapper(self: "DatabaseManager", *args, **kwargs):
+            key = (method.__name__, args, tuple(sorted(kwargs.items())), self._read_data_version())
+            depth = getattr(_cached_read_state, "depth", 0)
+            _cached_read_state.depth = depth + 1
+            try:
+                result = self._read_cache.get_or_call(key, lambda: method(self, *args, **kwargs))
+            except sqlite3.Error as e:
+                if depth:
+                    raise
+                print(f"{error_message}: {e}")
+                return default() if default is not None else None
+            finally:
+                _cached_read_state.depth = depth
+            return _copy_cached(result)
+        return wrapper
+    return decorator
+
+def _copy_cached(value: Any) -> Any:
+    """キャッシュした値を、呼び出し元が変更してもキャッシュに影響しないよう複製する。"""
+    if isinstance(value, list):
+        return [_copy_cached(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_cached(item) for key, item in value.items()}
+    if isinstance(value, _Model):
+        return value.copy()
+    return value
 
 class DatabaseManager:
     """
     工数管理アプリのデータベース操作を管理するクラス。
+
+    書き込みはすべて専用のライタースレッドが1本の接続で直列に実行し、
+    読み込みは読み取り専用接続のプールから接続を借りて実行する。
+    そのため、各メソッドはどのスレッドから呼び出してもよい。
     """
+    # 読み取り専用接続の数 (= submit_read のワーカー数)
+    READ_POOL_SIZE = 2
+    # ロック待ちのタイムアウト (ミリ秒)
+    BUSY_TIMEOUT_MS = 5000
+    # ページキャッシュのサイズ (負の値はKiB単位)
+    CACHE_SIZE_KIB = 8192
+    # 読み込み結果のキャッシュに保持する最大件数 (0でキャッシュしない)
+    READ_CACHE_SIZE = 128
+    # 年ごとのアーカイブファイルの名前。データベースと同じフォルダに置く
+    ARCHIVE_FILE_FORMAT = "{stem}_archive_{year}.db"
+
+    # スキーマの変更はここに追記していく。
+    # N番目(1始まり)の要素が PRAGMA user_version = N へのマイグレーションとなる。
+    MIGRATIONS: List[str] = [
+        # v1: time_logs の検索用インデックス
+        """
+        CREATE INDEX IF NOT EXISTS idx_time_logs_day_task_end
+            ON time_logs (work_day_id, task_id, end_time, start_time);
+        CREATE INDEX IF NOT EXISTS idx_time_logs_task_day
+            ON time_logs (task_id, work_day_id);
+        """,
+        # v2: 日時をISO 8601文字列からエポック秒(INTEGER)に変更する。
+        # 型を変えるためテーブルを作り直し、既存データはローカル時刻として変換する。
+        """
+        CREATE TABLE work_days_new (
+            id INTEGER PRIMARY KEY,
+            work_date TEXT NOT NULL UNIQUE,
+            start_time INTEGER,
+            end_time INTEGER
+        );
+        INSERT INTO work_days_new (id, work_date, start_time, end_time)
+            SELECT id, work_date,
+                   CAST(strftime('%s', start_time, 'utc') AS INTEGER),
+                   CAST(strftime('%s', end_time, 'utc') AS INTEGER)
+            FROM work_days;
+        DROP TABLE work_days;
+        ALTER TABLE work_days_new RENAME TO work_days;
+
+        CREATE TABLE time_logs_new (
+            id INTEGER PRIMARY KEY,
+            work_day_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER,
+            FOREIGN KEY (work_day_id) REFERENCES work_days (id) ON DELETE CASCADE,
+            FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+        );
+        INSERT INTO time_logs_new (id, work_day_id, task_id, start_time, end_time)
+            SELECT id, work_day_id, task_id,
+                   CAST(strftime('%s', start_time, 'utc') AS INTEGER),
+                   CAST(strftime('%s', end_time, 'utc') AS INTEGER)
+            FROM time_logs;
+        DROP TABLE time_logs;
+        ALTER TABLE time_logs_new RENAME TO time_logs;
+        CREATE INDEX idx_time_logs_day_task_end
+            ON time_logs (work_day_id, task_id, end_time, start_time);
+        CREATE INDEX idx_time_logs_task_day
+            ON time_logs (task_id, work_day_id);
+        """,
+        # v3: 業務日×工数ごとの集計テーブル。time_logs のトリガーで常に最新に保つ。
+        """
+        CREATE TABLE daily_task_totals (
+            work_day_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            total_seconds INTEGER NOT NULL DEFAULT 0,
+            log_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (work_day_id, task_id),
+            FOREIGN KEY (work_day_id) REFERENCES work_days (id) ON DELETE CASCADE,
+            FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER trg_time_logs_totals_insert AFTER INSERT ON time_logs
+        WHEN NEW.end_time IS NOT NULL
+        BEGIN
+            INSERT INTO daily_task_totals (work_day_id, task_id, total_seconds, log_count)
+            VALUES (NEW.work_day_id, NEW.task_id, NEW.end_time - NEW.start_time, 1)
+            ON CONFLICT (work_day_id, task_id) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                log_count = log_count + 1;
+        END;
+
+        CREATE TRIGGER trg_time_logs_totals_delete AFTER DELETE ON time_logs
+        WHEN OLD.end_time IS NOT NULL
+        BEGIN
+            UPDATE daily_task_totals
+            SET total_seconds = total_seconds - (OLD.end_time - OLD.start_time),
+                log_count = log_count - 1
+            WHERE work_day_id = OLD.work_day_id AND task_id = OLD.task_id;
+            DELETE FROM daily_task_totals
+            WHERE work_day_id = OLD.work_day_id AND task_id = OLD.task_id AND log_count <= 0;
+        END;
+
+        CREATE TRIGGER trg_time_logs_totals_update AFTER UPDATE OF work_day_id, task_id, start_time, end_time ON time_logs
+        BEGIN
+            -- 変更前の値を差し引き、変更後の値を加算する
+            UPDATE daily_task_totals
+            SET total_seconds = total_seconds - (OLD.end_time - OLD.start_time),
+                log_count = log_count - 1
+            WHERE OLD.end_time IS NOT NULL AND work_day_id = OLD.work_day_id AND task_id = OLD.task_id;
+            DELETE FROM daily_task_totals
+            WHERE work_day_id = OLD.work_day_id AND task_id = OLD.task_id AND log_count <= 0;
+            INSERT INTO daily_task_totals (work_day_id, task_id, total_seconds, log_count)
+            SELECT NEW.work_day_id, NEW.task_id, NEW.end_time - NEW.start_time, 1
+            WHERE NEW.end_time IS NOT NULL
+            ON CONFLICT (work_day_id, task_id) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                log_count = log_count + 1;
+        END;
+
+        INSERT INTO daily_task_totals (work_day_id, task_id, total_seconds, log_count)
+            SELECT work_day_id, task_id, SUM(end_time - start_time), COUNT(*)
+            FROM time_logs
+            WHERE end_time IS NOT NULL
+            GROUP BY work_day_id, task_id;
+        """,
+        # v4: 工数のアーカイブ・ピン留めと最終使用時刻。最終使用時刻は time_logs のトリガーで更新する。
+        # 既存の工数は最後のログの開始時刻で埋め、ログのない工数は移行時点で使われたものとみなす。
+        """
+        ALTER TABLE tasks ADD COLUMN archived INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE tasks ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE tasks ADD COLUMN last_used_at INTEGER;
+        UPDATE tasks SET last_used_at = COALESCE(
+            (SELECT MAX(start_time) FROM time_logs WHERE time_logs.task_id = tasks.id),
+            CAST(strftime('%s', 'now') AS INTEGER)
+        );
+
+        CREATE TRIGGER trg_time_logs_last_used AFTER INSERT ON time_logs
+        BEGIN
+            UPDATE tasks SET last_used_at = NEW.start_time
+            WHERE id = NEW.task_id AND (last_used_at IS NULL OR last_used_at < NEW.start_time);
+        END;
+        """,
+        # v5: 計測中のログだけを対象にした部分インデックス。完了したログの範囲(スナップショットの境界)を求めるのに使う。
+        """
+        CREATE INDEX idx_time_logs_open ON time_logs (id) WHERE end_time IS NULL;
+        """,
+        # v6: 完了したログの (開始, 終了) の R*Tree インデックス。時間帯の重なりの検索に使い、time_logs のトリガーで常に最新に保つ。
+        # R*Tree は開始 <= 終了 でなければ登録できないため、逆転したログも MIN/MAX で登録する。
+        """
+        CREATE VIRTUAL TABLE time_log_intervals USING rtree(id, start_time, end_time);
+        INSERT INTO time_log_intervals (id, start_time, end_time)
+            SELECT id, MIN(start_time, end_time), MAX(start_time, end_time)
+            FROM time_logs
+            WHERE end_time IS NOT NULL;
+
+        CREATE TRIGGER trg_time_logs_intervals_insert AFTER INSERT ON time_logs
+        WHEN NEW.end_time IS NOT NULL
+        BEGIN
+            INSERT INTO time_log_intervals (id, start_time, end_time)
+            VALUES (NEW.id, MIN(NEW.start_time, NEW.end_time), MAX(NEW.start_time, NEW.end_time));
+        END;
+
+        CREATE TRIGGER trg_time_logs_intervals_update AFTER UPDATE OF start_time, end_time ON time_logs
+        BEGIN
+            DELETE FROM time_log_intervals WHERE id = OLD.id;
+            INSERT INTO time_log_intervals (id, start_time, end_time)
+            SELECT NEW.id, MIN(NEW.start_time, NEW.end_time), MAX(NEW.start_time, NEW.end_time)
+            WHERE NEW.end_time IS NOT NULL;
+        END;
+
+        CREATE TRIGGER trg_time_logs_intervals_delete AFTER DELETE ON time_logs
+        BEGIN
+            DELETE FROM time_log_intervals WHERE id = OLD.id;
+        END;
+        """,
+        # v7: 過去の年を別ファイルに移したアーカイブの状態。
+        """
+        CREATE TABLE archive_status (
+            year INTEGER PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            state TEXT NOT NULL,
+            work_day_count INTEGER NOT NULL DEFAULT 0,
+            time_log_count INTEGER NOT NULL DEFAULT 0,
+            updated_at INTEGER NOT NULL
+        );
+        """,
+        # v8: 業務日と時間ログのIDを AUTOINCREMENT にする。アーカイブで最新のIDの行がホットのDBから消えても、
+        # 同じIDが新しい行に振り直されないようにするため (アーカイブファイルとホットのDBでIDが重ならない)。
+        # 型を変えずにテーブルを作り直し、削除されたインデックスとトリガーを作り直す。
+        """
+        CREATE TABLE work_days_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            work_date TEXT NOT NULL UNIQUE,
+            start_time INTEGER,
+            end_time INTEGER
+        );
+        INSERT INTO work_days_new (id, work_date, start_time, end_time)
+            SELECT id, work_date, start_time, end_time FROM work_days;
+        DROP TABLE work_days;
+        ALTER TABLE work_days_new RENAME TO work_days;
+
+        CREATE TABLE time_logs_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            work_day_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER,
+            FOREIGN KEY (work_day_id) REFERENCES work_days (id) ON DELETE CASCADE,
+            FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+        );
+        INSERT INTO time_logs_new (id, work_day_id, task_id, start_time, end_time)
+            SELECT id, work_day_id, task_id, start_time, end_time FROM time_logs;
+        DROP TABLE time_logs;
+        ALTER TABLE time_logs_new RENAME TO time_logs;
+
+        CREATE INDEX idx_time_logs_day_task_end
+            ON time_logs (work_day_id, task_id, end_time, start_time);
+        CREATE INDEX idx_time_logs_task_day
+            ON time_logs (task_id, work_day_id);
+        CREATE INDEX idx_time_logs_open ON time_logs (id) WHERE end_time IS NULL;
+
+        CREATE TRIGGER trg_time_logs_totals_insert AFTER INSERT ON time_logs
+        WHEN NEW.end_time IS NOT NULL
+        BEGIN
+            INSERT INTO daily_task_totals (work_day_id, task_id, total_seconds, log_count)
+            VALUES (NEW.work_day_id, NEW.task_id, NEW.end_time - NEW.start_time, 1)
+            ON CONFLICT (work_day_id, task_id) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                log_count = log_count + 1;
+        END;
+
+        CREATE TRIGGER trg_time_logs_totals_delete AFTER DELETE ON time_logs
+        WHEN OLD.end_time IS NOT NULL
+        BEGIN
+            UPDATE daily_task_totals
+            SET total_seconds = total_seconds - (OLD.end_time - OLD.start_time),
+                log_count = log_count - 1
+            WHERE work_day_id = OLD.work_day_id AND task_id = OLD.task_id;
+            DELETE FROM daily_task_totals
+            WHERE work_day_id = OLD.work_day_id AND task_id = OLD.task_id AND log_count <= 0;
+        END;
+
+        CREATE TRIGGER trg_time_logs_totals_update AFTER UPDATE OF work_day_id, task_id, start_time, end_time ON time_logs
+        BEGIN
+            -- 変更前の値を差し引き、変更後の値を加算する
+            UPDATE daily_task_totals
+            SET total_seconds = total_seconds - (OLD.end_time - OLD.start_time),
+                log_count = log_count - 1
+            WHERE OLD.end_time IS NOT NULL AND work_day_id = OLD.work_day_id AND task_id = OLD.task_id;
+            DELETE FROM daily_task_totals
+            WHERE work_day_id = OLD.work_day_id AND task_id = OLD.task_id AND log_count <= 0;
+            INSERT INTO daily_task_totals (work_day_id, task_id, total_seconds, log_count)
+            SELECT NEW.work_day_id, NEW.task_id, NEW.end_time - NEW.start_time, 1
+            WHERE NEW.end_time IS NOT NULL
+            ON CONFLICT (work_day_id, task_id) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                log_count = log_count + 1;
+        END;
+
+        CREATE TRIGGER trg_time_logs_last_used AFTER INSERT ON time_logs
+        BEGIN
+            UPDATE tasks SET last_used_at = NEW.start_time
+            WHERE id = NEW.task_id AND (last_used_at IS NULL OR last_used_at < NEW.start_time);
+        END;
+
+        CREATE TRIGGER trg_time_logs_intervals_insert AFTER INSERT ON time_logs
+        WHEN NEW.end_time IS NOT NULL
+        BEGIN
+            INSERT INTO time_log_intervals (id, start_time, end_time)
+            VALUES (NEW.id, MIN(NEW.start_time, NEW.end_time), MAX(NEW.start_time, NEW.end_time));
+        END;
+
+        CREATE TRIGGER trg_time_logs_intervals_update AFTER UPDATE OF start_time, end_time ON time_logs
+        BEGIN
+            DELETE FROM time_log_intervals WHERE id = OLD.id;
+            INSERT INTO time_log_intervals (id, start_time, end_time)
+            SELECT NEW.id, MIN(NEW.start_time, NEW.end_time), MAX(NEW.start_time, NEW.end_time)
+            WHERE NEW.end_time IS NOT NULL;
+        END;
+
+        CREATE TRIGGER trg_time_logs_intervals_delete AFTER DELETE ON time_logs
+        BEGIN
+            DELETE FROM time_log_intervals WHERE id = OLD.id;
+        END;
+        """,
+    ]
+
     def __init__(self, db_path: Path):
         """
         データベースマネージャーを初期化し、データベースへの接続とテーブル作成を行う。
@@ -16,32 +352,297 @@ class DatabaseManager:
         Args:
             db_path (Path): データベースファイルの絶対パス。
         """
-        self.conn = None
-        self.cursor = None
+        self.conn = None # 書き込み用の接続。初期化後はライタースレッドのみが使用する
         self.db_path = db_path
 
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._read_connections: List[sqlite3.Connection] = []
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        # data_version の確認専用の接続。どの接続(別プロセスを含む)からのコミットでも値が変わる
+        self._monitor_conn: Optional[sqlite3.Connection] = None
+        self._monitor_lock = threading.Lock()
+        self._read_cache = ReadCache(self.READ_CACHE_SIZE)
+        self._write_queue: "queue.Queue[Optional[Tuple[Callable[[sqlite3.Connection], Any], Future]]]" = queue.Queue()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._write_depth = 0 # ライタースレッド内でのトランザクションの入れ子の深さ
+        self._commit_callbacks: List[Callable[[], None]] = [] # 実行中のトランザクションのコミット後に呼ぶ処理
+
+        # 工数マスタのキャッシュ (id -> 工数名、id順)。初回の get_all_tasks で読み込み、
+        # 以降はこのプロセスからの追加・更新・削除のコミット時にその場で更新する
+        self._task_catalogue: Optional[Dict[int, str]] = None
+        # 読み込んだ時点の確認専用の接続の data_version。このプロセスのコミットの分は _run_in_transaction で進める
+        self._task_catalogue_version: Optional[int] = None
+        self._task_catalogue_lock = threading.Lock()
+
         self._connect()
         self._create_tables() # 接続後にテーブルの存在を確認・作成する
+        self._migrate() # 既存のデータベースを最新のスキーマに更新する
+        self._open_read_pool() # スキーマが確定してから読み取り用の接続を開く
+        self._start_writer()
 
     def _connect(self):
-        """データベースに接続し、カーソルを作成する。"""
+        """データベースに書き込み用の接続を作成し、WALモードに切り替える。"""
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row # カラム名でアクセスできるようにする
-            self.cursor = self.conn.cursor()
-            # 外部キー制約を毎回有効にする
-            self.cursor.execute("PRAGMA foreign_keys = ON;")
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            self._configure_connection(self.conn)
+            # WALモードでは読み込みと書き込みが互いをブロックしない (設定はファイルに永続化される)
+            self.conn.execute("PRAGMA journal_mode = WAL;")
+            # WALモードではNORMALでもデータベースの破損は起きない (電源断時に直近のコミットが失われうるのみ)
+            self.conn.execute("PRAGMA synchronous = NORMAL;")
         except sqlite3.Error as e:
             print(f"データベース接続エラー: {e}")
             raise  # 接続に失敗した場合は、ここでプログラムを停止させる
 
+    @classmethod
+    def _configure_connection(cls, conn: sqlite3.Connection):
+        """すべての接続に共通の設定を行う。"""
+        conn.row_factory = sqlite3.Row # カラム名でアクセスできるようにする
+        # 外部キー制約を毎回有効にする
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.execute(f"PRAGMA busy_timeout = {cls.BUSY_TIMEOUT_MS};")
+        conn.execute(f"PRAGMA cache_size = -{cls.CACHE_SIZE_KIB};")
+
+    @classmethod
+    def connect_read_only(cls, db_path: Path) -> sqlite3.Connection:
+        """
+        読み取り専用の接続を作成する。読み取り用の接続プールのほか、
+        DatabaseManager を持たない別プロセスのワーカーが自分の接続を開くのにも使う。
+        """
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=cls.BUSY_TIMEOUT_MS / 1000)
+        cls._configure_connection(conn)
+        return conn
+
+    def _open_read_pool(self):
+        """読み取り専用の接続プールと、読み込み用のワーカーを用意する。"""
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        try:
+            for _ in range(self.READ_POOL_SIZE):
+                conn = self.connect_read_only(self.db_path)
+                self._read_connections.append(conn)
+                self._read_pool.put(conn)
+            self._monitor_conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=self.BUSY_TIMEOUT_MS / 1000)
+        except sqlite3.Error as e:
+            print(f"データベース接続エラー: {e}")
+            raise
+        self._read_executor = ThreadPoolExecutor(max_workers=self.READ_POOL_SIZE, thread_name_prefix="db-reader")
+
+    def _start_writer(self):
+        """書き込みを直列に実行するライタースレッドを開始する。"""
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+        self._writer_thread.start()
+
+    def _writer_loop(self):
+        """書き込みキューからジョブを取り出し、1件ずつトランザクション内で実行する。"""
+        while True:
+            job = self._write_queue.get()
+            if job is None: # close() からの終了合図
+                break
+            func, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = self._run_in_transaction(func)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def _run_in_transaction(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        書き込み用の接続でfuncを実行する。ライタースレッドからのみ呼び出すこと。
+        既にトランザクション内であれば、その一部としてセーブポイントの中で実行する。
+        funcが例外を送出した場合はその分の書き込みだけを取り消すため、呼び出し元の公開メソッドが
+        例外を捕まえてNoneなどを返しても、途中までの書き込みが外側のトランザクションでコミットされることはない。
+        """
+        if self._write_depth:
+            return self._run_in_savepoint(func)
+        self._write_depth += 1
+        total_changes = self.conn.total_changes
+        version_before = None
+        try:
+            with self.conn:
+                result = func(self.conn)
+                if self.conn.in_transaction and self.conn.total_changes != total_changes:
+                    # 書き込みロックを持っている間は他の接続はコミットできないため、
+                    # ここからコミット後までの data_version の変化はこのプロセスのコミットによるもの
+                    version_before = self._read_data_version()
+        except BaseException:
+            self._commit_callbacks.clear() # ロールバックされたので反映しない
+            raise
+        finally:
+            self._write_depth -= 1
+        if version_before is not None:
+            self._advance_task_catalogue_version(version_before, self._read_data_version())
+        callbacks, self._commit_callbacks = self._commit_callbacks, []
+        for callback in callbacks:
+            callback()
+        return result
+
+    def _run_in_savepoint(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """[ライタースレッド] 実行中のトランザクションの中で、funcをセーブポイントで囲んで実行する。"""
+        if not self.conn.in_transaction:
+            # トランザクションが始まる前にセーブポイントを解放するとそこでコミットされるため、先に開始しておく
+            self.conn.execute("BEGIN")
+        callback_count = len(self._commit_callbacks)
+        self.conn.execute("SAVEPOINT nested_write")
+        try:
+            result = func(self.conn)
+        except BaseException:
+            self.conn.execute("ROLLBACK TO nested_write")
+            self.conn.execute("RELEASE nested_write")
+            del self._commit_callbacks[callback_count:] # 取り消した書き込みのコールバックは呼ばない
+            raise
+        self.conn.execute("RELEASE nested_write")
+        return result
+
+    def _on_commit(self, callback: Callable[[], None]):
+        """
+        書き込み処理(ライタースレッド)の中から呼び出し、トランザクションがコミットされた後に
+        callbackを実行するよう登録する。ロールバックされた場合は実行しない。
+        """
+        self._commit_callbacks.append(callback)
+
+    def _read_data_version(self) -> int:
+        """
+        確認専用の接続の PRAGMA data_version を返す。
+        このプロセスのライタースレッドを含む、どの接続からのコミットでも値が変わる。
+        """
+        with self._monitor_lock:
+            return self._monitor_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def read_cache_stats(self) -> Dict[str, int]:
+        """
+        読み込み結果のキャッシュの状況を返す。
+
+        Returns:
+            Dict[str, int]: hits(ヒット数), misses(ミス数), size(現在のエントリ数)。
+        """
+        return self._read_cache.stats()
+
+    def _write(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        書き込み処理をライタースレッドで実行し、完了を待って結果を返す。
+        funcは書き込み用の接続を受け取る。例外はそのまま呼び出し元に送出される。
+        """
+        if threading.current_thread() is self._writer_thread:
+            return self._run_in_transaction(func)
+        future: Future = Future()
+        self._write_queue.put((func, future))
+        return future.result()
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """プールから読み取り専用の接続を借りる。"""
+        conn = self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
+    def _iter_query(self, model: type, sql: str, params: Any = (), batch_size: int = 1000) -> Iterator[Any]:
+        """
+        クエリ結果をmodelのインスタンスとして1件ずつ返すジェネレーター。
+        fetchmanyでbatch_size件ずつ読み込むため、件数が多くてもメモリ使用量は一定に保たれる。
+        イテレーション中は読み取り用の接続を1つ占有する。sqlite3.Error は呼び出し側に送出する。
+        """
+        with self._reader() as conn:
+            yield from self._fetch_in_batches(self._query(conn, model, sql, params), batch_size)
+
+    def _iter_archived_query(self, model: type, build_sql: Callable[[List[str]], Tuple[str, Any]],
+                             date_from: Optional[date], date_to: Optional[date], batch_size: int = 1000) -> Iterator[Any]:
+        """
+        アーカイブ済みの年も含めて問い合わせる _iter_query。
+        date_from ~ date_to にかかるアーカイブを読み取り用の接続にATTACHし、build_sql にスキーマ名のリスト
+        ('main' から始まる) を渡して組み立てた (SQL, パラメータ) を実行する。ATTACHはイテレーションの終了時に外す。
+        """
+        with self._reader() as conn, self.attach_archives(conn, self.db_path, date_from, date_to) as schemas:
+            sql, params = build_sql(schemas)
+            cursor = self._query(conn, model, sql, params)
+            try:
+                yield from self._fetch_in_batches(cursor, batch_size)
+            finally:
+                cursor.close() # 実行中の文があるとDETACHできない
+
+    @staticmethod
+    def _fetch_in_batches(cursor: sqlite3.Cursor, batch_size: int) -> Iterator[Any]:
+        """カーソルの結果をfetchmanyでbatch_size件ずつ読み込み、1件ずつ返す。"""
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    @classmethod
+    @contextmanager
+    def attach_archives(cls, conn: sqlite3.Connection, db_path: Path,
+                        date_from: Optional[date], date_to: Optional[date]) -> Iterator[List[str]]:
+        """
+        date_from ~ date_to にかかるアーカイブ済みの年のファイルを、読み取り専用で conn にATTACHする。
+        'main' に続けてATTACHしたスキーマ名 ('archive_2023' など) のリストを渡し、終了時にDETACHする。
+        アーカイブがない期間では何もATTACHしないため、通常の問い合わせに余分なコストはかからない。
+        conn は connect_read_only() で開いた db_path の接続であること。
+        """
+        years = conn.execute(
+            "SELECT year, file_name FROM archive_status WHERE state = 'archived' AND year BETWEEN ? AND ? ORDER BY year",
+            (date_from.year if date_from else 0, date_to.year if date_to else 9999)
+        ).fetchall()
+        schemas = ['main']
+        try:
+            for year, file_name in years:
+                schema = f"archive_{year}"
+                path = Path(db_path).parent / file_name
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"{path.resolve().as_uri()}?mode=ro",))
+                schemas.append(schema)
+            yield schemas
+        finally:
+            for schema in schemas[1:]:
+                conn.execute(f"DETACH DATABASE {schema}")
+
+    @staticmethod
+    def _union_all(select: str, schemas: List[str], params: List[Any]) -> Tuple[str, List[Any]]:
+        """{schema} を含む select を各スキーマについて UNION ALL でつなぎ、パラメータも同じ数だけ繰り返す。"""
+        return " UNION ALL ".join(select.format(schema=schema) for schema in schemas), params * len(schemas)
+
+    @staticmethod
+    def _query(conn: sqlite3.Connection, model: type, sql: str, params: Any = ()) -> sqlite3.Cursor:
+        """
+        結果の各行をmodelのインスタンスとして返すカーソルでクエリを実行する。
+        SELECTのカラム順はmodelの __slots__ の順に合わせること。
+        """
+        cursor = conn.cursor()
+        cursor.row_factory = model.row_factory
+        return cursor.execute(sql, params)
+
+    def submit_write(self, func: Callable[..., Any], *args) -> Future:
+        """
+        funcをライタースレッドで実行するようキューに登録し、Futureを返す。
+        funcの中で行われた書き込みはすべて1つのトランザクションにまとめられる。
+
+        例: db.submit_write(db.end_time_log, log_id, end_time)
+        """
+        future: Future = Future()
+        self._write_queue.put((lambda conn: func(*args), future))
+        return future
+
+    def submit_read(self, func: Callable[..., Any], *args) -> Future:
+        """
+        funcを読み込み用のワーカースレッドで実行し、Futureを返す。
+
+        例: db.submit_read(db.get_all_completed_logs)
+        """
+        return self._read_executor.submit(func, *args)
+
     def _create_tables(self):
-        """設計に基づいたテーブルがなければ作成する。"""
+        """
+        設計に基づいたテーブルがなければ作成する。
+        ここで作成するのは初期(v0)のスキーマで、以降の変更は MIGRATIONS で適用する。
+        """
         if not self.conn:
             return # 接続がない場合は何もしない
         with self.conn:
             # CREATE TABLE IF NOT EXISTS を使うことで、テーブルが存在しない場合のみ作成される
-            self.cursor.execute("""
+            self.conn.execute("""
                 CREATE TABLE IF NOT EXISTS work_days (
                     id INTEGER PRIMARY KEY,
                     work_date TEXT NOT NULL UNIQUE,
@@ -49,13 +650,13 @@ class DatabaseManager:
                     end_time TEXT
                 );
             """)
-            self.cursor.execute("""
+            self.conn.execute("""
                 CREATE TABLE IF NOT EXISTS tasks (
                     id INTEGER PRIMARY KEY,
                     task_name TEXT NOT NULL UNIQUE
                 );
             """)
-            self.cursor.execute("""
+            self.conn.execute("""
                 CREATE TABLE IF NOT EXISTS time_logs (
                     id INTEGER PRIMARY KEY,
                     work_day_id INTEGER NOT NULL,
@@ -67,6 +668,43 @@ class DatabaseManager:
                 );
             """)
 
+    def _migrate(self):
+        """
+        PRAGMA user_version を基準に、未適用のマイグレーションを順番に適用する。
+        各マイグレーションはバージョン番号の更新とともに1トランザクションで実行される。
+        適用中は外部キー制約が無効なので、バージョン番号を更新する前に PRAGMA foreign_key_check で
+        参照先のない行が残っていないかを確かめ、残っていればそのマイグレーションをロールバックする。
+        """
+        if not self.conn:
+            return
+        current_version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if current_version >= len(self.MIGRATIONS):
+            return
+
+        # テーブルの作り直しで参照先が一時的に消えるため、適用中は外部キー制約を無効にする
+        # (この PRAGMA はトランザクション内では効かないので、ここで切り替える)
+        self.conn.execute("PRAGMA foreign_keys = OFF;")
+        try:
+            for version, script in enumerate(self.MIGRATIONS[current_version:], start=current_version + 1):
+                try:
+                    # executescript は実行前にCOMMITするため、BEGINから明示的に記述する
+                    self.conn.executescript(f"BEGIN; {script}")
+                    violations = self.conn.execute("PRAGMA foreign_key_check").fetchall()
+                    if violations:
+                        table, rowid, parent, _ = violations[0]
+                        raise sqlite3.IntegrityError(
+                            f"外部キー制約の違反が{len(violations)}件あります (例: {table} の rowid {rowid} の参照先が {parent} にありません)"
+                        )
+                    self.conn.execute(f"PRAGMA user_version = {version}")
+                    self.conn.commit()
+                except sqlite3.Error as e:
+                    if self.conn.in_transaction:
+                        self.conn.rollback()
+                    print(f"データベースのマイグレーションエラー (v{version}): {e}")
+                    raise
+        finally:
+            self.conn.execute("PRAGMA foreign_keys = ON;")
+
     def add_task(self, task_name: str) -> Optional[int]:
         """
         新しい工数（タスク）をtasksテーブルに追加する。
@@ -78,10 +716,16 @@ class DatabaseManager:
         Returns:
             Optional[int]: 追加されたタスクのID。既に存在した場合はNone。
         """
+        # 追加した工数はすぐに使われるものとして、作業中の工数に含まれるようにする
+        last_used_at = to_epoch(datetime.now())
+
+        def _add(conn: sqlite3.Connection) -> int:
+            task_id = conn.execute("INSERT INTO tasks (task_name, last_used_at) VALUES (?, ?)", (task_name, last_used_at)).lastrowid
+            self._on_commit(lambda: self._update_task_catalogue(task_id, task_name=task_name, last_used_at=last_used_at))
+            return task_id
+
         try:
-            with self.conn:
-                self.cursor.execute("INSERT INTO tasks (task_name) VALUES (?)", (task_name,))
-                return self.cursor.lastrowid
+            return self._write(_add)
         except sqlite3.IntegrityError:
             return None
         except sqlite3.Error as e:
@@ -99,10 +743,14 @@ class DatabaseManager:
         Returns:
             bool: 更新が成功した場合はTrue、失敗した場合はFalse。
         """
+        def _update(conn: sqlite3.Connection) -> bool:
+            updated = conn.execute("UPDATE tasks SET task_name = ? WHERE id = ?", (new_task_name, task_id)).rowcount > 0
+            if updated:
+                self._on_commit(lambda: self._update_task_catalogue(task_id, task_name=new_task_name))
+            return updated
+
         try:
-            with self.conn:
-                self.cursor.execute("UPDATE tasks SET task_name = ? WHERE id = ?", (new_task_name, task_id))
-            return self.cursor.rowcount > 0
+            return self._write(_update)
         except sqlite3.IntegrityError:
             return False
         except sqlite3.Error as e:
@@ -114,31 +762,145 @@ class DatabaseManager:
         タスクを削除する。
         スキーマで ON DELETE CASCADE を指定しているため、関連する時間ログも自動で削除される。
         """
-        try:
-            with self.conn:
-                self.cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        def _delete(conn: sqlite3.Connection) -> bool:
             # rowcountは削除された行数を返す
-            return self.cursor.rowcount > 0
+            deleted = conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount > 0
+            if deleted:
+                self._on_commit(lambda: self._update_task_catalogue(task_id, deleted=True))
+            return deleted
+
+        try:
+            return self._write(_delete)
         except sqlite3.Error as e:
             print(f"タスク削除エラー: {e}")
             return False
 
+    def set_task_archived(self, task_id: int, archived: bool) -> bool:
+        """
+        工数をアーカイブする、またはアーカイブを解除する。
+        アーカイブした工数はメイン画面に常には表示されなくなるが、ログはそのまま残り、検索で表示できる。
+
+        Args:
+            task_id (int): 対象のタスクのID。
+            archived (bool): Trueでアーカイブ、Falseで解除。
+
+        Returns:
+            bool: 更新が成功した場合はTrue。
+        """
+        return self._set_task_flag(task_id, 'archived', archived)
+
+    def set_task_pinned(self, task_id: int, pinned: bool) -> bool:
+        """
+        工数をピン留めする、またはピン留めを解除する。
+        ピン留めした工数は、しばらく使っていなくてもメイン画面に表示される。
+
+        Args:
+            task_id (int): 対象のタスクのID。
+            pinned (bool): Trueでピン留め、Falseで解除。
+
+        Returns:
+            bool: 更新が成功した場合はTrue。
+        """
+        return self._set_task_flag(task_id, 'pinned', pinned)
+
+    def _set_task_flag(self, task_id: int, column: str, value: bool) -> bool:
+        """tasksテーブルのフラグ(archived, pinned)を更新する。columnには固定の値のみを渡すこと。"""
+        def _update(conn: sqlite3.Connection) -> bool:
+            updated = conn.execute(f"UPDATE tasks SET {column} = ? WHERE id = ?", (int(value), task_id)).rowcount > 0
+            if updated:
+                self._on_commit(lambda: self._update_task_catalogue(task_id, **{column: value}))
+            return updated
+
+        try:
+            return self._write(_update)
+        except sqlite3.Error as e:
+            print(f"タスク更新エラー: {e}")
+            return False
+
     # --- work_days テーブル操作 ---
 
-    def get_all_tasks(self) -> List[sqlite3.Row]:
+    def get_all_tasks(self) -> List[Task]:
+        """
+        登録されているすべてのタスクを、アーカイブ済みのものも含めてID順に取得する。
+        工数マスタのキャッシュから返すため、他のプロセスがDBを更新していなければクエリは実行しない。
+
+        Returns:
+            List[Task]: タスクのリスト。
+        """
+        return self._get_task_catalogue()
+
+    def get_active_tasks(self, used_since: datetime) -> List[Task]:
         """
-        登録されているすべてのタスクを取得する。
+        作業中の工数(アーカイブされておらず、ピン留めされているか used_since 以降に使われたもの)をID順に取得する。
+
+        Args:
+            used_since (datetime): この時刻以降に計測を開始した工数を作業中とみなす。
 
         Returns:
-            List[sqlite3.Row]: タスクのリスト。
+            List[Task]: タスクのリスト。
+        """
+        since = to_epoch(used_since)
+        return [task for task in self._get_task_catalogue() if task.is_active(since)]
+
+    def _get_task_catalogue(self) -> List[Task]:
+        """
+        工数マスタのキャッシュの内容をID順に返す。未読み込みか、他の接続がDBを更新していれば読み込み直す。
+        返すタスクは呼び出し元で変更してもよい複製。
         """
         try:
-            self.cursor.execute("SELECT id, task_name FROM tasks ORDER BY id")
-            return self.cursor.fetchall()
+            # 確認専用の接続で取得するため、ライタースレッドが長い書き込みを実行中でも待たされない
+            version = self._read_data_version()
+            with self._task_catalogue_lock:
+                if self._task_catalogue is None or version != self._task_catalogue_version:
+                    with self._reader() as conn:
+                        tasks = self._query(conn, Task, "SELECT id, task_name, archived, pinned, last_used_at FROM tasks ORDER BY id").fetchall()
+                    self._task_catalogue = {task.id: task for task in tasks}
+                    self._task_catalogue_version = version
+                return [task.copy() for task in self._task_catalogue.values()]
         except sqlite3.Error as e:
             print(f"タスク取得エラー: {e}")
             return []
 
+    def _advance_task_catalogue_version(self, version_before: int, version_after: int):
+        """
+        [ライタースレッド] このプロセスのコミットで data_version が version_before から version_after に
+        変わったことを記録する。その変更はコミット後の処理でキャッシュに反映されるため、読み込み直さなくてよい。
+        """
+        with self._task_catalogue_lock:
+            if self._task_catalogue_version == version_before:
+                self._task_catalogue_version = version_after
+
+    def _invalidate_task_catalogue(self):
+        """工数マスタのキャッシュを破棄し、次回の取得時に読み込み直させる。"""
+        with self._task_catalogue_lock:
+            self._task_catalogue = None
+
+    def _update_task_catalogue(self, task_id: int, deleted: bool = False, **fields: Any):
+        """
+        コミットされた工数の追加・更新・削除をキャッシュに反映する。
+
+        Args:
+            task_id (int): 対象のタスクのID。
+            deleted (bool): Trueなら削除されたものとしてキャッシュから取り除く。
+            **fields: 変更された属性 (task_name, archived, pinned, last_used_at)。
+                新しく追加された工数の場合は task_name が必須。
+        """
+        with self._task_catalogue_lock:
+            if self._task_catalogue is None:
+                return # 未読み込みなら次回の読み込みで反映される
+            if deleted:
+                self._task_catalogue.pop(task_id, None)
+                return
+            task = self._task_catalogue.get(task_id)
+            if task is None:
+                if self._task_catalogue and task_id < next(reversed(self._task_catalogue)):
+                    # 末尾に追加するとID順が崩れる場合は、次回読み込み直す
+                    self._task_catalogue = None
+                    return
+                task = self._task_catalogue[task_id] = Task(task_id, fields.pop('task_name'))
+            for name, value in fields.items():
+                setattr(task, name, value)
+
     def get_or_create_work_day(self, work_date: date) -> Optional[int]:
         """
         指定された日付のwork_dayレコードを取得または作成する。
@@ -149,15 +911,15 @@ class DatabaseManager:
         Returns:
             Optional[int]: work_daysテーブルのID。
         """
-        try:
-            self.cursor.execute("SELECT id FROM work_days WHERE work_date = ?", (work_date.isoformat(),))
-            row = self.cursor.fetchone()
+        def _get_or_create(conn: sqlite3.Connection) -> int:
+            # 確認と作成の間に他の書き込みが入らないよう、ライタースレッドでまとめて行う
+            row = conn.execute("SELECT id FROM work_days WHERE work_date = ?", (work_date.isoformat(),)).fetchone()
             if row:
                 return row['id']
-            else:
-                with self.conn:
-                    self.cursor.execute("INSERT INTO work_days (work_date) VALUES (?)", (work_date.isoformat(),))
-                    return self.cursor.lastrowid
+            return conn.execute("INSERT INTO work_days (work_date) VALUES (?)", (work_date.isoformat(),)).lastrowid
+
+        try:
+            return self._write(_get_or_create)
         except sqlite3.Error as e:
             print(f"Work Day取得/作成エラー: {e}")
             return None
@@ -167,12 +929,11 @@ class DatabaseManager:
         業務日の開始時刻を更新する。
         """
         try:
-            with self.conn:
-                self.cursor.execute(
-                    "UPDATE work_days SET start_time = ? WHERE id = ?",
-                    (start_time.isoformat(), work_day_id)
-                )
-            return self.cursor.rowcount > 0
+            cursor = self._write(lambda conn: conn.execute(
+                "UPDATE work_days SET start_time = ? WHERE id = ?",
+                (to_epoch(start_time), work_day_id)
+            ))
+            return cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"業務日開始時刻の更新エラー: {e}")
             return False
@@ -182,17 +943,17 @@ class DatabaseManager:
         業務日の終了時刻を更新する。
         """
         try:
-            with self.conn:
-                self.cursor.execute(
-                    "UPDATE work_days SET end_time = ? WHERE id = ?",
-                    (end_time.isoformat(), work_day_id)
-                )
-            return self.cursor.rowcount > 0
+            cursor = self._write(lambda conn: conn.execute(
+                "UPDATE work_days SET end_time = ? WHERE id = ?",
+                (to_epoch(end_time), work_day_id)
+            ))
+            return cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"業務日終了時刻の更新エラー: {e}")
             return False
 
-    def get_work_day_details(self, work_day_id: int) -> Optional[sqlite3.Row]:
+    @cached_read("業務日詳細の取得エラー")
+    def get_work_day_details(self, work_day_id: int) -> Optional[WorkDay]:
         """
         指定された業務日の詳細情報を取得する。
 
@@ -200,16 +961,13 @@ class DatabaseManager:
             work_day_id (int): 取得対象のwork_daysテーブルのID。
 
         Returns:
-            Optional[sqlite3.Row]: 業務日の詳細情報。見つからなければNone。
+            Optional[WorkDay]: 業務日の詳細情報。見つからなければNone。
         """
-        try:
-            self.cursor.execute("SELECT * FROM work_days WHERE id = ?", (work_day_id,))
-            return self.cursor.fetchone()
-        except sqlite3.Error as e:
-            print(f"業務日詳細の取得エラー: {e}")
-            return None
+        with self._reader() as conn:
+            return self._query(conn, WorkDay, "SELECT id, work_date, start_time, end_time FROM work_days WHERE id = ?", (work_day_id,)).fetchone()
 
-    def get_work_day_by_date(self, work_date: date) -> Optional[sqlite3.Row]:
+    @cached_read("日付によるWork Day取得エラー")
+    def get_work_day_by_date(self, work_date: date) -> Optional[WorkDay]:
         """
         指定された日付のwork_dayレコードを取得する。
 
@@ -217,14 +975,12 @@ class DatabaseManager:
             work_date (date): 対象の日付。
 
         Returns:
-            Optional[sqlite3.Row]: work_daysテーブルのレコード。見つからなければNone。
+            Optional[WorkDay]: work_daysテーブルのレコード。見つからなければNone。
         """
-        try:
-            self.cursor.execute("SELECT * FROM work_days WHERE work_date = ?", (work_date.isoformat(),))
-            return self.cursor.fetchone()
-        except sqlite3.Error as e:
-            print(f"日付によるWork Day取得エラー: {e}")
-            return None
+        with self._reader() as conn:
+            return self._query(conn, WorkDay, "SELECT id, work_date, start_time, end_time FROM work_days WHERE work_date = ?", (work_date.isoformat(),)).fetchone()
+
+    @cached_read("日次サマリーの計算エラー", dict)
     def get_summary_for_day(self, work_day_id: int, business_start_time: datetime, business_end_time: datetime, break_time_minutes: int) -> Dict[str, Any]:
         """
         指定された業務日の作業サマリーを計算して返す。
@@ -238,40 +994,11 @@ class DatabaseManager:
         Returns:
             Dict[str, Any]: サマリーデータ。
         """
-        logs = self.get_logs_for_day(work_day_id)
-        tasks = self.get_all_tasks()
-        task_map = {task['id']: task['task_name'] for task in tasks}
-
-        total_task_duration = timedelta()
-        task_details = {}
-
-        for log in logs:
-            task_id = log['task_id']
-            start_time = datetime.fromisoformat(log['start_time'])
-            end_time = datetime.fromisoformat(log['end_time'])
-            duration = end_time - start_time
-            total_task_duration += duration
-
-            if task_id not in task_details:
-                task_details[task_id] = {'name': task_map.get(task_id, '不明なタスク'), 'duration': timedelta()}
-            task_details[task_id]['duration'] += duration
-
-        total_work_duration = business_end_time - business_start_time
-
-        # 引数から休憩時間をtimedeltaオブジェクトに変換
-        break_time = timedelta(minutes=break_time_minutes)
-
-        net_work_duration = total_work_duration - break_time
-        # その他時間 = 総労働時間 - タスク合計時間 - 休憩時間
-        other_duration = net_work_duration - total_task_duration
-
-        return {
-            'total_work_time': format_timedelta(total_work_duration),
-            'net_work_time': format_timedelta(net_work_duration),
-            'total_task_time': format_timedelta(total_task_duration),
-            'other_time': format_timedelta(other_duration),
-            'task_details': [{'name': v['name'], 'duration_str': format_timedelta(v['duration'])} for v in sorted(task_details.values(), key=lambda x: x['name'])]
-        }
+        task_totals = self.get_daily_task_totals(work_day_id)
+        return build_day_summary(
+            [(row.task_name, row.total_seconds) for row in task_totals],
+            business_start_time, business_end_time, break_time_minutes
+        )
 
     # --- time_logs テーブル操作 ---
 
@@ -287,81 +1014,549 @@ class DatabaseManager:
         Returns:
             Optional[int]: 作成されたtime_logsのID。
         """
+        def _start(conn: sqlite3.Connection) -> int:
+            log_id = conn.execute(
+                "INSERT INTO time_logs (work_day_id, task_id, start_time) VALUES (?, ?, ?)",
+                (work_day_id, task_id, to_epoch(start_time))
+            ).lastrowid
+            # tasks.last_used_at はトリガーで更新されるので、その値をキャッシュにも反映する
+            last_used_at = conn.execute("SELECT last_used_at FROM tasks WHERE id = ?", (task_id,)).fetchone()[0]
+            self._on_commit(lambda: self._update_task_catalogue(task_id, last_used_at=last_used_at))
+            return log_id
+
         try:
-            with self.conn:
-                self.cursor.execute(
-                    "INSERT INTO time_logs (work_day_id, task_id, start_time) VALUES (?, ?, ?)",
-                    (work_day_id, task_id, start_time.isoformat())
-                )
-                return self.cursor.lastrowid
+            return self._write(_start)
         except sqlite3.Error as e:
             print(f"時間ログ開始エラー: {e}")
             return None
 
-    def end_time_log(self, time_log_id: int, end_time: datetime):
+    def end_time_log(self, time_log_id: int, end_time: datetime) -> bool:
         """
         指定された時間ログに終了時刻を記録する。
 
         Args:
             time_log_id (int): 更新対象のtime_logsのID。
             end_time (datetime): 作業終了時刻。
+
+        Returns:
+            bool: 更新が成功した場合はTrue。
         """
+        end_epoch = to_epoch(end_time)
+
+        def _end(conn: sqlite3.Connection) -> bool:
+            row = conn.execute("SELECT start_time FROM time_logs WHERE id = ?", (time_log_id,)).fetchone()
+            if row is None:
+                return False
+            if end_epoch < row['start_time']:
+                print(f"時間ログ終了エラー: 終了時刻 {end_time} が開始時刻より前です")
+                return False
+            conn.execute("UPDATE time_logs SET end_time = ? WHERE id = ?", (end_epoch, time_log_id))
+            return True
+
         try:
-            with self.conn:
-                self.cursor.execute(
-                    "UPDATE time_logs SET end_time = ? WHERE id = ?",
-                    (end_time.isoformat(), time_log_id)
-                )
+            return self._write(_end)
         except sqlite3.Error as e:
             print(f"時間ログ終了エラー: {e}")
+            return False
 
-    def get_logs_for_day(self, work_day_id: int) -> List[sqlite3.Row]:
+    def find_overlapping_logs(self, start_time: datetime, end_time: datetime, exclude_log_id: Optional[int] = None) -> List[CompletedLog]:
         """
-        指定された業務日のすべての時間ログを取得する。
-        終了時刻が記録されているもののみを対象とする。
+        start_time から end_time までの時間帯と重なる完了したログを、開始時刻の昇順で取得する。
+        端がちょうど接するだけのログは重なりとみなさない。start_time と end_time が同じ場合は、
+        その時刻を含む(その時刻に作業中だった)ログを返す。
+
+        time_log_intervals (R*Tree) で候補を絞ってから正確な時刻で確かめるため、
+        ログの件数が多くても O(log n) で検索できる。計測中のログは対象にならない。
 
         Args:
-            work_day_id (int): work_daysテーブルのID。
+            start_time (datetime): 時間帯の開始時刻。
+            end_time (datetime): 時間帯の終了時刻。
+            exclude_log_id (Optional[int]): 指定した場合はこのログを除く (編集中のログ自身など)。
 
         Returns:
-            List[sqlite3.Row]: 時間ログのリスト。
+            List[CompletedLog]: 重なっているログのリスト。失敗した場合は空のリスト。
         """
+        start, end = to_epoch(start_time), to_epoch(end_time)
         try:
-            self.cursor.execute("SELECT task_id, start_time, end_time FROM time_logs WHERE work_day_id = ? AND end_time IS NOT NULL", (work_day_id,))
-            return self.cursor.fetchall()
+            with self._reader() as conn:
+                # R*Tree の座標は32ビット浮動小数点数で、下限は小さく・上限は大きく丸められるため、
+                # R*Tree の条件で漏れなく候補を絞り、time_logs の値で正確に確かめる
+                return self._query(conn, CompletedLog, """
+                    SELECT
+                        tl.id,
+                        tl.work_day_id,
+                        tl.task_id,
+                        wd.work_date,
+                        t.task_name,
+                        wd.start_time AS business_start_time,
+                        wd.end_time AS business_end_time,
+                        tl.start_time,
+                        tl.end_time
+                    FROM time_log_intervals r
+                    CROSS JOIN time_logs tl ON tl.id = r.id
+                    JOIN work_days wd ON tl.work_day_id = wd.id
+                    JOIN tasks t ON tl.task_id = t.id
+                    WHERE r.start_time < :end AND r.end_time > :start
+                      AND tl.start_time < :end AND tl.end_time > :start
+                      AND tl.id IS NOT :exclude
+                    ORDER BY tl.start_time ASC, tl.id ASC
+                """, {'start': start, 'end': end, 'exclude': exclude_log_id}).fetchall()
         except sqlite3.Error as e:
-            print(f"日次ログ取得エラー: {e}")
+            print(f"重なりの検索エラー: {e}")
             return []
 
-    def get_all_completed_logs(self) -> List[sqlite3.Row]:
+    def find_all_overlaps(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[Tuple[CompletedLog, CompletedLog]]:
         """
-        完了したすべての時間ログを、日付とタスク名とともに取得する。
-        日付の降順、開始時刻の昇順でソートする。
+        期間内の完了したログのうち、互いに時間帯が重なっている組をすべて返す。過去のデータの点検用。
+        期間にアーカイブ済みの年が含まれる場合は、そのアーカイブファイルのログも含める
+        (アーカイブのログの id はアーカイブファイルの中のもの)。
+
+        ログを開始時刻の順に1回だけ読み、終了時刻の早い順のヒープで「まだ終わっていないログ」を保ちながら
+        走査する(スイープ)。O(n log n + 重なりの数) で、メモリ使用量は同時に重なっているログの数に比例する。
+
+        Args:
+            date_from (Optional[date]): 指定した場合はこの日付以降の業務日のみを対象とする。
+            date_to (Optional[date]): 指定した場合はこの日付以前の業務日のみを対象とする。
 
         Returns:
-            List[sqlite3.Row]: 時間ログのリスト。
+            List[Tuple[CompletedLog, CompletedLog]]: 重なっているログの組 (先に始まったログ, 後に始まったログ)。
         """
+        conditions, params = self._date_range_conditions(date_from, date_to)
+        where = "".join(f" AND {condition}" for condition in conditions)
+
+        def build_sql(schemas: List[str]) -> Tuple[str, List[Any]]:
+            if len(schemas) == 1:
+                return f"{self._COMPLETED_LOGS_SELECT.format(schema='main')}{where} ORDER BY tl.start_time ASC, tl.id ASC", params
+            union, union_params = self._union_all(self._COMPLETED_LOGS_SELECT + where, schemas, params)
+            return f"SELECT * FROM ({union}) ORDER BY start_time ASC, id ASC", union_params
+
+        overlaps: List[Tuple[CompletedLog, CompletedLog]] = []
+        # (終了時刻, 読み込んだ順番, ログ) のヒープ。アーカイブとホットのDBでIDが重なることがあるため、順番で区別する
+        active: List[Tuple[int, int, CompletedLog]] = []
         try:
-            self.cursor.execute("""
+            for order, log in enumerate(self._iter_archived_query(CompletedLog, build_sql, date_from, date_to)):
+                # この開始時刻までに終わっているログは、以降のどのログとも重ならない
+                while active and active[0][0] <= log.start_time:
+                    heapq.heappop(active)
+                overlaps.extend((other, log) for _, _, other in sorted(active, key=lambda item: item[1]))
+                heapq.heappush(active, (log.end_time, order, log))
+        except sqlite3.Error as e:
+            print(f"重なりの検索エラー: {e}")
+        return overlaps
+
+    @cached_read("日次ログ取得エラー", list)
+    def get_logs_for_day(self, work_day_id: int) -> List[TimeLog]:
+        """
+        指定された業務日のすべての時間ログを取得する。
+        終了時刻が記録されているもののみを対象とする。
+
+        Args:
+            work_day_id (int): work_daysテーブルのID。
+
+        Returns:
+            List[TimeLog]: 時間ログのリスト。
+        """
+        with self._reader() as conn:
+            return self._query(
+                conn, TimeLog,
+                "SELECT id, work_day_id, task_id, start_time, end_time FROM time_logs WHERE work_day_id = ? AND end_time IS NOT NULL",
+                (work_day_id,)
+            ).fetchall()
+
+    @cached_read("日次集計取得エラー", list)
+    def get_task_totals_for_day(self, work_day_id: int) -> List[TaskLogSummary]:
+        """
+        指定された業務日の完了したログを工数ごとに集計して取得する。
+        ログ文字列("HH:MM~HH:MM, ...")は開始時刻順に連結される。
+
+        Args:
+            work_day_id (int): work_daysテーブルのID。
+
+        Returns:
+            List[TaskLogSummary]: 工数ごとの集計のリスト。
+        """
+        with self._reader() as conn:
+            return self._query(conn, TaskLogSummary, """
                 SELECT
-                    wd.work_date,
+                    tl.task_id,
                     t.task_name,
-                    wd.start_time AS business_start_time,
-                    wd.end_time AS business_end_time,
-                    tl.start_time,
-                    tl.end_time
-                FROM time_logs tl
-                JOIN work_days wd ON tl.work_day_id = wd.id
+                    SUM(tl.end_time - tl.start_time) AS total_seconds,
+                    COUNT(*) AS log_count,
+                    group_concat(
+                        strftime('%H:%M', tl.start_time, 'unixepoch', 'localtime') || '~' ||
+                        strftime('%H:%M', tl.end_time, 'unixepoch', 'localtime'),
+                        ', '
+                    ) AS log_texts
+                FROM (
+                    -- group_concat の連結順を開始時刻順にするため、並べ替えてから集計する
+                    SELECT task_id, start_time, end_time FROM time_logs
+                    WHERE work_day_id = ? AND end_time IS NOT NULL
+                    ORDER BY task_id, start_time
+                ) tl
                 JOIN tasks t ON tl.task_id = t.id
-                WHERE tl.end_time IS NOT NULL
-                ORDER BY wd.work_date DESC, tl.start_time ASC
-            """)
-            return self.cursor.fetchall()
+                GROUP BY tl.task_id
+            """, (work_day_id,)).fetchall()
+
+    @staticmethod
+    def _date_range_conditions(date_from: Optional[date], date_to: Optional[date], column: str = "wd.work_date") -> Tuple[List[str], List[Any]]:
+        """
+        日付範囲(両端を含む)の絞り込み条件を組み立てる。
+        指定のない側は条件に含めないため、work_dateのインデックスによる範囲検索がそのまま効く。
+        """
+        conditions: List[str] = []
+        params: List[Any] = []
+        if date_from:
+            conditions.append(f"{column} >= ?")
+            params.append(date_from.isoformat())
+        if date_to:
+            conditions.append(f"{column} <= ?")
+            params.append(date_to.isoformat())
+        return conditions, params
+
+    @cached_read("全日次集計取得エラー", list)
+    def get_daily_task_totals(self, work_day_id: Optional[int] = None, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[TaskTotal]:
+        """
+        完了した時間ログの業務日×工数ごとの集計を daily_task_totals テーブルから取得する。
+        日付の降順、工数名の昇順でソートする。work_day_id を指定しない場合は、アーカイブ済みの年も含める。
+
+        Args:
+            work_day_id (Optional[int]): 指定した場合はその業務日のみを対象とする。
+            date_from (Optional[date]): 指定した場合はこの日付以降のみを対象とする。
+            date_to (Optional[date]): 指定した場合はこの日付以前のみを対象とする。
+
+        Returns:
+            List[TaskTotal]: 業務日×工数ごとの集計のリスト。
+        """
+        conditions, params = self._date_range_conditions(date_from, date_to)
+        if work_day_id is not None:
+            conditions.append("dt.work_day_id = ?")
+            params.append(work_day_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        select = f"""
+            SELECT
+                wd.id AS work_day_id,
+                wd.work_date,
+                wd.start_time AS business_start_time,
+                wd.end_time AS business_end_time,
+                t.id AS task_id,
+                t.task_name,
+                dt.total_seconds,
+                dt.log_count
+            FROM {{schema}}.daily_task_totals dt
+            JOIN {{schema}}.work_days wd ON dt.work_day_id = wd.id
+            JOIN main.tasks t ON dt.task_id = t.id
+            {where}
+        """
+        with self._reader() as conn:
+            if work_day_id is not None: # 業務日のIDはホットのDBのもの
+                return self._query(conn, TaskTotal, f"{select.format(schema='main')} ORDER BY wd.work_date DESC, t.task_name ASC", params).fetchall()
+            with self.attach_archives(conn, self.db_path, date_from, date_to) as schemas:
+                if len(schemas) == 1:
+                    sql = f"{select.format(schema='main')} ORDER BY wd.work_date DESC, t.task_name ASC"
+                else:
+                    union, params = self._union_all(select, schemas, params)
+                    sql = f"SELECT * FROM ({union}) ORDER BY work_date DESC, task_name ASC"
+                cursor = self._query(conn, TaskTotal, sql, params)
+                try:
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
+
+    @cached_read("業務日ページ取得エラー", list)
+    def get_work_days_page(self, before_date: Optional[date] = None, limit: int = 30) -> List[WorkDay]:
+        """
+        完了したログがある業務日を、日付の新しい順に最大limit件取得する。
+        前のページの最後の日付をbefore_dateに渡すと、それより古い日付の続きを取得できる。
+        アーカイブ済みの年の業務日も含める (アーカイブの業務日の id はアーカイブファイルの中のものなので、
+        業務日を指定して続きを読み込むときは work_date を使うこと)。
+
+        Args:
+            before_date (Optional[date]): 指定した場合はこの日付より前のみを対象とする。
+            limit (int): 取得する最大件数。
+
+        Returns:
+            List[WorkDay]: 業務日のリスト。
+        """
+        conditions = ["EXISTS (SELECT 1 FROM {schema}.daily_task_totals dt WHERE dt.work_day_id = wd.id)"]
+        params: List[Any] = []
+        if before_date:
+            conditions.append("wd.work_date < ?")
+            params.append(before_date.isoformat())
+        select = f"""
+            SELECT wd.id, wd.work_date, wd.start_time, wd.end_time
+            FROM {{schema}}.work_days wd
+            WHERE {' AND '.join(conditions)}
+            ORDER BY wd.work_date DESC
+            LIMIT ?
+        """
+
+        def fetch_page(conn: sqlite3.Connection, schema: str) -> List[WorkDay]:
+            cursor = self._query(conn, WorkDay, select.format(schema=schema), params + [limit])
+            try:
+                return cursor.fetchall()
+            finally:
+                cursor.close() # 実行中の文があるとDETACHできない
+
+        with self._reader() as conn:
+            work_days = fetch_page(conn, 'main')
+            archived_years = [row[0] for row in conn.execute(
+                "SELECT year FROM archive_status WHERE state = 'archived' AND year <= ? ORDER BY year DESC",
+                (before_date.year if before_date else 9999,)
+            )]
+            # アーカイブは新しい年から1年ずつATTACHし、ページにかかる年だけを読む。
+            # ページが埋まっていて、最も古い日付がその年より新しければ、その年より前のアーカイブは読まなくてよい
+            for year in archived_years:
+                if len(work_days) >= limit and year < int(work_days[-1].work_date[:4]):
+                    break
+                with self.attach_archives(conn, self.db_path, date(year, 1, 1), date(year, 12, 31)) as schemas:
+                    for schema in schemas[1:]:
+                        work_days = sorted(work_days + fetch_page(conn, schema), key=lambda work_day: work_day.work_date, reverse=True)[:limit]
+            return work_days
+
+    def get_work_date_range(self) -> Optional[Tuple[date, date]]:
+        """
+        記録のある業務日の最初と最後の日付を、アーカイブ済みの年も含めて返す。業務日がない場合や失敗した場合はNone。
+        """
+        try:
+            with self._reader() as conn, self.attach_archives(conn, self.db_path, None, None) as schemas:
+                union = " UNION ALL ".join(f"SELECT MIN(work_date) AS first, MAX(work_date) AS last FROM {schema}.work_days" for schema in schemas)
+                first, last = conn.execute(f"SELECT MIN(first), MAX(last) FROM ({union})").fetchone()
         except sqlite3.Error as e:
-            print(f"全ログ取得エラー: {e}")
-            return []
+            print(f"業務日の範囲取得エラー: {e}")
+            return None
+        if first is None:
+            return None
+        return date.fromisoformat(first), date.fromisoformat(last)
 
-    def get_logs_for_task_on_day(self, work_day_id: int, task_id: int) -> List[sqlite3.Row]:
+    # --- 別プロセスのワーカー用の読み込み ---
+    # 接続は connect_read_only() で開いたものを渡す。失敗時は sqlite3.Error をそのまま送出する。
+    # schemas には attach_archives() で得たスキーマ名のリストを渡すと、アーカイブ済みの年も含めて読み込む。
+    # 業務日のIDはスキーマごとの値のため、スキーマをまたいで突き合わせる場合は日付を使うこと。
+
+    @classmethod
+    def query_work_days(cls, conn: sqlite3.Connection, date_from: Optional[date], date_to: Optional[date],
+                        schemas: Sequence[str] = ('main',)) -> List[WorkDay]:
+        """期間内の業務日を日付の昇順で取得する。"""
+        conditions, params = cls._date_range_conditions(date_from, date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        union, params = cls._union_all(f"""
+            SELECT wd.id, wd.work_date, wd.start_time, wd.end_time
+            FROM {{schema}}.work_days wd
+            {where}
+        """, list(schemas), params)
+        return cls._query(conn, WorkDay, f"SELECT * FROM ({union}) ORDER BY work_date ASC", params).fetchall()
+
+    @classmethod
+    def query_task_totals(cls, conn: sqlite3.Connection, date_from: Optional[date], date_to: Optional[date],
+                          schemas: Sequence[str] = ('main',)) -> List[TaskTotal]:
+        """期間内の業務日×工数ごとの集計を daily_task_totals テーブルから取得する。順序は問わない。"""
+        conditions, params = cls._date_range_conditions(date_from, date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        union, params = cls._union_all(f"""
+            SELECT
+                wd.id AS work_day_id,
+                wd.work_date,
+                wd.start_time AS business_start_time,
+                wd.end_time AS business_end_time,
+                t.id AS task_id,
+                t.task_name,
+                dt.total_seconds,
+                dt.log_count
+            FROM {{schema}}.work_days wd
+            JOIN {{schema}}.daily_task_totals dt ON dt.work_day_id = wd.id
+            JOIN main.tasks t ON dt.task_id = t.id
+            {where}
+        """, list(schemas), params)
+        return cls._query(conn, TaskTotal, union, params).fetchall()
+
+    # 完了したログを業務日・工数名とともに取得するクエリの共通部分。
+    # CROSS JOIN で結合順を固定し、work_date の範囲で業務日を絞ってから日ごとにログを引くことで、
+    # 結果を日付順にそのまま流せるようにしている(並べ替えは同じ日の中だけで済む)。
+    # {schema} には 'main' かアーカイブのスキーマ名を入れる。工数マスタは常にホットのDBのものを使う。
+    _COMPLETED_LOGS_SELECT = """
+        SELECT
+            tl.id,
+            tl.work_day_id,
+            tl.task_id,
+            wd.work_date,
+            t.task_name,
+            wd.start_time AS business_start_time,
+            wd.end_time AS business_end_time,
+            tl.start_time,
+            tl.end_time
+        FROM {schema}.work_days wd
+        CROSS JOIN {schema}.time_logs tl ON tl.work_day_id = wd.id
+        JOIN main.tasks t ON tl.task_id = t.id
+        WHERE tl.end_time IS NOT NULL
+    """
+
+    def iter_completed_logs(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                            descending: bool = False, batch_size: int = 1000) -> Iterator[CompletedLog]:
+        """
+        完了した時間ログを、業務日・工数名とともに1件ずつ返すジェネレーター。
+        fetchmanyでbatch_size件ずつ読み込むため、件数が多くてもメモリ使用量は一定に保たれる。
+        イテレーション中は読み取り用の接続を1つ占有する。読み込みに失敗した場合は sqlite3.Error を送出する。
+        期間にアーカイブ済みの年が含まれる場合は、そのアーカイブファイルのログも含める
+        (アーカイブのログの id, work_day_id はアーカイブファイルの中のもの)。
+
+        Args:
+            date_from (Optional[date]): 指定した場合はこの日付以降のみを対象とする。
+            date_to (Optional[date]): 指定した場合はこの日付以前のみを対象とする。
+            descending (bool): Trueなら日付の降順、Falseなら昇順。同じ日の中は常に開始時刻の昇順。
+            batch_size (int): 一度に読み込む件数。
+
+        Yields:
+            CompletedLog: 時間ログ。
+        """
+        conditions, params = self._date_range_conditions(date_from, date_to)
+        where = "".join(f" AND {condition}" for condition in conditions)
+        order = "DESC" if descending else "ASC"
+
+        def build_sql(schemas: List[str]) -> Tuple[str, List[Any]]:
+            if len(schemas) == 1:
+                return f"{self._COMPLETED_LOGS_SELECT.format(schema='main')}{where} ORDER BY wd.work_date {order}, tl.start_time ASC, tl.id ASC", params
+            union, union_params = self._union_all(self._COMPLETED_LOGS_SELECT + where, schemas, params)
+            return f"SELECT * FROM ({union}) ORDER BY work_date {order}, start_time ASC, id ASC", union_params
+
+        yield from self._iter_archived_query(CompletedLog, build_sql, date_from, date_to, batch_size)
+
+    def iter_day_totals(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                        batch_size: int = 1000) -> Iterator[DayTotal]:
+        """
+        業務日ごとの完了したログの集計を、日付の昇順に1件ずつ返すジェネレーター。
+        daily_task_totals を業務日ごとに合計するため、ログ自体は読み込まない。
+        業務開始時刻が記録されていれば、ログのない業務日も含める。アーカイブ済みの年も含める。
+        読み込みに失敗した場合は sqlite3.Error を送出する。
+
+        Args:
+            date_from (Optional[date]): 指定した場合はこの日付以降のみを対象とする。
+            date_to (Optional[date]): 指定した場合はこの日付以前のみを対象とする。
+            batch_size (int): 一度に読み込む件数。
+
+        Yields:
+            DayTotal: 業務日ごとの集計。
+        """
+        conditions, params = self._date_range_conditions(date_from, date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        select = f"""
+            SELECT
+                wd.id AS work_day_id,
+                wd.work_date,
+                wd.start_time AS business_start_time,
+                wd.end_time AS business_end_time,
+                COALESCE(SUM(dt.total_seconds), 0) AS total_seconds,
+                COALESCE(SUM(dt.log_count), 0) AS log_count
+            FROM {{schema}}.work_days wd
+            LEFT JOIN {{schema}}.daily_task_totals dt ON dt.work_day_id = wd.id
+            {where}
+            GROUP BY wd.id
+            HAVING COUNT(dt.task_id) > 0 OR wd.start_time IS NOT NULL
+        """
+
+        def build_sql(schemas: List[str]) -> Tuple[str, List[Any]]:
+            if len(schemas) == 1:
+                return f"{select.format(schema='main')} ORDER BY wd.work_date ASC", params
+            union, union_params = self._union_all(select, schemas, params)
+            return f"SELECT * FROM ({union}) ORDER BY work_date ASC", union_params
+
+        yield from self._iter_archived_query(DayTotal, build_sql, date_from, date_to, batch_size)
+
+    def iter_task_period_totals(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                                batch_size: int = 1000) -> Iterator[TaskPeriodTotal]:
+        """
+        期間内の工数ごとの完了したログの集計を、工数名の昇順に1件ずつ返すジェネレーター。
+        アーカイブ済みの年も含める。読み込みに失敗した場合は sqlite3.Error を送出する。
+
+        Args:
+            date_from (Optional[date]): 指定した場合はこの日付以降のみを対象とする。
+            date_to (Optional[date]): 指定した場合はこの日付以前のみを対象とする。
+            batch_size (int): 一度に読み込む件数。
+
+        Yields:
+            TaskPeriodTotal: 工数ごとの集計。
+        """
+        conditions, params = self._date_range_conditions(date_from, date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        select = f"""
+            SELECT
+                t.id AS task_id,
+                t.task_name,
+                COUNT(*) AS day_count,
+                SUM(dt.total_seconds) AS total_seconds,
+                SUM(dt.log_count) AS log_count
+            FROM {{schema}}.daily_task_totals dt
+            JOIN {{schema}}.work_days wd ON dt.work_day_id = wd.id
+            JOIN main.tasks t ON dt.task_id = t.id
+            {where}
+            GROUP BY t.id
+        """
+
+        def build_sql(schemas: List[str]) -> Tuple[str, List[Any]]:
+            if len(schemas) == 1:
+                return f"{select.format(schema='main')} ORDER BY t.task_name ASC", params
+            # 年ごとの集計を工数ごとに足し合わせる
+            union, union_params = self._union_all(select, schemas, params)
+            return f"""
+                SELECT task_id, task_name, SUM(day_count), SUM(total_seconds), SUM(log_count)
+                FROM ({union})
+                GROUP BY task_id
+                ORDER BY task_name ASC
+            """, union_params
+
+        yield from self._iter_archived_query(TaskPeriodTotal, build_sql, date_from, date_to, batch_size)
+
+    @cached_read("ログページ取得エラー", list)
+    def get_completed_logs_page(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                                after: Optional[Tuple[str, int, int]] = None, limit: int = 500) -> List[CompletedLog]:
+        """
+        完了した時間ログを (work_date, start_time, id) の昇順で最大limit件取得する(キーセットページング)。
+        前のページの最後の行の (work_date, start_time, id) をafterに渡すと続きを取得できる。
+        アーカイブ済みの年も含める。
+
+        Args:
+            date_from (Optional[date]): 指定した場合はこの日付以降のみを対象とする。
+            date_to (Optional[date]): 指定した場合はこの日付以前のみを対象とする。
+            after (Optional[Tuple[str, int, int]]): 前のページの最後の行の (work_date, start_time, id)。
+            limit (int): 取得する最大件数。
+
+        Returns:
+            List[CompletedLog]: 時間ログのリスト。
+        """
+        conditions, params = self._date_range_conditions(date_from, date_to)
+        if after:
+            conditions.append("(wd.work_date, tl.start_time, tl.id) > (?, ?, ?)")
+            params.extend(after)
+        where = "".join(f" AND {condition}" for condition in conditions)
+        with self._reader() as conn, self.attach_archives(conn, self.db_path, date_from, date_to) as schemas:
+            if len(schemas) == 1:
+                sql = f"{self._COMPLETED_LOGS_SELECT.format(schema='main')}{where} ORDER BY wd.work_date ASC, tl.start_time ASC, tl.id ASC LIMIT ?"
+            else:
+                union, params = self._union_all(self._COMPLETED_LOGS_SELECT + where, schemas, params)
+                sql = f"SELECT * FROM ({union}) ORDER BY work_date ASC, start_time ASC, id ASC LIMIT ?"
+            cursor = self._query(conn, CompletedLog, sql, params + [limit])
+            try:
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    @cached_read("ログ読み込みエラー", list)
+    def get_all_completed_logs(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[CompletedLog]:
+        """
+        完了した時間ログを、日付とタスク名とともにすべて取得する。
+        日付の降順、開始時刻の昇順でソートする。
+        件数が多くなりうる場合は iter_completed_logs か get_completed_logs_page を使うこと。
+
+        Args:
+            date_from (Optional[date]): 指定した場合はこの日付以降のみを対象とする。
+            date_to (Optional[date]): 指定した場合はこの日付以前のみを対象とする。
+
+        Returns:
+            List[CompletedLog]: 時間ログのリスト。
+        """
+        return list(self.iter_completed_logs(date_from, date_to, descending=True))
+
+    @cached_read("タスク別ログ取得エラー", list)
+    def get_logs_for_task_on_day(self, work_day_id: int, task_id: int) -> List[TimeLog]:
         """
         指定された業務日とタスクに紐づく時間ログを取得する。
 
@@ -370,14 +1565,36 @@ class DatabaseManager:
             task_id (int): tasksテーブルのID。
 
         Returns:
-            List[sqlite3.Row]: 時間ログのリスト。
+            List[TimeLog]: 時間ログのリスト。
         """
-        try:
-            self.cursor.execute("SELECT * FROM time_logs WHERE work_day_id = ? AND task_id = ?", (work_day_id, task_id))
-            return self.cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"タスク別ログ取得エラー: {e}")
-            return []
+        with self._reader() as conn:
+            return self._query(
+                conn, TimeLog,
+                "SELECT id, work_day_id, task_id, start_time, end_time FROM time_logs WHERE work_day_id = ? AND task_id = ?",
+                (work_day_id, task_id)
+            ).fetchall()
+
+    @cached_read("タスク別ログ取得エラー", list)
+    def get_logs_for_task_on_date(self, work_date: date, task_id: int) -> List[CompletedLog]:
+        """
+        指定された日付とタスクの完了した時間ログを、開始時刻の昇順で取得する。
+        get_logs_for_task_on_day と違い、アーカイブ済みの年の日付も指定できる。
+
+        Args:
+            work_date (date): 業務日の日付。
+            task_id (int): tasksテーブルのID。
+
+        Returns:
+            List[CompletedLog]: 時間ログのリスト。
+        """
+        select = self._COMPLETED_LOGS_SELECT + " AND wd.work_date = ? AND tl.task_id = ?"
+        with self._reader() as conn, self.attach_archives(conn, self.db_path, work_date, work_date) as schemas:
+            union, params = self._union_all(select, schemas, [work_date.isoformat(), task_id])
+            cursor = self._query(conn, CompletedLog, f"SELECT * FROM ({union}) ORDER BY start_time ASC, id ASC", params)
+            try:
+                return cursor.fetchall()
+            finally:
+                cursor.close()
 
     def delete_time_log(self, time_log_id: int) -> bool:
         """
@@ -390,32 +1607,634 @@ class DatabaseManager:
             bool: 削除が成功した場合はTrue、失敗した場合はFalse。
         """
         try:
-            with self.conn:
-                self.cursor.execute("DELETE FROM time_logs WHERE id = ?", (time_log_id,))
-            return self.cursor.rowcount > 0
+            cursor = self._write(lambda conn: conn.execute("DELETE FROM time_logs WHERE id = ?", (time_log_id,)))
+            return cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"時間ログ削除エラー: {e}")
             return False
 
+    def compact_time_logs(self, gap_seconds: int = 0, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                          closed_days_only: bool = True) -> Optional[int]:
+        """
+        同じ業務日・同じ工数の、続いている・重なっている完了したログを1つのログにまとめる。
+        停止と再開を繰り返して細切れになったログの行数を減らすための処理で、1つのトランザクションで行う。
+
+        業務日×工数ごとにログを開始時刻の順に1回だけ読み、前のログの終了から gap_seconds 秒以内に
+        始まるログを前のログに統合する。残すのは各まとまりの最初のログで、終了時刻をまとまりの最後に延ばし、
+        残りは削除する。daily_task_totals と time_log_intervals はトリガーで更新される。
+        対象はホットのDBのログだけで、アーカイブ済みの年のファイルは変更しない。
+        gap_seconds を0より大きくすると、ログの間の隙間も作業時間に含まれるようになる点に注意すること。
+
+        Args:
+            gap_seconds (int): この秒数以内の隙間はつながっているとみなす。0なら接しているか重なっているログだけをまとめる。
+            date_from (Optional[date]): 指定した場合はこの日付以降の業務日のみを対象とする。
+            date_to (Optional[date]): 指定した場合はこの日付以前の業務日のみを対象とする。
+            closed_days_only (bool): Trueなら、業務終了時刻が記録済みの業務日のみを対象とする。
+
+        Returns:
+            Optional[int]: 削減した行数。失敗した場合はNone。
+        """
+        if gap_seconds < 0:
+            print(f"時間ログ統合エラー: 許容する隙間 {gap_seconds} 秒が負の値です")
+            return None
+        conditions, params = self._date_range_conditions(date_from, date_to)
+        if closed_days_only:
+            conditions.append("wd.end_time IS NOT NULL")
+        where = "".join(f" AND {condition}" for condition in conditions)
+
+        def _compact(conn: sqlite3.Connection) -> int:
+            # 終了時刻が開始時刻より前の不正なログは対象にしない
+            cursor = conn.execute(f"""
+                SELECT tl.id, tl.work_day_id, tl.task_id, tl.start_time, tl.end_time
+                FROM work_days wd
+                CROSS JOIN time_logs tl ON tl.work_day_id = wd.id
+                WHERE tl.end_time >= tl.start_time{where}
+                ORDER BY tl.work_day_id, tl.task_id, tl.start_time, tl.id
+            """, params)
+
+            # 読み込み中のカーソルの対象を書き換えないよう、更新内容を集めてから反映する
+            updates: List[Tuple[int, int]] = []
+            deletes: List[Tuple[int]] = []
+            group = None # まとめ先のログの [work_day_id, task_id, id, 元の終了時刻, 延ばした終了時刻]
+            for log_id, work_day_id, task_id, start, end in cursor:
+                if group and group[0] == work_day_id and group[1] == task_id and start <= group[4] + gap_seconds:
+                    group[4] = max(group[4], end)
+                    deletes.append((log_id,))
+                    continue
+                if group and group[4] != group[3]:
+                    updates.append((group[4], group[2]))
+                group = [work_day_id, task_id, log_id, end, end]
+            if group and group[4] != group[3]:
+                updates.append((group[4], group[2]))
+
+            conn.executemany("DELETE FROM time_logs WHERE id = ?", deletes)
+            conn.executemany("UPDATE time_logs SET end_time = ? WHERE id = ?", updates)
+            return len(deletes)
+
+        try:
+            return self._write(_compact)
+        except sqlite3.Error as e:
+            print(f"時間ログ統合エラー: {e}")
+            return None
+
+    # --- スナップショット用の読み込み ---
+
+    def get_closed_log_watermark(self) -> Optional[int]:
+        """
+        それ以下のIDの時間ログがすべて完了しているような、最大のIDを返す。
+        計測中のログがなければ最大のID、ログがなければ0。アーカイブ済みの年のログも含めて数える。
+
+        Returns:
+            Optional[int]: ID。失敗した場合はNone。
+        """
+        try:
+            with self._reader() as conn, self.attach_archives(conn, self.db_path, None, None) as schemas:
+                max_ids = " UNION ALL ".join(f"SELECT MAX(id) AS id FROM {schema}.time_logs" for schema in schemas)
+                return conn.execute(f"""
+                    SELECT COALESCE(
+                        (SELECT MIN(id) - 1 FROM main.time_logs WHERE end_time IS NULL),
+                        (SELECT MAX(id) FROM ({max_ids})),
+                        0
+                    )
+                """).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"ログ境界取得エラー: {e}")
+            return None
+
+    def get_time_log_checksum(self, upto_id: int) -> Optional[Tuple[int, int, int, int, int]]:
+        """
+        IDがupto_id以下の時間ログの件数と、各カラムの合計を返す。アーカイブ済みの年のログも含める。
+        書き出し済みの範囲のログが後から変更・削除されていないかを確かめるのに使う。
+        アーカイブはIDを保ったままログを移すため、年をアーカイブしても値は変わらない。
+
+        Returns:
+            Optional[Tuple[int, int, int, int, int]]: (件数, work_day_idの合計, task_idの合計, start_timeの合計, end_timeの合計)。
+                失敗した場合はNone。
+        """
+        select = "SELECT work_day_id, task_id, start_time, end_time FROM {schema}.time_logs WHERE id <= ?"
+        try:
+            with self._reader() as conn, self.attach_archives(conn, self.db_path, None, None) as schemas:
+                union, params = self._union_all(select, schemas, [upto_id])
+                return tuple(conn.execute(f"""
+                    SELECT COUNT(*), COALESCE(SUM(work_day_id), 0), COALESCE(SUM(task_id), 0),
+                           COALESCE(SUM(start_time), 0), COALESCE(SUM(end_time), 0)
+                    FROM ({union})
+                """, params).fetchone())
+        except sqlite3.Error as e:
+            print(f"ログのチェックサム取得エラー: {e}")
+            return None
+
+    def iter_time_log_batches(self, after_id: int, upto_id: int, batch_size: int = 10000) -> Iterator[List[Tuple[int, int, int, int]]]:
+        """
+        IDが after_id より大きく upto_id 以下の時間ログを、batch_size件ずつ返すジェネレーター。
+        アーカイブ済みの年のログも含め、アーカイブファイルごと(古い年から)、最後にホットのDBの順に、それぞれID順で返す。
+        件数が多い前提のため、値クラスは作らず (work_day_id, task_id, start_time, end_time) のタプルで返す。
+        読み込みに失敗した場合は、途中までの結果を正常な終わりと区別できるよう sqlite3.Error を送出する。
+
+        Yields:
+            List[Tuple[int, int, int, int]]: 時間ログの行。
+        """
+        with self._reader() as conn, self.attach_archives(conn, self.db_path, None, None) as schemas:
+            for schema in schemas[1:] + schemas[:1]:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                try:
+                    cursor.execute(f"""
+                        SELECT work_day_id, task_id, start_time, end_time
+                        FROM {schema}.time_logs
+                        WHERE id > ? AND id <= ?
+                        ORDER BY id
+                    """, (after_id, upto_id))
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield rows
+                finally:
+                    cursor.close() # 実行中の文があるとDETACHできない
+
+    # --- 一括書き込み ---
+
+    def bulk_upsert_tasks(self, task_names: Iterable[str]) -> Optional[Dict[str, int]]:
+        """
+        工数をまとめて登録する。既に存在する工数はそのまま使う。
+        すべての登録を1つのトランザクション内で executemany により行う。
+
+        Args:
+            task_names (Iterable[str]): 工数名。重複していてもよい。
+
+        Returns:
+            Optional[Dict[str, int]]: 工数名 -> タスクID。失敗した場合はNone。
+        """
+        try:
+            return self._write(lambda conn: self._bulk_upsert_tasks(conn, task_names))
+        except sqlite3.Error as e:
+            print(f"工数の一括登録エラー: {e}")
+            return None
+
+    def bulk_upsert_work_days(self, work_days: Iterable[Tuple[date, Optional[datetime], Optional[datetime]]]) -> Optional[Dict[date, int]]:
+        """
+        業務日をまとめて登録する。既に存在する業務日は、指定された(Noneでない)開始・終了時刻だけを更新する。
+        すべての登録を1つのトランザクション内で executemany により行う。
+        アーカイブ済みの年の日付が含まれる場合は、アーカイブと重複しないよう何も登録せずに失敗する。
+
+        Args:
+            work_days (Iterable[Tuple[date, Optional[datetime], Optional[datetime]]]): (日付, 業務開始時刻, 業務終了時刻) の組。
+
+        Returns:
+            Optional[Dict[date, int]]: 日付 -> work_daysテーブルのID。失敗した場合はNone。
+        """
+        try:
+            return self._write(lambda conn: self._bulk_upsert_work_days(conn, work_days))
+        except (sqlite3.Error, ValueError) as e:
+            print(f"業務日の一括登録エラー: {e}")
+            return None
+
+    def bulk_insert_time_logs(self, time_logs: Iterable[Tuple[int, int, datetime, Optional[datetime]]], skip_duplicates: bool = False) -> Optional[int]:
+        """
+        時間ログをまとめて追加する。すべての追加を1つのトランザクション内で executemany により行う。
+        daily_task_totals と tasks.last_used_at はトリガーによって同じトランザクション内で更新される。
+
+        Args:
+            time_logs (Iterable[Tuple[int, int, datetime, Optional[datetime]]]): (work_day_id, task_id, 開始時刻, 終了時刻) の組。
+            skip_duplicates (bool): Trueなら、同じ業務日・工数・開始時刻・終了時刻のログが既にあれば追加しない。
+
+        Returns:
+            Optional[int]: 追加した件数。失敗した場合はNone。
+        """
+        try:
+            return self._write(lambda conn: self._bulk_insert_time_logs(conn, time_logs, skip_duplicates))
+        except sqlite3.Error as e:
+            print(f"時間ログの一括追加エラー: {e}")
+            return None
+
+    def import_time_log_entries(self, entries: Iterable[Tuple[date, str, datetime, Optional[datetime], Optional[datetime], Optional[datetime]]],
+                                skip_duplicates: bool = True) -> Optional[int]:
+        """
+        日付と工数名で表された時間ログを、工数・業務日の登録とあわせて1つのトランザクションで取り込む。
+        途中で失敗した場合は何も取り込まれない。アーカイブ済みの年の日付が含まれる場合も失敗する
+        (重複の確認はホットのDBに対してのみ行うため、restore_year で戻してから取り込むこと)。
+
+        Args:
+            entries (Iterable[Tuple]): (日付, 工数名, 開始時刻, 終了時刻, 業務開始時刻, 業務終了時刻) の組。
+                業務開始・終了時刻は不明ならNone。
+            skip_duplicates (bool): Trueなら、既に同じログがあれば追加しない (同じファイルを再度取り込んでも重複しない)。
+
+        Returns:
+            Optional[int]: 追加した時間ログの件数。失敗した場合はNone。
+        """
+        entries = list(entries)
+
+        def _import(conn: sqlite3.Connection) -> int:
+            task_ids = self._bulk_upsert_tasks(conn, (entry[1] for entry in entries))
+            work_days: Dict[date, Tuple[Optional[datetime], Optional[datetime]]] = {}
+            for work_date, _, _, _, business_start, business_end in entries:
+                start, end = work_days.get(work_date, (None, None))
+                work_days[work_date] = (business_start or start, business_end or end)
+            work_day_ids = self._bulk_upsert_work_days(conn, ((work_date, start, end) for work_date, (start, end) in work_days.items()))
+            return self._bulk_insert_time_logs(
+                conn,
+                ((work_day_ids[entry[0]], task_ids[entry[1]], entry[2], entry[3]) for entry in entries),
+                skip_duplicates
+            )
+
+        try:
+            return self._write(_import)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"時間ログの取り込みエラー: {e}")
+            return None
+
+    def _bulk_upsert_tasks(self, conn: sqlite3.Connection, task_names: Iterable[str]) -> Dict[str, int]:
+        """[ライタースレッド] bulk_upsert_tasks の本体。例外はそのまま送出する。"""
+        names = list(dict.fromkeys(task_names)) # 重複を除き、最初に現れた順にIDを振る
+        # 最終使用時刻は、取り込んだログからトリガーで設定される
+        conn.executemany("INSERT INTO tasks (task_name) VALUES (?) ON CONFLICT (task_name) DO NOTHING", ((name,) for name in names))
+        self._on_commit(self._invalidate_task_catalogue)
+        # 工数の数は多くないため、すべて読み込んで絞り込む
+        wanted = set(names)
+        return {row[1]: row[0] for row in conn.execute("SELECT id, task_name FROM tasks") if row[1] in wanted}
+
+    def _bulk_upsert_work_days(self, conn: sqlite3.Connection,
+                               work_days: Iterable[Tuple[date, Optional[datetime], Optional[datetime]]]) -> Dict[date, int]:
+        """[ライタースレッド] bulk_upsert_work_days の本体。例外はそのまま送出する。"""
+        rows = [
+            (work_date.isoformat(), to_epoch(start) if start else None, to_epoch(end) if end else None)
+            for work_date, start, end in work_days
+        ]
+        if not rows:
+            return {}
+        # アーカイブ済みの年に業務日を作ると、アーカイブファイルと同じ日付の業務日が2つになる
+        years = sorted({int(row[0][:4]) for row in rows})
+        archived = conn.execute(
+            f"SELECT year FROM archive_status WHERE state = 'archived' AND year IN ({', '.join('?' * len(years))})", years
+        ).fetchone()
+        if archived:
+            raise ValueError(f"{archived[0]}年はアーカイブ済みのため追加できません。restore_year で戻してから取り込んでください")
+        conn.executemany("""
+            INSERT INTO work_days (work_date, start_time, end_time) VALUES (?, ?, ?)
+            ON CONFLICT (work_date) DO UPDATE SET
+                start_time = COALESCE(excluded.start_time, start_time),
+                end_time = COALESCE(excluded.end_time, end_time)
+        """, rows)
+        dates = {row[0] for row in rows}
+        # work_date の範囲で読み込み、対象の日付だけを返す
+        cursor = conn.execute("SELECT id, work_date FROM work_days WHERE work_date BETWEEN ? AND ?", (min(dates), max(dates)))
+        return {date.fromisoformat(row[1]): row[0] for row in cursor if row[1] in dates}
+
+    def _bulk_insert_time_logs(self, conn: sqlite3.Connection, time_logs: Iterable[Tuple[int, int, datetime, Optional[datetime]]],
+                               skip_duplicates: bool) -> int:
+        """[ライタースレッド] bulk_insert_time_logs の本体。例外はそのまま送出する。"""
+        rows = (
+            (work_day_id, task_id, to_epoch(start), to_epoch(end) if end else None)
+            for work_day_id, task_id, start, end in time_logs
+        )
+        if skip_duplicates:
+            cursor = conn.executemany("""
+                INSERT INTO time_logs (work_day_id, task_id, start_time, end_time)
+                SELECT ?1, ?2, ?3, ?4
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM time_logs
+                    WHERE work_day_id = ?1 AND task_id = ?2 AND end_time IS ?4 AND start_time = ?3
+                )
+            """, rows)
+        else:
+            cursor = conn.executemany("INSERT INTO time_logs (work_day_id, task_id, start_time, end_time) VALUES (?, ?, ?, ?)", rows)
+        # last_used_at はトリガーで更新されるため、工数マスタのキャッシュは読み込み直させる
+        self._on_commit(self._invalidate_task_catalogue)
+        return cursor.rowcount
+
+    # --- 過去の年のアーカイブ ---
+
+    # アーカイブファイルのスキーマ。ホットのDBと同じIDのまま業務日・時間ログ・日次集計を持つ。
+    # 工数マスタは持たず、問い合わせ時はホットのDBの tasks と結合する。
+    _ARCHIVE_SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS {schema}.work_days (
+            id INTEGER PRIMARY KEY,
+            work_date TEXT NOT NULL UNIQUE,
+            start_time INTEGER,
+            end_time INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS {schema}.time_logs (
+            id INTEGER PRIMARY KEY,
+            work_day_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS {schema}.idx_time_logs_day_task_end ON time_logs (work_day_id, task_id, end_time, start_time)",
+        """
+        CREATE TABLE IF NOT EXISTS {schema}.daily_task_totals (
+            work_day_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            total_seconds INTEGER NOT NULL DEFAULT 0,
+            log_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (work_day_id, task_id)
+        ) WITHOUT ROWID
+        """,
+    )
+
+    def _archive_path(self, file_name: str) -> Path:
+        """アーカイブファイルのパスを返す。アーカイブはデータベースと同じフォルダに置く。"""
+        return Path(self.db_path).parent / file_name
+
+    @staticmethod
+    def _year_dates(year: int) -> Tuple[str, str]:
+        """年の最初と最後の日付 (work_date の形式)。"""
+        return f"{year:04}-01-01", f"{year:04}-12-31"
+
+    @staticmethod
+    def _year_checksum(conn: sqlite3.Connection, schema: str, year_dates: Tuple[str, str]) -> Tuple[Any, ...]:
+        """その年の業務日・時間ログの件数と各列の合計。アーカイブへのコピーが元と一致するかの確認に使う。"""
+        work_day_count = conn.execute(
+            f"SELECT COUNT(*) FROM {schema}.work_days WHERE work_date BETWEEN ? AND ?", year_dates
+        ).fetchone()[0]
+        log_checksum = conn.execute(f"""
+            SELECT COUNT(*), SUM(tl.task_id), SUM(tl.start_time), SUM(tl.end_time)
+            FROM {schema}.work_days wd
+            CROSS JOIN {schema}.time_logs tl ON tl.work_day_id = wd.id
+            WHERE wd.work_date BETWEEN ? AND ?
+        """, year_dates).fetchone()
+        return (work_day_count,) + tuple(log_checksum)
+
+    @cached_read("アーカイブ状態の取得エラー", list)
+    def get_archive_status(self) -> List[ArchiveStatus]:
+        """
+        年ごとのアーカイブの状態を、年の昇順で取得する。
+
+        Returns:
+            List[ArchiveStatus]: アーカイブの状態のリスト。
+        """
+        with self._reader() as conn:
+            return self._query(
+                conn, ArchiveStatus,
+                "SELECT year, file_name, state, work_day_count, time_log_count, updated_at FROM archive_status ORDER BY year"
+            ).fetchall()
+
+    def archive_year(self, year: int) -> Optional[int]:
+        """
+        過去の1年分の業務日・時間ログ・日次集計を、年ごとのアーカイブファイルに移す。
+        ホットのDBが小さく保たれ、開始・終了の記録やバックアップが軽くなる。アーカイブした年のログは
+        iter_completed_logs などで期間にその年が含まれる場合だけ、アーカイブファイルをATTACHして読み込まれる。
+
+        WALモードでは複数のファイルにまたがるトランザクションは全体としては原子的にならないため、
+        次の手順をファイルごとのトランザクションで行う。途中で中断した場合は、もう一度実行すればやり直せる。
+            1. archive_status にその年を 'copying' として記録する。
+            2. アーカイブファイルのその年のデータを作り直し、ホットのDBからコピーする (アーカイブファイルのみを更新)。
+            3. コピーが元と一致することを確かめ、ホットのDBから削除して 'archived' にする (ホットのDBのみを更新)。
+
+        Args:
+            year (int): アーカイブする年。今年より前で、計測中のログがないこと。
+
+        Returns:
+            Optional[int]: 移した時間ログの件数。既にアーカイブ済みの場合は0。失敗した場合はNone。
+        """
+        if year >= date.today().year:
+            print(f"アーカイブエラー: {year}年はまだ終わっていないため、アーカイブできません")
+            return None
+        year_dates = self._year_dates(year)
+        file_name = self.ARCHIVE_FILE_FORMAT.format(stem=Path(self.db_path).stem, year=year)
+        schema = f"archive_{year}"
+
+        def _begin(conn: sqlite3.Connection) -> bool:
+            status = conn.execute("SELECT state FROM archive_status WHERE year = ?", (year,)).fetchone()
+            has_live_days = conn.execute(
+                "SELECT 1 FROM work_days WHERE work_date BETWEEN ? AND ? LIMIT 1", year_dates
+            ).fetchone() is not None
+            if status and status[0] == 'archived':
+                if has_live_days:
+                    raise ValueError(f"アーカイブ済みの{year}年にログが追加されています。restore_year で戻してからアーカイブし直してください")
+                return False
+            if not status and not has_live_days:
+                return False
+            if conn.execute("""
+                SELECT 1
+                FROM work_days wd
+                CROSS JOIN time_logs tl ON tl.work_day_id = wd.id
+                WHERE wd.work_date BETWEEN ? AND ? AND tl.end_time IS NULL
+                LIMIT 1
+            """, year_dates).fetchone():
+                raise ValueError(f"{year}年に計測中のログがあります")
+            conn.execute("""
+                INSERT INTO archive_status (year, file_name, state, updated_at) VALUES (?, ?, 'copying', ?)
+                ON CONFLICT (year) DO UPDATE SET file_name = excluded.file_name, state = 'copying', updated_at = excluded.updated_at
+            """, (year, file_name, to_epoch(datetime.now())))
+            return True
+
+        def _copy(conn: sqlite3.Connection):
+            for statement in self._ARCHIVE_SCHEMA:
+                conn.execute(statement.format(schema=schema))
+            # 中断した前回のコピーが残っていれば消してから作り直す
+            for table in ('time_logs', 'daily_task_totals', 'work_days'):
+                conn.execute(f"DELETE FROM {schema}.{table}")
+            conn.execute(f"""
+                INSERT INTO {schema}.work_days (id, work_date, start_time, end_time)
+                SELECT id, work_date, start_time, end_time FROM main.work_days WHERE work_date BETWEEN ? AND ?
+            """, year_dates)
+            conn.execute(f"""
+                INSERT INTO {schema}.time_logs (id, work_day_id, task_id, start_time, end_time)
+                SELECT tl.id, tl.work_day_id, tl.task_id, tl.start_time, tl.end_time
+                FROM {schema}.work_days wd
+                CROSS JOIN main.time_logs tl ON tl.work_day_id = wd.id
+            """)
+            conn.execute(f"""
+                INSERT INTO {schema}.daily_task_totals (work_day_id, task_id, total_seconds, log_count)
+                SELECT dt.work_day_id, dt.task_id, dt.total_seconds, dt.log_count
+                FROM {schema}.work_days wd
+                CROSS JOIN main.daily_task_totals dt ON dt.work_day_id = wd.id
+            """)
+
+        def _finish(conn: sqlite3.Connection) -> int:
+            # コピーの後にその年のログが追加・変更されていないことを確かめてから消す
+            checksum = self._year_checksum(conn, 'main', year_dates)
+            if checksum != self._year_checksum(conn, schema, year_dates):
+                raise ValueError("アーカイブファイルへのコピーが元のデータと一致しません。もう一度実行してください")
+            # 日次集計と time_log_intervals はトリガーで削除される
+            conn.execute("""
+                DELETE FROM main.time_logs
+                WHERE work_day_id IN (SELECT id FROM main.work_days WHERE work_date BETWEEN ? AND ?)
+            """, year_dates)
+            conn.execute("DELETE FROM main.work_days WHERE work_date BETWEEN ? AND ?", year_dates)
+            conn.execute("""
+                UPDATE archive_status SET state = 'archived', work_day_count = ?, time_log_count = ?, updated_at = ?
+                WHERE year = ?
+            """, (checksum[0], checksum[1], to_epoch(datetime.now()), year))
+            return checksum[1]
+
+        attached = False
+        try:
+            if not self._write(_begin):
+                return 0
+            # ATTACH/DETACH はトランザクションの外で行う必要があるため、それぞれ別の書き込みとして実行する
+            self._write(lambda conn: conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(self._archive_path(file_name)),)))
+            attached = True
+            self._write(_copy)
+            return self._write(_finish)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"アーカイブエラー: {e}")
+            return None
+        finally:
+            if attached:
+                try:
+                    self._write(lambda conn: conn.execute(f"DETACH DATABASE {schema}"))
+                except sqlite3.Error as e:
+                    print(f"アーカイブファイルの切り離しエラー: {e}")
+
+    def restore_year(self, year: int) -> Optional[int]:
+        """
+        アーカイブした年の業務日・時間ログをホットのDBに戻し、アーカイブファイルを削除する。
+
+        戻す処理と archive_status の行の削除は、ホットのDBだけの1つのトランザクションで行う。
+        ファイルの削除前に中断した場合も、残ったファイルは次にその年をアーカイブするときに作り直される。
+        コピー中に中断したアーカイブ ('copying') の場合は、データはホットのDBに残っているため状態を消すだけにする。
+
+        業務日・時間ログはアーカイブ前と同じIDで戻す。IDは AUTOINCREMENT で振られるため、アーカイブの後に
+        作られた行と重なることはない。業務日は日付で対応づけ、ホットのDBに同じ日付があればそれに追加する。
+        アーカイブ後に削除された工数のログは戻さない。
+
+        Args:
+            year (int): 戻す年。
+
+        Returns:
+            Optional[int]: 戻した時間ログの件数。失敗した場合はNone。
+        """
+        status = next((status for status in self.get_archive_status() if status.year == year), None)
+        if status is None:
+            print(f"アーカイブ復元エラー: {year}年はアーカイブされていません")
+            return None
+        path = self._archive_path(status.file_name)
+        schema = f"archive_{year}"
+
+        def _restore(conn: sqlite3.Connection) -> int:
+            conn.execute(f"""
+                INSERT INTO main.work_days (id, work_date, start_time, end_time)
+                SELECT id, work_date, start_time, end_time FROM {schema}.work_days WHERE true
+                ON CONFLICT (work_date) DO UPDATE SET
+                    start_time = COALESCE(start_time, excluded.start_time),
+                    end_time = COALESCE(end_time, excluded.end_time)
+            """)
+            cursor = conn.execute(f"""
+                INSERT INTO main.time_logs (id, work_day_id, task_id, start_time, end_time)
+                SELECT tl.id, wd.id, tl.task_id, tl.start_time, tl.end_time
+                FROM {schema}.work_days aw
+                CROSS JOIN {schema}.time_logs tl ON tl.work_day_id = aw.id
+                JOIN main.work_days wd ON wd.work_date = aw.work_date
+                JOIN main.tasks t ON t.id = tl.task_id
+                ORDER BY tl.id
+            """)
+            conn.execute("DELETE FROM archive_status WHERE year = ?", (year,))
+            # last_used_at はトリガーで更新されるため、工数マスタのキャッシュは読み込み直させる
+            self._on_commit(self._invalidate_task_catalogue)
+            return cursor.rowcount
+
+        try:
+            if status.state != 'archived':
+                self._write(lambda conn: conn.execute("DELETE FROM archive_status WHERE year = ?", (year,)))
+                restored = 0
+            else:
+                if not path.exists():
+                    print(f"アーカイブ復元エラー: アーカイブファイルが見つかりません: {path}")
+                    return None
+                self._write(lambda conn: conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),)))
+                try:
+                    restored = self._write(_restore)
+                finally:
+                    self._write(lambda conn: conn.execute(f"DETACH DATABASE {schema}"))
+        except sqlite3.Error as e:
+            print(f"アーカイブ復元エラー: {e}")
+            return None
+
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            # データは戻っているため、ファイルが消せなくても失敗にはしない
+            print(f"アーカイブファイルを削除できませんでした (手動で削除してください): {e}")
+        return restored
+
+    def vacuum(self) -> bool:
+        """
+        未使用のページを解放して、データベースファイルを小さくする。アーカイブで多くの行を移した後に使う。
+
+        Returns:
+            bool: 成功した場合はTrue、失敗した場合はFalse。
+        """
+        try:
+            self._write(lambda conn: conn.execute("VACUUM"))
+            return True
+        except sqlite3.Error as e:
+            print(f"VACUUMエラー: {e}")
+            return False
+
+    def rebuild_daily_task_totals(self) -> bool:
+        """
+        daily_task_totals テーブルと time_log_intervals (R*Tree) を time_logs から作り直す。
+        集計値がずれた場合や、トリガー導入前のデータを取り込んだ場合に使用する。
+
+        Returns:
+            bool: 成功した場合はTrue、失敗した場合はFalse。
+        """
+        def _rebuild(conn: sqlite3.Connection):
+            conn.execute("DELETE FROM time_log_intervals")
+            conn.execute("""
+                INSERT INTO time_log_intervals (id, start_time, end_time)
+                SELECT id, MIN(start_time, end_time), MAX(start_time, end_time)
+                FROM time_logs
+                WHERE end_time IS NOT NULL
+            """)
+            conn.execute("DELETE FROM daily_task_totals")
+            conn.execute("""
+                INSERT INTO daily_task_totals (work_day_id, task_id, total_seconds, log_count)
+                SELECT work_day_id, task_id, SUM(end_time - start_time), COUNT(*)
+                FROM time_logs
+                WHERE end_time IS NOT NULL
+                GROUP BY work_day_id, task_id
+            """)
+
+        try:
+            self._write(_rebuild)
+            return True
+        except sqlite3.Error as e:
+            print(f"日次集計の再構築エラー: {e}")
+            return False
+
     def close(self):
-        """データベース接続を閉じる。"""
+        """ライタースレッドを停止し、すべてのデータベース接続を閉じる。"""
+        if self._writer_thread:
+            # キューに残っている書き込みを処理し終えてから停止させる
+            self._write_queue.put(None)
+            self._writer_thread.join()
+            self._writer_thread = None
+        if self._read_executor:
+            self._read_executor.shutdown(wait=True)
+            self._read_executor = None
+        for conn in self._read_connections:
+            conn.close()
+        self._read_connections.clear()
+        if self._monitor_conn:
+            self._monitor_conn.close()
+            self._monitor_conn = None
+        self._read_cache.clear()
         if self.conn:
             self.conn.close()
+            self.conn = None
 
     def debug_get_all_data(self) -> Dict[str, List[Dict[str, Any]]]:
         """【デバッグ用】すべてのテーブルの全データを取得する"""
-        if not self.cursor:
+        if not self._read_connections:
             return {}
 
-        tables = ["work_days", "tasks", "time_logs"]
+        tables = ["work_days", "tasks", "time_logs", "daily_task_totals"]
         all_data = {}
 
         try:
-            for table_name in tables:
-                self.cursor.execute(f"SELECT * FROM {table_name}")
-                rows = self.cursor.fetchall()
-                # sqlite3.Rowオブジェクトを辞書のリストに変換
-                all_data[table_name] = [dict(row) for row in rows]
+            with self._reader() as conn:
+                for table_name in tables:
+                    rows = conn.execute(f"SELECT * FROM {table_name}").fetchall()
+                    # sqlite3.Rowオブジェクトを辞書のリストに変換
+                    all_data[table_name] = [dict(row) for row in rows]
         except sqlite3.Error as e:
             print(f"デバッグデータ取得エラー: {e}")
             return {}
@@ -425,10 +2244,10 @@ class DatabaseManager:
 
 
 if __name__ == "__main__":
-    db = DatabaseManager()
+    db = DatabaseManager(Path("work_management.db"))
     # --- テストコード ---
     today_id = db.get_or_create_work_day(date.today())
-    task_id = db.add_task("設計作業") or db.cursor.execute("SELECT id FROM tasks WHERE task_name=?", ("設計作業",)).fetchone()['id']
+    task_id = db.add_task("設計作業") or next(task.id for task in db.get_all_tasks() if task.task_name == "設計作業")
 
     if today_id and task_id:
         start = datetime.now()
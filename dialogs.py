@@ -1,8 +1,18 @@
 import tkinter as tk
-from tkinter import ttk
-from datetime import datetime, timedelta
+from tkinter import ttk, filedialog, messagebox
+from datetime import datetime, date, timedelta
 from typing import Optional, Dict, Any
 
+from utils import format_seconds, from_epoch
+from aggregation import net_work_seconds, other_seconds
+from export import EXPORT_KINDS, EXPORT_FORMATS
+from pivot import PIVOT_PERIODS, build_pivot, format_hours
+
+def parse_date_entry(text: str) -> Optional[date]:
+    """入力欄の日付 (YYYY-MM-DD または YYYY/MM/DD) を読み取る。空欄はNone、不正な値はValueErrorを送出する。"""
+    text = text.strip()
+    return date.fromisoformat(text.replace('/', '-')) if text else None
+
 class StartTimeDialog(tk.Toplevel):
     """
     開始時刻を確認・編集するためのダイアログ（画面4）。
@@ -215,7 +225,7 @@ class SettingsDialog(tk.Toplevel):
         self.grab_set()
 
         self.title("設定")
-        self.geometry("300x150")
+        self.geometry("300x190")
 
         self.config_manager = config_manager
 
@@ -250,6 +260,18 @@ class SettingsDialog(tk.Toplevel):
         ttk.Spinbox(break_time_frame, from_=0, to=180, increment=15, textvariable=self.break_time_var, width=5).pack(side=tk.LEFT, padx=5)
         ttk.Label(break_time_frame, text="分").pack(side=tk.LEFT)
 
+        # メイン画面に表示する工数の範囲
+        active_days_frame = ttk.Frame(main_frame)
+        active_days_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Label(active_days_frame, text="表示する工数:").pack(side=tk.LEFT)
+
+        initial_days = self.config_manager.get('active_task_days', 30)
+        self.active_days_var = tk.StringVar(value=str(initial_days))
+
+        ttk.Spinbox(active_days_frame, from_=1, to=365, increment=1, textvariable=self.active_days_var, width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(active_days_frame, text="日以内に使ったもの").pack(side=tk.LEFT)
+
         # ボタン
         button_frame = ttk.Frame(self, padding=(0, 10, 0, 10))
         button_frame.pack(fill=tk.X, side=tk.BOTTOM)
@@ -258,9 +280,111 @@ class SettingsDialog(tk.Toplevel):
 
     def _on_save(self):
         self.config_manager.set('break_time_minutes', int(self.break_time_var.get()))
+        self.config_manager.set('active_task_days', int(self.active_days_var.get()))
         self.config_manager.save()
         self.destroy()
 
+class ExportDialog(tk.Toplevel):
+    """
+    エクスポートする内容・期間・形式と出力先を選ぶダイアログ。
+    OKで閉じた場合は result に export.export_data へ渡す引数が入る。
+    """
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.transient(parent)
+        self.grab_set()
+
+        self.title("エクスポート")
+        self.geometry("340x230")
+
+        self.result: Optional[Dict[str, Any]] = None
+
+        self._create_widgets()
+        self._center_window()
+
+        self.protocol("WM_DELETE_WINDOW", self._on_cancel)
+        self.wait_window(self)
+
+    def _center_window(self):
+        """ダイアログを親ウィンドウの中央に表示する。"""
+        self.update_idletasks()
+        parent_x = self.master.winfo_x()
+        parent_y = self.master.winfo_y()
+        parent_width = self.master.winfo_width()
+        parent_height = self.master.winfo_height()
+        self.geometry(f"+{parent_x + (parent_width // 2) - (self.winfo_width() // 2)}+{parent_y + (parent_height // 2) - (self.winfo_height() // 2)}")
+
+    def _create_widgets(self):
+        main_frame = ttk.Frame(self, padding="15")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # 出力する内容
+        self.kind_var = tk.StringVar(value='logs')
+        kind_frame = ttk.Frame(main_frame)
+        kind_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(kind_frame, text="内容:").pack(side=tk.LEFT)
+        for kind, label in EXPORT_KINDS.items():
+            ttk.Radiobutton(kind_frame, text=label, value=kind, variable=self.kind_var).pack(anchor=tk.W, padx=(40, 0))
+
+        # 期間 (空欄なら制限なし)
+        period_frame = ttk.Frame(main_frame)
+        period_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(period_frame, text="期間:").pack(side=tk.LEFT)
+        self.date_from_var = tk.StringVar()
+        self.date_to_var = tk.StringVar()
+        ttk.Entry(period_frame, textvariable=self.date_from_var, width=11).pack(side=tk.LEFT, padx=5)
+        ttk.Label(period_frame, text="〜").pack(side=tk.LEFT)
+        ttk.Entry(period_frame, textvariable=self.date_to_var, width=11).pack(side=tk.LEFT, padx=5)
+        ttk.Label(main_frame, text="(YYYY-MM-DD。空欄なら全期間)", foreground="gray").pack(anchor=tk.W)
+
+        # 形式
+        format_frame = ttk.Frame(main_frame)
+        format_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(format_frame, text="形式:").pack(side=tk.LEFT)
+        self.format_var = tk.StringVar(value=EXPORT_FORMATS[0])
+        ttk.Combobox(format_frame, textvariable=self.format_var, values=EXPORT_FORMATS, state="readonly", width=8).pack(side=tk.LEFT, padx=5)
+
+        # ボタン
+        button_frame = ttk.Frame(self, padding=(0, 10, 0, 10))
+        button_frame.pack(fill=tk.X, side=tk.BOTTOM)
+
+        ttk.Button(button_frame, text="保存先を選択", command=self._on_ok).pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="キャンセル", command=self._on_cancel).pack(side=tk.RIGHT, padx=(0, 10))
+
+    def _on_ok(self):
+        try:
+            date_from = parse_date_entry(self.date_from_var.get())
+            date_to = parse_date_entry(self.date_to_var.get())
+        except ValueError:
+            messagebox.showerror("エラー", "日付は YYYY-MM-DD の形式で入力してください。", parent=self)
+            return
+        if date_from and date_to and date_from > date_to:
+            messagebox.showerror("エラー", "期間の開始日が終了日より後になっています。", parent=self)
+            return
+
+        kind = self.kind_var.get()
+        fmt = self.format_var.get()
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=f".{fmt}",
+            filetypes=[(fmt.upper(), f"*.{fmt}")],
+            initialfile=f"{kind}_{date_from or 'all'}_{date_to or 'all'}.{fmt}"
+        )
+        if not path:
+            return
+        self.result = {
+            'path': path,
+            'kind': kind,
+            'fmt': fmt,
+            'date_from': date_from,
+            'date_to': date_to,
+        }
+        self.destroy()
+
+    def _on_cancel(self):
+        self.result = None
+        self.destroy()
+
 class ResultDialog(tk.Toplevel):
     """
     一日の作業サマリーを表示するリザルト画面（画面7）。
@@ -329,9 +453,14 @@ class ResultDialog(tk.Toplevel):
 
 class AllLogsViewerDialog(tk.Toplevel):
     """
-    過去すべての作業ログを閲覧するためのダイアログ。
+    過去すべての作業ログ (アーカイブ済みの年を含む) を閲覧するためのダイアログ。
+    直近の日付から PAGE_DAYS 日分ずつ読み込み、それより古いログは必要になったときに読み込む。
+    工数ごとの集計と個別ログは、日付・工数のノードが展開されたときに初めて読み込む。
     """
-    def __init__(self, parent, all_logs: list):
+    PAGE_DAYS = 30
+    PLACEHOLDER_TEXT = "読み込み中..."
+
+    def __init__(self, parent, async_db):
         super().__init__(parent)
         self.transient(parent)
         self.grab_set()
@@ -339,12 +468,18 @@ class AllLogsViewerDialog(tk.Toplevel):
         self.title("全作業ログ一覧")
         self.geometry("600x500")
 
-        self.all_logs = all_logs
+        self.async_db = async_db
+        self.db = async_db.db
+        self.oldest_loaded_date: Optional[date] = None # 読み込み済みの最も古い日付
+        self.break_time_minutes = self.master.config_manager.get('break_time_minutes', 60)
+        # 子ノードが未読み込みのノード -> 読み込みに必要な情報
+        self.unloaded_nodes: Dict[str, Dict[str, Any]] = {}
 
         self._create_widgets()
         self._center_window()
+        self._load_next_page()
 
-        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         self.wait_window(self)
 
     def _center_window(self):
@@ -361,7 +496,8 @@ class AllLogsViewerDialog(tk.Toplevel):
         main_frame.pack(fill=tk.BOTH, expand=True)
 
         # show="tree headings" に変更し、#0列（ツリー構造）とヘッダーの両方を表示
-        tree = ttk.Treeview(main_frame, columns=("task", "duration", "start", "end"), show="tree headings")
+        self.tree = ttk.Treeview(main_frame, columns=("task", "duration", "start", "end"), show="tree headings")
+        tree = self.tree
         tree.heading("#0", text="日付")
         tree.heading("task", text="工数名")
         tree.heading("duration", text="作業時間")
@@ -373,84 +509,282 @@ class AllLogsViewerDialog(tk.Toplevel):
         tree.column("duration", width=100, anchor=tk.E)
         tree.column("start", width=100, anchor=tk.CENTER)
         tree.column("end", width=100, anchor=tk.CENTER)
-        # 日付ごとにログをグループ化
-        logs_by_date = {}
-        for log in self.all_logs:
-            work_date = log['work_date']
-            if work_date not in logs_by_date:
-                logs_by_date[work_date] = []
-            logs_by_date[work_date].append(log)
-
-        # Treeviewにデータを挿入
-        for work_date, logs in logs_by_date.items():
-            # その日の最初のログから業務開始・終了時刻を取得
-            first_log = logs[0]
-            business_start_str = ""
-            business_end_str = ""
-            total_work_time_str = ""
-
-            if first_log['business_start_time']:
-                business_start_dt = datetime.fromisoformat(first_log['business_start_time'])
-                business_start_str = business_start_dt.strftime('%H:%M')
-            
-            if first_log['business_end_time']:
-                business_end_dt = datetime.fromisoformat(first_log['business_end_time'])
-                business_end_str = business_end_dt.strftime('%H:%M')
-                # 総作業時間を計算
-                if first_log['business_start_time']:
-                    total_work_duration = business_end_dt - datetime.fromisoformat(first_log['business_start_time'])
-                    break_time_minutes = self.master.config_manager.get('break_time_minutes', 60)
-                    net_work_duration = total_work_duration - timedelta(minutes=break_time_minutes)
-                    total_work_time_str = f"{int(net_work_duration.total_seconds() // 3600)}h {int((net_work_duration.total_seconds() % 3600) // 60)}m"
-
-            # 親ノード（日付）を挿入。
-            date_node = tree.insert("", tk.END, text=work_date, values=("", total_work_time_str, business_start_str, business_end_str), open=False)
-            
-            # --- 子ノード（工数ごとの集計と個別ログ）の処理 ---
-            tasks_for_day: Dict[str, Dict[str, Any]] = {}
-            for log in logs:
-                task_name = log['task_name']
-                if task_name not in tasks_for_day:
-                    tasks_for_day[task_name] = {'total_duration': timedelta(), 'logs': []}
-                
-                start_dt = datetime.fromisoformat(log['start_time'])
-                end_dt = datetime.fromisoformat(log['end_time'])
-                duration = end_dt - start_dt
-
-                tasks_for_day[task_name]['total_duration'] += duration
-                tasks_for_day[task_name]['logs'].append({'start': start_dt, 'end': end_dt, 'duration': duration})
-
-            # 工数ごとの合計時間を表示
-            all_tasks_duration = timedelta()
-            for task_name, data in sorted(tasks_for_day.items()):
-                total_duration = data['total_duration']
-                all_tasks_duration += total_duration
-                duration_str = f"{int(total_duration.total_seconds() // 3600):02}:{int((total_duration.total_seconds() % 3600) // 60):02}:{int(total_duration.total_seconds() % 60):02}"
-                
-                # 工数名のノードを挿入
-                task_node = tree.insert(date_node, tk.END, text="", values=(task_name, duration_str, "", ""), open=False)
-
-                # 個別ログのノードを挿入
-                for log_detail in data['logs']:
-                    log_duration_str = f"{int(log_detail['duration'].total_seconds() // 3600):02}:{int((log_detail['duration'].total_seconds() % 3600) // 60):02}:{int(log_detail['duration'].total_seconds() % 60):02}"
-                    log_values = ("", log_duration_str, log_detail['start'].strftime('%H:%M:%S'), log_detail['end'].strftime('%H:%M:%S'))
-                    tree.insert(task_node, tk.END, text="", values=log_values)
-            
-            # 「その他」時間を計算して表示
-            if first_log['business_start_time'] and first_log['business_end_time']:
-                business_start_dt = datetime.fromisoformat(first_log['business_start_time'])
-                business_end_dt = datetime.fromisoformat(first_log['business_end_time'])
-                total_work_duration = business_end_dt - business_start_dt
-                break_time_minutes = self.master.config_manager.get('break_time_minutes', 60)
-                break_time = timedelta(minutes=break_time_minutes)
-                other_duration = total_work_duration - all_tasks_duration - break_time
-                other_duration_str = f"{int(other_duration.total_seconds() // 3600):02}:{int((other_duration.total_seconds() % 3600) // 60):02}:{int(other_duration.total_seconds() % 60):02}"
-                tree.insert(date_node, tk.END, values=("その他", other_duration_str, "", ""), text="")
-
         tree.pack(fill=tk.BOTH, expand=True)
+        tree.bind("<<TreeviewOpen>>", self._on_node_open)
 
-        close_button = ttk.Button(main_frame, text="閉じる", command=self.destroy, padding=(10, 5))
-        close_button.pack(pady=(10, 0))
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=(10, 0))
+
+        # 古いログを追加で読み込むボタン。読み込み中と、これ以上ログがない場合は無効にする
+        self.more_button = ttk.Button(button_frame, text=self.PLACEHOLDER_TEXT, command=self._load_next_page, padding=(10, 5), state=tk.DISABLED)
+        self.more_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        close_button = ttk.Button(button_frame, text="閉じる", command=self._on_close, padding=(10, 5))
+        close_button.pack(side=tk.LEFT)
+
+    def _on_close(self):
+        # 読み込み中のページやノードがあれば、その結果は不要なので破棄する
+        self.async_db.cancel("all_logs_page")
+        for node in self.unloaded_nodes:
+            self.async_db.cancel(f"all_logs_node:{node}")
+        self.destroy()
+
+    def _insert_lazy_node(self, parent: str, info: Dict[str, Any], **kwargs) -> str:
+        """子ノードを後から読み込むノードを挿入する。展開できるよう仮の子ノードを1つ持たせる。"""
+        node = self.tree.insert(parent, tk.END, open=False, **kwargs)
+        self.tree.insert(node, tk.END, text="", values=("", self.PLACEHOLDER_TEXT, "", ""))
+        self.unloaded_nodes[node] = info
+        return node
+
+    def _load_next_page(self):
+        """読み込み済みの日付より古い PAGE_DAYS 日分の業務日を非同期に読み込む。"""
+        self.more_button.config(text=self.PLACEHOLDER_TEXT, state=tk.DISABLED)
+        # 1件多く取得して、さらに古いページがあるかを判定する
+        self.async_db.read(self.db.get_work_days_page, self.oldest_loaded_date, self.PAGE_DAYS + 1,
+                           on_success=self._insert_page, on_error=self._on_page_error, key="all_logs_page")
+
+    def _on_page_error(self, error: BaseException):
+        """業務日の読み込みに失敗した場合は、エラーを表示してボタンから読み込み直せるようにする。"""
+        if not self.winfo_exists():
+            return
+        self.more_button.config(text=f"さらに{self.PAGE_DAYS}日分を読み込む", state=tk.NORMAL)
+        messagebox.showerror("エラー", f"ログの読み込みに失敗しました。\n{error}", parent=self)
+
+    def _insert_page(self, work_days):
+        """読み込んだ1ページ分の日付ノードをTreeviewの末尾に追加する。"""
+        if not self.winfo_exists():
+            return
+        has_more = len(work_days) > self.PAGE_DAYS
+        work_days = work_days[:self.PAGE_DAYS]
+
+        for work_day in work_days:
+            business_start = work_day.start_time
+            business_end = work_day.end_time
+            business_start_str = from_epoch(business_start).strftime('%H:%M') if business_start else ""
+            business_end_str = from_epoch(business_end).strftime('%H:%M') if business_end else ""
+            # 休憩時間を差し引いた実働時間 (開始・終了のどちらかが未記録ならNone)
+            net_seconds = net_work_seconds(business_start, business_end, self.break_time_minutes)
+            total_work_time_str = format_seconds(net_seconds) if net_seconds is not None else ""
+
+            # 親ノード（日付）を挿入。工数ごとの集計は展開時に読み込む
+            self._insert_lazy_node(
+                "",
+                {'kind': 'day', 'work_date': date.fromisoformat(work_day.work_date), 'net_work_seconds': net_seconds},
+                text=work_day.work_date,
+                values=("", total_work_time_str, business_start_str, business_end_str)
+            )
+
+        if work_days:
+            self.oldest_loaded_date = date.fromisoformat(work_days[-1].work_date)
+        if has_more:
+            self.more_button.config(text=f"さらに{self.PAGE_DAYS}日分を読み込む", state=tk.NORMAL)
+        else:
+            self.more_button.config(text="すべて読み込みました", state=tk.DISABLED)
+
+    def _on_node_open(self, event):
+        """ノードが展開されたとき、子ノードが未読み込みであれば読み込む。"""
+        node = self.tree.focus()
+        info = self.unloaded_nodes.get(node)
+        if info is None or info.get('loading'):
+            return
+        info['loading'] = True
+
+        if info['kind'] == 'day':
+            # アーカイブ済みの年の業務日はIDがアーカイブファイルの中のものなので、日付で読み込む
+            self.async_db.read(
+                self.db.get_daily_task_totals, None, info['work_date'], info['work_date'],
+                on_success=lambda rows: self._insert_task_nodes(node, rows),
+                on_error=lambda error: self._on_node_error(node, error),
+                key=f"all_logs_node:{node}"
+            )
+        else:
+            self.async_db.read(
+                self.db.get_logs_for_task_on_date, info['work_date'], info['task_id'],
+                on_success=lambda logs: self._insert_log_nodes(node, logs),
+                on_error=lambda error: self._on_node_error(node, error),
+                key=f"all_logs_node:{node}"
+            )
+
+    def _on_node_error(self, node: str, error: BaseException):
+        """子ノードの読み込みに失敗した場合は、エラーを表示して次に展開したときに読み込み直す。"""
+        if not self.winfo_exists():
+            return
+        self.unloaded_nodes[node]['loading'] = False
+        self.tree.item(node, open=False)
+        messagebox.showerror("エラー", f"ログの読み込みに失敗しました。\n{error}", parent=self)
+
+    def _replace_placeholder(self, node: str) -> Dict[str, Any]:
+        """仮の子ノードを削除し、ノードを読み込み済みにする。"""
+        self.tree.delete(*self.tree.get_children(node))
+        return self.unloaded_nodes.pop(node)
+
+    def _insert_task_nodes(self, date_node: str, daily_task_totals):
+        """日付ノードの下に、工数ごとの集計ノードと「その他」を追加する。"""
+        if not self.winfo_exists():
+            return
+        info = self._replace_placeholder(date_node)
+
+        for row in daily_task_totals:
+            # 工数名のノードを挿入。個別ログは展開時に読み込む
+            self._insert_lazy_node(
+                date_node,
+                {'kind': 'task', 'work_date': info['work_date'], 'task_id': row.task_id},
+                text="",
+                values=(row.task_name, format_seconds(row.total_seconds), "", "")
+            )
+
+        # 「その他」時間を計算して表示
+        others = other_seconds(info['net_work_seconds'], sum(row.total_seconds for row in daily_task_totals))
+        if others is not None:
+            self.tree.insert(date_node, tk.END, values=("その他", format_seconds(others), "", ""), text="")
+
+    def _insert_log_nodes(self, task_node: str, logs):
+        """工数ノードの下に、完了した個別ログのノードを開始時刻順に追加する。"""
+        if not self.winfo_exists():
+            return
+        self._replace_placeholder(task_node)
+
+        for log in sorted((log for log in logs if log.end_time), key=lambda log: log.start_time):
+            log_values = ("", format_seconds(log.end_time - log.start_time), from_epoch(log.start_time).strftime('%H:%M:%S'), from_epoch(log.end_time).strftime('%H:%M:%S'))
+            self.tree.insert(task_node, tk.END, text="", values=log_values)
+
+class PivotDialog(tk.Toplevel):
+    """
+    工数×期間の作業時間(時間数)を表にして表示するダイアログ。
+    集計は pivot.build_pivot で読み込み用のスレッドで行い、CSV・HTMLにも保存できる。
+    """
+    def __init__(self, parent, async_db):
+        super().__init__(parent)
+        self.transient(parent)
+        self.grab_set()
+
+        self.title("工数×期間の集計表")
+        self.geometry("800x500")
+
+        self.async_db = async_db
+        self.db = async_db.db
+        self.pivot = None # 表示中の集計表
+
+        self._create_widgets()
+        self._center_window()
+        self._load()
+
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.wait_window(self)
+
+    def _center_window(self):
+        """ダイアログを親ウィンドウの中央に表示する。"""
+        self.update_idletasks()
+        parent_x = self.master.winfo_x()
+        parent_y = self.master.winfo_y()
+        parent_width = self.master.winfo_width()
+        parent_height = self.master.winfo_height()
+        self.geometry(f"+{parent_x + (parent_width // 2) - (self.winfo_width() // 2)}+{parent_y + (parent_height // 2) - (self.winfo_height() // 2)}")
+
+    def _create_widgets(self):
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # 期間と列の単位 (既定は直近30日を日ごと)
+        condition_frame = ttk.Frame(main_frame)
+        condition_frame.pack(fill=tk.X, pady=(0, 10))
+        today = date.today()
+        self.date_from_var = tk.StringVar(value=(today - timedelta(days=29)).isoformat())
+        self.date_to_var = tk.StringVar(value=today.isoformat())
+        self.period_var = tk.StringVar(value=PIVOT_PERIODS['day'])
+        ttk.Label(condition_frame, text="期間:").pack(side=tk.LEFT)
+        ttk.Entry(condition_frame, textvariable=self.date_from_var, width=11).pack(side=tk.LEFT, padx=5)
+        ttk.Label(condition_frame, text="〜").pack(side=tk.LEFT)
+        ttk.Entry(condition_frame, textvariable=self.date_to_var, width=11).pack(side=tk.LEFT, padx=5)
+        ttk.Label(condition_frame, text="単位:").pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Combobox(condition_frame, textvariable=self.period_var, values=list(PIVOT_PERIODS.values()),
+                     state="readonly", width=4).pack(side=tk.LEFT, padx=5)
+        self.load_button = ttk.Button(condition_frame, text="集計", command=self._load)
+        self.load_button.pack(side=tk.LEFT, padx=5)
+
+        # 集計表。列は集計のたびに作り直す
+        tree_frame = ttk.Frame(main_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+        self.tree = ttk.Treeview(tree_frame, show="headings")
+        x_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
+        y_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(xscrollcommand=x_scrollbar.set, yscrollcommand=y_scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        y_scrollbar.grid(row=0, column=1, sticky="ns")
+        x_scrollbar.grid(row=1, column=0, sticky="ew")
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=(10, 0))
+        ttk.Button(button_frame, text="CSVで保存", command=lambda: self._save('.csv'), padding=(10, 5)).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="HTMLで保存", command=lambda: self._save('.html'), padding=(10, 5)).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="閉じる", command=self._on_close, padding=(10, 5)).pack(side=tk.LEFT)
+
+    def _on_close(self):
+        self.async_db.cancel("pivot")
+        self.destroy()
+
+    def _load(self):
+        """入力された条件で集計表を非同期に作る。"""
+        try:
+            date_from = parse_date_entry(self.date_from_var.get())
+            date_to = parse_date_entry(self.date_to_var.get())
+        except ValueError:
+            messagebox.showerror("エラー", "日付は YYYY-MM-DD の形式で入力してください。", parent=self)
+            return
+        if not date_from or not date_to or date_from > date_to:
+            messagebox.showerror("エラー", "期間の開始日と終了日を正しく入力してください。", parent=self)
+            return
+        period = next(key for key, label in PIVOT_PERIODS.items() if label == self.period_var.get())
+        self.load_button.config(state=tk.DISABLED)
+        self.async_db.read(build_pivot, self.db, date_from, date_to, period, on_success=self._show, on_error=self._on_load_error, key="pivot")
+
+    def _on_load_error(self, error: BaseException):
+        """集計表の作成に失敗した場合は、エラーを表示してもう一度集計できるようにする。"""
+        if not self.winfo_exists():
+            return
+        self.load_button.config(state=tk.NORMAL)
+        messagebox.showerror("エラー", f"集計表の作成に失敗しました。\n{error}", parent=self)
+
+    def _show(self, pivot):
+        """集計表をTreeviewに表示する。セルは時間数で、作業のないセルは空欄。"""
+        if not self.winfo_exists():
+            return
+        self.load_button.config(state=tk.NORMAL)
+        if pivot is None:
+            return
+        self.pivot = pivot
+        tree = self.tree
+        tree.delete(*tree.get_children())
+        columns = ["task"] + [f"c{index}" for index in range(len(pivot.columns))] + ["total"]
+        tree["columns"] = columns
+        tree.heading("task", text="工数名")
+        tree.column("task", width=150, anchor=tk.W, stretch=False)
+        for index, label in enumerate(pivot.columns):
+            # 日ごとの列は月日だけを表示して幅を詰める
+            tree.heading(f"c{index}", text=label[5:] if pivot.period == 'day' else label)
+            tree.column(f"c{index}", width=60, anchor=tk.E, stretch=False)
+        tree.heading("total", text="合計")
+        tree.column("total", width=70, anchor=tk.E, stretch=False)
+
+        for name, values, total in zip(pivot.rows, pivot.matrix, pivot.row_totals):
+            tree.insert("", tk.END, values=[name] + [format_hours(value) for value in values] + [format_hours(total)])
+        tree.insert("", tk.END, values=["合計"] + [format_hours(total) for total in pivot.column_totals]
+                    + [format_hours(sum(pivot.row_totals))])
+
+    def _save(self, extension: str):
+        """表示中の集計表をCSVまたはHTMLに保存する。"""
+        if not self.pivot:
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=extension,
+            filetypes=[(extension[1:].upper(), f"*{extension}")],
+            initialfile=f"pivot_{self.pivot.period}_{self.pivot.columns[0]}{extension}" if self.pivot.columns else f"pivot{extension}"
+        )
+        if path and not self.pivot.write(path):
+            messagebox.showerror("エラー", "集計表の保存に失敗しました。", parent=self)
 
 class LogViewerDialog(tk.Toplevel):
     """
@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+import sqlite3
+from pathlib import Path
+from datetime import date
+from typing import Optional, Any, Iterator, Tuple
+
+from db_manager import DatabaseManager
+from aggregation import net_work_seconds, other_seconds
+from utils import from_epoch
+
+# 出力できる内容 -> 表示名
+EXPORT_KINDS = {
+    'logs': '明細 (時間ログ)',
+    'days': '日別集計',
+    'tasks': '工数別集計',
+}
+# 出力できる形式
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+# 内容ごとの出力カラム。明細はそのまま csv_import で取り込み直せるカラム名にしている
+EXPORT_COLUMNS = {
+    'logs': ('date', 'task_name', 'start', 'end', 'duration_seconds', 'business_start', 'business_end'),
+    'days': ('date', 'business_start', 'business_end', 'total_seconds', 'log_count', 'net_work_seconds', 'other_seconds'),
+    'tasks': ('task_name', 'day_count', 'total_seconds', 'log_count'),
+}
+
+def _format_epoch(epoch_seconds: Optional[int]) -> Optional[str]:
+    """エポック秒を 'YYYY-MM-DD HH:MM:SS' 形式のローカル時刻に変換する。Noneはそのまま返す。"""
+    if epoch_seconds is None:
+        return None
+    return from_epoch(epoch_seconds).isoformat(sep=' ')
+
+def _log_rows(db: DatabaseManager, date_from: Optional[date], date_to: Optional[date], break_time_minutes: int) -> Iterator[Tuple[Any, ...]]:
+    """完了した時間ログを1行ずつ返す。"""
+    for log in db.iter_completed_logs(date_from, date_to):
+        yield (log.work_date, log.task_name, _format_epoch(log.start_time), _format_epoch(log.end_time),
+               log.duration_seconds, _format_epoch(log.business_start_time), _format_epoch(log.business_end_time))
+
+def _day_rows(db: DatabaseManager, date_from: Optional[date], date_to: Optional[date], break_time_minutes: int) -> Iterator[Tuple[Any, ...]]:
+    """業務日ごとの集計を1行ずつ返す。業務の開始・終了時刻がない日は実働時間・その他時間を空にする。"""
+    for day in db.iter_day_totals(date_from, date_to):
+        net = net_work_seconds(day.business_start_time, day.business_end_time, break_time_minutes)
+        yield (day.work_date, _format_epoch(day.business_start_time), _format_epoch(day.business_end_time),
+               day.total_seconds, day.log_count, net, other_seconds(net, day.total_seconds))
+
+def _task_rows(db: DatabaseManager, date_from: Optional[date], date_to: Optional[date], break_time_minutes: int) -> Iterator[Tuple[Any, ...]]:
+    """期間内の工数ごとの集計を1行ずつ返す。"""
+    for total in db.iter_task_period_totals(date_from, date_to):
+        yield (total.task_name, total.day_count, total.total_seconds, total.log_count)
+
+_ROW_SOURCES = {
+    'logs': _log_rows,
+    'days': _day_rows,
+    'tasks': _task_rows,
+}
+
+def export_data(db: DatabaseManager, path: Path, kind: str = 'logs', fmt: Optional[str] = None,
+                date_from: Optional[date] = None, date_to: Optional[date] = None,
+                break_time_minutes: int = 60) -> Optional[int]:
+    """
+    時間ログまたは集計をCSVかJSONL(1行1オブジェクトのJSON)に書き出す。
+
+    行はDBのカーソルから読んだそばから書き出すため、全期間を出力してもメモリ使用量は一定に保たれる。
+    書き出しは一時ファイルに行い、DBから最後まで読み込めて書き出せた場合だけ path に置き換える。
+
+    Args:
+        db (DatabaseManager): 出力元のデータベース。
+        path (Path): 出力先のファイル。
+        kind (str): 'logs' (明細)、'days' (日別集計)、'tasks' (工数別集計) のいずれか。
+        fmt (Optional[str]): 'csv' または 'jsonl'。省略した場合は path の拡張子で決める。
+        date_from (Optional[date]): 指定した場合はこの日付以降のみを対象とする。
+        date_to (Optional[date]): 指定した場合はこの日付以前のみを対象とする。
+        break_time_minutes (int): 日別集計の実働時間の計算に使う休憩時間(分)。
+
+    Returns:
+        Optional[int]: 書き出した行数。失敗した場合はNone。
+    """
+    path = Path(path)
+    fmt = (fmt or path.suffix.lstrip('.')).lower()
+    if kind not in _ROW_SOURCES or fmt not in EXPORT_FORMATS:
+        print(f"エクスポートエラー: 出力内容 '{kind}' または形式 '{fmt}' に対応していません")
+        return None
+
+    columns = EXPORT_COLUMNS[kind]
+    rows = _ROW_SOURCES[kind](db, date_from, date_to, break_time_minutes)
+    tmp_path = path.with_name(path.name + '.tmp')
+    count = 0
+    try:
+        if fmt == 'csv':
+            # Excelで文字化けしないようBOM付きで書き出す (csv_import の既定の文字コードと同じ)
+            with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+        else:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                    f.write('\n')
+                    count += 1
+        os.replace(tmp_path, path)
+    except (IOError, OSError, sqlite3.Error) as e: # 読み込みが途中で失敗した場合も、書きかけのファイルで置き換えない
+        print(f"エクスポートエラー: {e}")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        return None
+    finally:
+        rows.close() # 途中で失敗した場合も読み取り用の接続を返す
+    return count
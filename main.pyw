@@ -1,20 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox
-from typing import Dict, Any
+from typing import Dict, Any, Tuple, List, Optional
 from datetime import datetime, date, timedelta
 
 from db_manager import DatabaseManager
+from async_db import AsyncDatabase
 from app_state import AppState
-from dialogs import StartTimeDialog, EndTimeDialog, ResultDialog, LogViewerDialog, AllLogsViewerDialog, EditTimeDialog, SettingsDialog
+from dialogs import StartTimeDialog, EndTimeDialog, ResultDialog, LogViewerDialog, AllLogsViewerDialog, EditTimeDialog, SettingsDialog, ExportDialog, PivotDialog
 from session_manager import SessionManager
+from task_search import TaskSearchIndex
 from config_manager import ConfigManager
-from utils import format_timedelta
+from utils import format_seconds, from_epoch, to_epoch, get_app_data_dir
+from aggregation import build_day_summary
+from export import export_data
 
 class WorkManagementApp(tk.Tk):
     # Treeviewのカラム識別子を定数として定義
     COL_ACTION = "action"
     COL_TASK_NAME = "task_name"
     COL_LOG = "log"
+    # 台帳とDBの集計が一致しているかを確認する間隔
+    LEDGER_VERIFY_INTERVAL_MS = 5 * 60 * 1000
 
     def __init__(self, db_manager: DatabaseManager, app_state: AppState, session_manager: SessionManager, config_manager: ConfigManager):
         super().__init__()
@@ -22,19 +28,29 @@ class WorkManagementApp(tk.Tk):
         self.state = app_state
         self.session_manager = session_manager
         self.config_manager = config_manager
+        # DB処理はワーカーで実行し、結果だけをメインスレッドで受け取る
+        self.async_db = AsyncDatabase(self, db_manager, on_busy_change=self._on_busy_change)
 
         self.title("工数管理アプリ")
         self.geometry("900x500")
 
         # Treeviewの各行ウィジェットを管理するための辞書
         self.task_items: Dict[int, Any] = {}
+        # 各行に最後に表示した内容 (values, 計測中かどうか)。差分更新に使う
+        self.task_rows: Dict[int, Tuple[Tuple[str, ...], bool]] = {}
+        # 最後に読み込んだ全タスク (アーカイブ済みを含む、ID順)
+        self.tasks: List[Any] = []
+        # 合計時間とログはDBではなく、その日の台帳から表示する
+        self.ledger = self.state.day_ledger
+        # 工数名の絞り込み検索用のインデックス
+        self.search_index = TaskSearchIndex()
 
         self.create_widgets()
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     def create_widgets(self):
         # --- メインフレーム ---
-        self.grid_rowconfigure(1, weight=1)
+        self.grid_rowconfigure(2, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
         # --- 上部フレーム (ボタン類) ---
@@ -47,6 +63,12 @@ class WorkManagementApp(tk.Tk):
         show_logs_button = ttk.Button(top_frame, text="ログ一覧", command=self.show_all_logs)
         show_logs_button.pack(side=tk.LEFT, padx=5)
 
+        pivot_button = ttk.Button(top_frame, text="集計表", command=self.show_pivot)
+        pivot_button.pack(side=tk.LEFT, padx=5)
+
+        export_button = ttk.Button(top_frame, text="エクスポート", command=self.export_logs)
+        export_button.pack(side=tk.LEFT, padx=5)
+
         settings_button = ttk.Button(top_frame, text="設定", command=self.open_settings)
         settings_button.pack(side=tk.LEFT, padx=5)
 
@@ -62,9 +84,25 @@ class WorkManagementApp(tk.Tk):
         end_business_button = ttk.Button(top_frame, text="業務終了", command=self.end_business)
         end_business_button.pack(side=tk.RIGHT) # 業務終了ボタンは右端のまま
 
+        # DB処理の実行中に表示するラベル
+        self.status_label = ttk.Label(top_frame, text="", foreground="gray")
+        self.status_label.pack(side=tk.RIGHT, padx=(0, 10))
+
+        # --- 検索フレーム ---
+        search_frame = ttk.Frame(self, padding=(10, 10, 10, 0))
+        search_frame.grid(row=1, column=0, sticky="ew")
+
+        ttk.Label(search_frame, text="検索:").pack(side=tk.LEFT)
+        # 入力のたびに工数名で行を絞り込む
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *_: self.refresh_task_rows())
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=40)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Escape>", lambda event: self.search_var.set(""))
+
         # --- Treeview用フレーム ---
         tree_frame = ttk.Frame(self, padding=(10, 10, 10, 10))
-        tree_frame.grid(row=1, column=0, sticky="nsew")
+        tree_frame.grid(row=2, column=0, sticky="nsew")
 
         # --- Treeview (タスク一覧) ---
         columns = (self.COL_TASK_NAME, self.COL_ACTION, "total_time", self.COL_LOG)
@@ -86,50 +124,156 @@ class WorkManagementApp(tk.Tk):
         self.tree.pack(side="left", fill=tk.BOTH, expand=True)
 
         self.tree.bind("<Double-1>", self.on_task_double_click)
+        self.tree.bind("<Button-3>", self.show_task_menu)
         self.load_tasks()
+        self.after(self.LEDGER_VERIFY_INTERVAL_MS, self._verify_ledger)
+
+    def _on_busy_change(self, busy: bool):
+        """DB処理の実行状態に合わせて、読み込み中の表示を切り替える"""
+        self.status_label.config(text="読み込み中..." if busy else "")
+        self.config(cursor="watch" if busy else "")
 
     def load_tasks(self):
-        """データベースからタスクとログを読み込み、集計してTreeviewに表示する"""
-        # 既存の表示をクリア
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        self.task_items.clear()
-
-        # その日の完了したログを取得
-        logs = self.db.get_logs_for_day(self.state.work_day_id)
-
-        # タスクごとにログを集計
-        task_summary: Dict[int, Dict[str, Any]] = {}
-        for log in logs:
-            task_id = log['task_id']
-            if task_id not in task_summary:
-                task_summary[task_id] = {'total_duration': timedelta(), 'log_texts': []}
-
-            start_time = datetime.fromisoformat(log['start_time'])
-            end_time = datetime.fromisoformat(log['end_time'])
-            duration = end_time - start_time
-            task_summary[task_id]['total_duration'] += duration
-
-            log_text = f"{start_time.strftime('%H:%M')}~{end_time.strftime('%H:%M')}"
-            task_summary[task_id]['log_texts'].append(log_text)
-
-        # 全てのタスクをTreeviewに表示
-        tasks = self.db.get_all_tasks()
-        for task in tasks:
-            task_id = task['id']
-            summary = task_summary.get(task_id)
-
-            total_hours = (summary['total_duration'].total_seconds() / 3600) if summary else 0.0
-            log_str = ", ".join(summary['log_texts']) if summary else ""
-
-            # Treeviewにアイテムを追加
-            values = (task[self.COL_TASK_NAME], "Start", f"{total_hours:.1f}h", log_str)
-            item_id = self.tree.insert("", tk.END, values=values, tags=(str(task_id),))
-            self.task_items[task_id] = item_id
-        
-        # 復元されたセッションがあればUIに反映
-        if self.state.current_task_id:
-            self.update_task_ui_for_start(self.state.current_task_id)
+        """
+        データベースからタスクを非同期に読み込み、Treeviewに表示する。
+        その日のログは台帳が未読み込みの場合だけ読み込む。
+        """
+        load_logs = not self.ledger.loaded or self.ledger.work_day_id != self.state.work_day_id
+        # 連続して呼ばれた場合は、最後の読み込み結果だけを表示する
+        self.async_db.read(self._fetch_task_rows, self.state.work_day_id, load_logs, on_success=self._populate_tasks, key="load_tasks")
+
+    def _fetch_task_rows(self, work_day_id: int, load_logs: bool):
+        """[ワーカースレッド] 全タスクと、必要であればその日の完了したログを取得する"""
+        return work_day_id, self.db.get_all_tasks(), (self.db.get_logs_for_day(work_day_id) if load_logs else None)
+
+    def _populate_tasks(self, result):
+        """読み込んだタスク(とログ)を保持し、Treeviewに反映する"""
+        work_day_id, tasks, logs = result
+        self.tasks = tasks
+        if logs is not None:
+            self.ledger.load(work_day_id, logs)
+        # 検索はアーカイブ済みの工数も含めたすべての工数が対象
+        self.search_index.sync((task.id, task.task_name) for task in self.tasks)
+        self.refresh_task_rows()
+
+    def refresh_task_rows(self):
+        """
+        保持しているタスクと台帳の内容をTreeviewに反映する。
+
+        行を持つのは作業中の工数(アーカイブされておらず、ピン留めされているか最近使われたもの)と、
+        検索に一致した工数だけで、それ以外の工数の行は作らない。
+        検索で一致しない作業中の工数の行は作り直さずにTreeviewから切り離し(detach)、一致すれば元の順序で戻す(move)。
+        表示内容が変わった行だけを更新するため、選択状態とスクロール位置はそのまま保たれる。
+        """
+        matches = self.search_index.search(self.search_var.get())
+        active_days = self.config_manager.get('active_task_days', 30)
+        used_since = to_epoch(datetime.now() - timedelta(days=active_days))
+
+        visible_ids = set()
+        row_ids = set()
+        for task in self.tasks:
+            working = task.is_active(used_since)
+            # 計測中の工数は、Stopできるよう常に表示する
+            if task.id == self.state.current_task_id or (task.id in matches if matches is not None else working):
+                visible_ids.add(task.id)
+                row_ids.add(task.id)
+            elif working:
+                row_ids.add(task.id)
+
+        # 削除された工数や、表示しなくなった工数の行を取り除く
+        for task_id in [task_id for task_id in self.task_items if task_id not in row_ids]:
+            self.tree.delete(self.task_items.pop(task_id))
+            self.task_rows.pop(task_id, None)
+
+        # タスクはID順に並べる
+        index = 0
+        for task in self.tasks:
+            task_id = task.id
+            if task_id not in row_ids:
+                continue
+            measuring = self.state.current_task_id == task_id
+            values = self._task_row_values(task_id, task.task_name, measuring)
+            if task_id in self.task_items:
+                self._set_task_row(task_id, values, measuring)
+            else:
+                # Treeviewにアイテムを追加
+                self.task_items[task_id] = self.tree.insert("", index, values=values, tags=self._task_row_tags(task_id, measuring))
+                self.task_rows[task_id] = (values, measuring)
+
+            if task_id in visible_ids:
+                self.tree.move(self.task_items[task_id], "", index)
+                index += 1
+            else:
+                self.tree.detach(self.task_items[task_id])
+
+    def _task_row_values(self, task_id: int, task_name: str, measuring: bool) -> Tuple[str, ...]:
+        """台帳から1行分の表示内容を作る"""
+        total_hours = self.ledger.total_seconds(task_id) / 3600
+        return (task_name, "Stop" if measuring else "Start", f"{total_hours:.1f}h", self.ledger.log_text(task_id))
+
+    def _verify_ledger(self):
+        """
+        台帳とDBの集計(daily_task_totals)が一致しているかを定期的に確認する。
+        食い違いがあれば台帳をDBから読み込み直す。
+        """
+        work_day_id = self.state.work_day_id
+        version = self.ledger.version
+
+        def on_loaded(task_totals):
+            # 確認中にタスクの開始/終了が記録された場合は、次回の確認に回す
+            if self.async_db.is_pending("task_action") or self.ledger.version != version:
+                return
+            drifted = self.ledger.find_drift(task_totals)
+            if drifted:
+                print(f"台帳とDBの集計が一致しません (task_id: {drifted})。台帳を読み込み直します。")
+                self.ledger.loaded = False
+                self.load_tasks()
+
+        if self.ledger.loaded:
+            self.async_db.read(self.db.get_daily_task_totals, work_day_id, on_success=on_loaded, key="verify_ledger")
+        self.after(self.LEDGER_VERIFY_INTERVAL_MS, self._verify_ledger)
+
+    def _task_row_tags(self, task_id: int, measuring: bool) -> Tuple[str, ...]:
+        """行のタグ。先頭は常にタスクIDで、計測中の行には背景色用のタグを付ける"""
+        return (str(task_id), "measuring") if measuring else (str(task_id),)
+
+    def _set_task_row(self, task_id: int, values: Tuple[str, ...], measuring: bool):
+        """1行分の表示を更新する。前回と同じ内容であれば何もしない"""
+        item_id = self.task_items.get(task_id)
+        if not item_id or self.task_rows.get(task_id) == (values, measuring):
+            return
+        self.tree.item(item_id, values=values, tags=self._task_row_tags(task_id, measuring))
+        self.task_rows[task_id] = (values, measuring)
+
+    def show_task_menu(self, event):
+        """行の右クリックで、ピン留めとアーカイブを切り替えるメニューを表示する"""
+        item_id = self.tree.identify_row(event.y)
+        if not item_id:
+            return
+        self.tree.selection_set(item_id)
+        task_id = int(self.tree.item(item_id, "tags")[0])
+        task = next((task for task in self.tasks if task.id == task_id), None)
+        if task is None:
+            return
+
+        menu = tk.Menu(self, tearoff=0)
+        menu.add_command(label="ピン留めを外す" if task.pinned else "ピン留めする",
+                         command=lambda: self.set_task_flag(task, 'pinned', not task.pinned))
+        menu.add_command(label="アーカイブを解除" if task.archived else "アーカイブする",
+                         command=lambda: self.set_task_flag(task, 'archived', not task.archived))
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def set_task_flag(self, task, flag: str, value: bool):
+        """工数のピン留め(pinned)またはアーカイブ(archived)を切り替える"""
+        def on_updated(updated: bool):
+            if updated:
+                setattr(task, flag, value)
+                self.refresh_task_rows()
+            else:
+                messagebox.showerror("更新失敗", f"工数 '{task.task_name}' を更新できませんでした。")
+
+        update = self.db.set_task_pinned if flag == 'pinned' else self.db.set_task_archived
+        self.async_db.write(update, task.id, value, on_success=on_updated)
 
     def on_task_double_click(self, event):
         """Treeviewの行がダブルクリックされたときの処理"""
@@ -164,21 +308,19 @@ class WorkManagementApp(tk.Tk):
 
     def show_log_details(self, task_id: int, task_name: str):
         """指定されたタスクのログ詳細をポップアップで表示する"""
-        logs_from_db = self.db.get_logs_for_task_on_day(self.state.work_day_id, task_id)
-        
-        formatted_logs = []
-        for log in logs_from_db:
-            if log['end_time']: # 完了したログのみ表示
-                start_time = datetime.fromisoformat(log['start_time'])
-                end_time = datetime.fromisoformat(log['end_time'])
-                duration = end_time - start_time
-                formatted_logs.append({
-                    'start': start_time.strftime('%H:%M:%S'),
-                    'end': end_time.strftime('%H:%M:%S'),
-                    'duration': format_timedelta(duration)
-                })
-        
-        LogViewerDialog(self, task_name, formatted_logs)
+        def on_loaded(logs_from_db):
+            formatted_logs = []
+            for log in logs_from_db:
+                if log.end_time: # 完了したログのみ表示
+                    formatted_logs.append({
+                        'start': from_epoch(log.start_time).strftime('%H:%M:%S'),
+                        'end': from_epoch(log.end_time).strftime('%H:%M:%S'),
+                        'duration': format_seconds(log.end_time - log.start_time)
+                    })
+
+            LogViewerDialog(self, task_name, formatted_logs)
+
+        self.async_db.read(self.db.get_logs_for_task_on_day, self.state.work_day_id, task_id, on_success=on_loaded, key="log_details")
 
     def edit_task_name(self, item_id: str):
         """Treeviewのタスク名をインプレースで編集する。"""
@@ -208,10 +350,21 @@ class WorkManagementApp(tk.Tk):
             
             if new_name and new_name != current_name:
                 task_id = int(self.tree.item(item_id, "tags")[0])
-                if self.db.update_task(task_id, new_name):
-                    self.tree.set(item_id, self.COL_TASK_NAME, new_name)
-                else:
-                    messagebox.showerror("更新失敗", f"工数名 '{new_name}' は既に存在するか、更新できませんでした。")
+
+                def on_updated(updated: bool):
+                    if updated:
+                        values, measuring = self.task_rows.get(task_id, ((), False))
+                        if values:
+                            self._set_task_row(task_id, (new_name,) + values[1:], measuring)
+                        # 保持しているタスクと検索インデックスにも新しい名前を反映する
+                        for task in self.tasks:
+                            if task.id == task_id:
+                                task.task_name = new_name
+                        self.search_index.add(task_id, new_name)
+                    else:
+                        messagebox.showerror("更新失敗", f"工数名 '{new_name}' は既に存在するか、更新できませんでした。")
+
+                self.async_db.write(self.db.update_task, task_id, new_name, on_success=on_updated)
             # もし名前が変わっていなくても、UIを元に戻すために何もしない
 
         def on_cancel(event=None):
@@ -225,12 +378,36 @@ class WorkManagementApp(tk.Tk):
 
     def show_all_logs(self):
         """すべての作業ログを閲覧するダイアログを表示する"""
-        all_logs = self.db.get_all_completed_logs()
-        AllLogsViewerDialog(self, all_logs)
+        # ログはダイアログ側で必要な分だけ非同期に読み込む
+        AllLogsViewerDialog(self, self.async_db)
         
+    def show_pivot(self):
+        """工数×期間の集計表を表示するダイアログを表示する"""
+        PivotDialog(self, self.async_db)
+
+    def export_logs(self):
+        """ログや集計をファイルに書き出す"""
+        dialog = ExportDialog(self)
+        options = dialog.result
+        if not options:
+            return
+
+        def on_exported(count):
+            if count is None:
+                messagebox.showerror("エラー", "エクスポートに失敗しました。")
+                return
+            messagebox.showinfo("エクスポート", f"{count}行を書き出しました。\n{options['path']}")
+
+        # 件数が多いと時間がかかるため、読み取り用のスレッドで書き出す
+        break_time_minutes = self.config_manager.get('break_time_minutes', 60)
+        self.async_db.read(export_data, self.db, options['path'], options['kind'], options['fmt'],
+                           options['date_from'], options['date_to'], break_time_minutes, on_success=on_exported)
+
     def open_settings(self):
         """設定ダイアログを開く"""
         SettingsDialog(self, self.config_manager)
+        # 作業中とみなす日数が変わった場合に備えて表示を更新する
+        self.refresh_task_rows()
 
     def edit_business_start_time(self):
         """業務開始時刻を編集するダイアログを表示する"""
@@ -245,7 +422,7 @@ class WorkManagementApp(tk.Tk):
             # 状態を更新
             self.state.business_start_time = new_time
             # DBを更新
-            self.db.update_work_day_start_time(self.state.work_day_id, new_time)
+            self.async_db.write(self.db.update_work_day_start_time, self.state.work_day_id, new_time)
             # UIラベルを更新
             self.start_time_label.config(text=f"業務開始: {new_time.strftime('%H:%M:%S')}")
             # セッションを保存
@@ -255,14 +432,20 @@ class WorkManagementApp(tk.Tk):
         """新しい工数を追加するポップアップを表示"""
         task_name = simpledialog.askstring("工数追加", "新しい工数名を入力してください:", parent=self)
         if task_name:
-            new_id = self.db.add_task(task_name)
-            if new_id:
-                self.load_tasks() # Treeviewを再読み込み
-            else:
-                messagebox.showwarning("追加失敗", f"工数 '{task_name}' は既に存在します。")
+            def on_added(new_id):
+                if new_id:
+                    self.load_tasks() # Treeviewを再読み込み
+                else:
+                    messagebox.showwarning("追加失敗", f"工数 '{task_name}' は既に存在します。")
+
+            self.async_db.write(self.db.add_task, task_name, on_success=on_added)
 
     def start_task(self, task_id: int, task_name: str):
         """タスク開始処理"""
+        # 直前の開始/終了の記録がまだ終わっていなければ何もしない
+        if self.async_db.is_pending("task_action"):
+            return
+
         # 他のタスクが実行中か確認
         if self.state.current_task_id is not None:
             messagebox.showwarning("確認", "他のタスクが実行中です。先に終了してください。")
@@ -272,98 +455,139 @@ class WorkManagementApp(tk.Tk):
         dialog = StartTimeDialog(self, task_name)
         start_time = dialog.start_time
 
-        if start_time:
-            # --- 業務開始時刻の更新ロジック ---
-            # 業務開始時刻はアプリ起動時に記録されるため、ここでは何もしない
+        if not start_time:
+            return
 
-            # 1. データベースに時間ログを開始したことを記録
-            log_id = self.db.start_time_log(self.state.work_day_id, task_id, start_time)
+        # --- 業務開始時刻の更新ロジック ---
+        # 業務開始時刻はアプリ起動時に記録されるため、ここでは何もしない
 
-            if log_id:
-                # 2. アプリケーションの状態を更新
-                self.state.start_task(task_id, task_name, start_time, log_id)
+        def record():
+            def on_logged(log_id):
+                if log_id:
+                    # 2. アプリケーションの状態を更新
+                    self.state.start_task(task_id, task_name, start_time, log_id)
+                    self.ledger.start_log(log_id, task_id, to_epoch(start_time))
 
-                # 3. UIを更新
-                self.update_task_ui_for_start(task_id)
+                    # 3. UIを更新
+                    self.update_task_ui_for_start(task_id)
 
-                # 4. セッションを保存
-                self.session_manager.save_session(self.state.to_dict())
-            else:
-                messagebox.showerror("エラー", "データベースへのログ記録に失敗しました。")
+                    # 4. セッションを保存
+                    self.session_manager.save_session(self.state.to_dict())
+                else:
+                    messagebox.showerror("エラー", "データベースへのログ記録に失敗しました。")
+
+            # 1. データベースに時間ログを開始したことを記録
+            self.async_db.write(self.db.start_time_log, self.state.work_day_id, task_id, start_time, on_success=on_logged, key="task_action")
+
+        # 開始時刻から現在までに、記録済みのログと重なっていないか確かめてから記録する
+        self._confirm_no_overlap(start_time, max(start_time, datetime.now()), None, record)
 
     def update_task_ui_for_start(self, task_id: int):
         """タスク開始時のUI更新"""
-        item_id = self.task_items.get(task_id)
-        if not item_id:
+        values, _ = self.task_rows.get(task_id, ((), False))
+        if not values:
             return
 
-        # アクション列のテキストを更新
-        self.tree.set(item_id, self.COL_ACTION, "Stop")
-
-        # 背景色を変更するためのタグを追加
-        self.tree.item(item_id, tags=self.tree.item(item_id, "tags") + ("measuring",))
+        # アクション列のテキストを更新し、背景色を変更するためのタグを追加
+        self._set_task_row(task_id, (values[0], "Stop") + values[2:], True)
 
     def end_business(self):
         """業務終了処理"""
         # 画面6（業務終了確認）
         if messagebox.askyesno("業務終了", "本日の業務を終了しますか？"):
             business_end_time = datetime.now()
-            self.db.update_work_day_end_time(self.state.work_day_id, business_end_time)
-
-            # 設定から休憩時間を取得
-            break_minutes = self.config_manager.get('break_time_minutes', 60)
-            # サマリーデータをDBManagerから取得
-            summary_data = self.db.get_summary_for_day(
-                self.state.work_day_id,
-                self.state.business_start_time,
-                business_end_time,
-                break_minutes
-            )
-
-            # 表示用に開始・終了時刻をサマリーデータに追加
-            summary_data['business_start_time_str'] = self.state.business_start_time.strftime('%H:%M')
-            summary_data['business_end_time_str'] = business_end_time.strftime('%H:%M')
-
-            # 画面7（リザルト画面）を表示
-            ResultDialog(self, summary_data)
-            self.on_closing()
+
+            def on_end_time_saved(saved):
+                # 設定から休憩時間を取得
+                break_minutes = self.config_manager.get('break_time_minutes', 60)
+                # サマリーはDBを再集計せずに台帳から作る
+                task_names = {task.id: task.task_name for task in self.tasks}
+                summary_data = build_day_summary(
+                    [(task_names.get(task_id, ""), seconds) for task_id, seconds in self.ledger.task_totals().items()],
+                    self.state.business_start_time,
+                    business_end_time,
+                    break_minutes
+                )
+                # 表示用に開始・終了時刻をサマリーデータに追加
+                summary_data['business_start_time_str'] = self.state.business_start_time.strftime('%H:%M')
+                summary_data['business_end_time_str'] = business_end_time.strftime('%H:%M')
+
+                # 画面7（リザルト画面）を表示
+                ResultDialog(self, summary_data)
+                self.on_closing()
+
+            self.async_db.write(self.db.update_work_day_end_time, self.state.work_day_id, business_end_time, on_success=on_end_time_saved)
 
     def end_task(self, task_id: int):
         """タスク終了処理"""
+        # 直前の開始/終了の記録がまだ終わっていなければ何もしない
+        if self.async_db.is_pending("task_action"):
+            return
+
         # 画面5（終了時刻確認ポップアップ）を表示
         dialog = EndTimeDialog(self, self.state.current_task_name)
         end_time = dialog.end_time
 
         if end_time:
-            # 1. データベースのログを更新
-            self.db.end_time_log(self.state.current_log_id, end_time)
+            log_id = self.state.current_log_id
+            start_time = self.state.current_task_start_time
 
-            # 2. UIを更新
-            self.update_task_ui_for_end(task_id)
+            def on_logged(ended: bool):
+                if not ended:
+                    messagebox.showerror("エラー", "データベースへのログ記録に失敗しました。")
+                    return
 
-            # 3. アプリケーションの状態をリセット
-            self.state.end_task()
-            
-            # 4. セッションファイルをクリア
-            self.session_manager.save_session(self.state.to_dict())
+                # 2. 台帳に反映 (DBの再読み込みは不要)
+                self.ledger.update_log(log_id, task_id, to_epoch(start_time), to_epoch(end_time))
+
+                # 3. アプリケーションの状態をリセット
+                self.state.end_task()
 
-            # 4. Treeviewを再読み込みして合計時間とログを更新
-            self.load_tasks()
+                # 4. UIを更新 (合計時間とログも台帳から更新される)
+                self.update_task_ui_for_end(task_id)
+
+                # 5. セッションファイルをクリア
+                self.session_manager.save_session(self.state.to_dict())
+
+            if end_time < start_time:
+                messagebox.showerror("エラー", f"終了時刻が開始時刻 ({start_time:%H:%M}) より前です。")
+                return
+
+            def record():
+                # 1. データベースのログを更新
+                self.async_db.write(self.db.end_time_log, log_id, end_time, on_success=on_logged, key="task_action")
+
+            # 記録済みの他のログと時間帯が重なっていないか確かめてから記録する
+            self._confirm_no_overlap(start_time, end_time, log_id, record)
+
+    def _confirm_no_overlap(self, start_time: datetime, end_time: datetime, exclude_log_id: Optional[int], on_confirmed):
+        """
+        指定した時間帯と重なる記録済みのログがあれば、記録を続けるか確認してから on_confirmed を呼ぶ。
+        重なりがなければ確認せずに on_confirmed を呼ぶ。
+        """
+        def on_checked(overlaps):
+            if overlaps:
+                lines = [f"・{log.task_name} ({from_epoch(log.start_time):%m/%d %H:%M} ~ {from_epoch(log.end_time):%H:%M})"
+                         for log in overlaps[:5]]
+                if len(overlaps) > 5:
+                    lines.append(f"ほか {len(overlaps) - 5} 件")
+                message = "次のログと時間帯が重なっています。\n" + "\n".join(lines) + "\n\nこのまま記録しますか？"
+                if not messagebox.askyesno("確認", message):
+                    return
+            on_confirmed()
+
+        # 重なりの確認中も「記録中」として扱い、ボタンの連打で二重に記録されないようにする
+        self.async_db.read(self.db.find_overlapping_logs, start_time, end_time, exclude_log_id,
+                           on_success=on_checked, key="task_action")
 
     def update_task_ui_for_end(self, task_id: int):
         """タスク終了時のUI更新"""
-        item_id = self.task_items.get(task_id)
-        if not item_id:
+        values, _ = self.task_rows.get(task_id, ((), False))
+        if not values:
             return
 
-        # アクションを元に戻す
-        self.tree.set(item_id, self.COL_ACTION, "Start")
-        
-        # 背景色を元に戻すためにタグを削除
-        current_tags = list(self.tree.item(item_id, "tags"))
-        if "measuring" in current_tags:
-            current_tags.remove("measuring")
-            self.tree.item(item_id, tags=tuple(current_tags))
+        # アクションを元に戻し、背景色を元に戻すためにタグを削除
+        self._set_task_row(task_id, self._task_row_values(task_id, values[0], False), False)
 
 
     def on_closing(self):
@@ -372,21 +596,14 @@ class WorkManagementApp(tk.Tk):
             # 正常終了時はセッションをクリアする
             self.session_manager.save_session(self.state.to_dict())
 
-        self.db.close()
+        self.async_db.close()
+        self.db.close() # キューに残っている書き込みは完了を待ってから閉じる
         self.destroy()
 
 if __name__ == "__main__":
-    from pathlib import Path
-    import os
-
-    # データベースの保存先を AppData/Roaming に設定します。
-    # これはアプリケーションがデータを保存するための標準的な場所です。
-    # os.getenv('APPDATA') は 'C:\Users\ユーザー名\AppData\Roaming' を指します。
-    app_data_dir = Path(os.getenv('APPDATA', Path.home() / 'Documents')) / "WorkManagementApp"
-    
-    # データ保存用フォルダがなければ作成します。
-    app_data_dir.mkdir(exist_ok=True)
-    
+    # データベースなどの保存先 (AppData/Roaming/WorkManagementApp)。CLIと共通
+    app_data_dir = get_app_data_dir()
+
     db_path = app_data_dir / "work_management.db"
     session_path = app_data_dir / "session.json"
     config_path = app_data_dir / "config.json"
@@ -409,9 +626,9 @@ if __name__ == "__main__":
         db_manager.update_work_day_start_time(work_day_id, app_state.business_start_time)
     else:
         # 今日のレコードがあれば、その情報(IDと開始時刻)でAppStateを初期化
-        app_state.work_day_id = today_work_day_record['id']
-        if today_work_day_record['start_time']:
-            app_state.business_start_time = datetime.fromisoformat(today_work_day_record['start_time'])
+        app_state.work_day_id = today_work_day_record.id
+        if today_work_day_record.start_time:
+            app_state.business_start_time = from_epoch(today_work_day_record.start_time)
 
     # 3. セッションファイルを読み込み、今日の日付のデータであれば状態を復元
     session_data = session_manager.load_session()
@@ -426,17 +643,17 @@ if __name__ == "__main__":
     #     yesterday = date.today() - timedelta(days=1)
     #     yesterday_work_day = db_manager.get_work_day_by_date(yesterday)
 
-    #     if yesterday_work_day and yesterday_work_day['end_time']:
+    #     if yesterday_work_day and yesterday_work_day.end_time:
     #         try:
-    #             start_time_val = yesterday_work_day['start_time']
-    #             end_time_val = yesterday_work_day['end_time']
+    #             start_time_val = yesterday_work_day.start_time
+    #             end_time_val = yesterday_work_day.end_time
 
     #             if start_time_val and end_time_val:
-    #                 start_time = datetime.fromisoformat(start_time_val)
-    #                 end_time = datetime.fromisoformat(end_time_val)
+    #                 start_time = from_epoch(start_time_val)
+    #                 end_time = from_epoch(end_time_val)
                     
     #                 break_minutes = config_manager.get('break_time_minutes', 60)
-    #                 summary_data = db_manager.get_summary_for_day(yesterday_work_day['id'], start_time, end_time, break_minutes)
+    #                 summary_data = db_manager.get_summary_for_day(yesterday_work_day.id, start_time, end_time, break_minutes)
                     
     #                 # 表示用に開始・終了時刻をサマリーデータに追加
     #                 summary_data['business_start_time_str'] = start_time.strftime('%H:%M')
@@ -460,10 +677,10 @@ if __name__ == "__main__":
     # 5. アプリケーションのUIを初期化
     app = WorkManagementApp(db_manager, app_state, session_manager, config_manager)
 
-    # 6. UIのラベルに業務開始時刻を反映させ、タスクリストを読み込む
+    # 6. UIのラベルに業務開始時刻を反映させる
+    # (タスクリストは create_widgets で復元済みの状態をもとに読み込まれる)
     if app.state.business_start_time:
         start_time_str = app.state.business_start_time.strftime('%H:%M:%S')
         app.start_time_label.config(text=f"業務開始: {start_time_str}")
-    app.load_tasks()
 
     app.mainloop()
\ No newline at end of file
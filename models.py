@@ -0,0 +1,199 @@
+from typing import Optional, Dict, Any, Tuple
+
+class _Model:
+    """
+    DBの行を表す値クラスの基底クラス。
+
+    各クラスは __slots__ で属性を固定しているため、sqlite3.Row や辞書よりも1件あたりのメモリが少なく、
+    属性アクセスも速い。DatabaseManager はカーソルの row_factory に row_factory() を指定して、
+    クエリ結果から直接インスタンスを作る。そのため SELECT のカラム順は __slots__ の順に合わせること。
+    """
+    __slots__ = ()
+
+    @classmethod
+    def row_factory(cls, cursor, row: Tuple[Any, ...]):
+        """sqlite3のrow_factoryとして使う。行をそのままコンストラクタに渡す。"""
+        return cls(*row)
+
+    def copy(self):
+        """同じ値を持つ別のインスタンスを返す。"""
+        return type(self)(*(getattr(self, name) for name in self.__slots__))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """属性を辞書に変換する。"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class Task(_Model):
+    """
+    工数（tasksテーブルの行）。
+    archived はアーカイブ済み、pinned はピン留め、last_used_at は最後に計測を開始した時刻(エポック秒)。
+    """
+    __slots__ = ('id', 'task_name', 'archived', 'pinned', 'last_used_at')
+
+    def __init__(self, id: int, task_name: str, archived: bool = False, pinned: bool = False, last_used_at: Optional[int] = None):
+        self.id = id
+        self.task_name = task_name
+        self.archived = bool(archived)
+        self.pinned = bool(pinned)
+        self.last_used_at = last_used_at
+
+    def is_active(self, used_since: int) -> bool:
+        """
+        メイン画面に常に表示する作業中の工数かどうかを返す。
+        アーカイブされておらず、ピン留めされているか used_since(エポック秒) 以降に使われたもの。
+        """
+        if self.archived:
+            return False
+        return self.pinned or (self.last_used_at is not None and self.last_used_at >= used_since)
+
+class WorkDay(_Model):
+    """業務日（work_daysテーブルの行）。時刻はエポック秒。"""
+    __slots__ = ('id', 'work_date', 'start_time', 'end_time')
+
+    def __init__(self, id: int, work_date: str, start_time: Optional[int], end_time: Optional[int]):
+        self.id = id
+        self.work_date = work_date
+        self.start_time = start_time
+        self.end_time = end_time
+
+class TimeLog(_Model):
+    """時間ログ（time_logsテーブルの行）。時刻はエポック秒で、end_timeがNoneのものは計測中。"""
+    __slots__ = ('id', 'work_day_id', 'task_id', 'start_time', 'end_time')
+
+    def __init__(self, id: int, work_day_id: int, task_id: int, start_time: int, end_time: Optional[int]):
+        self.id = id
+        self.work_day_id = work_day_id
+        self.task_id = task_id
+        self.start_time = start_time
+        self.end_time = end_time
+
+    @property
+    def duration_seconds(self) -> int:
+        """作業時間の秒数。計測中の場合は0。"""
+        return self.end_time - self.start_time if self.end_time is not None else 0
+
+class CompletedLog(_Model):
+    """完了した時間ログに、業務日と工数名を付けたもの。"""
+    __slots__ = ('id', 'work_day_id', 'task_id', 'work_date', 'task_name',
+                 'business_start_time', 'business_end_time', 'start_time', 'end_time')
+
+    def __init__(self, id: int, work_day_id: int, task_id: int, work_date: str, task_name: str,
+                 business_start_time: Optional[int], business_end_time: Optional[int], start_time: int, end_time: int):
+        self.id = id
+        self.work_day_id = work_day_id
+        self.task_id = task_id
+        self.work_date = work_date
+        self.task_name = task_name
+        self.business_start_time = business_start_time
+        self.business_end_time = business_end_time
+        self.start_time = start_time
+        self.end_time = end_time
+
+    @property
+    def duration_seconds(self) -> int:
+        """作業時間の秒数。"""
+        return self.end_time - self.start_time
+
+class TaskTotal(_Model):
+    """業務日×工数ごとの完了したログの集計（daily_task_totalsテーブルの行に業務日と工数名を付けたもの）。"""
+    __slots__ = ('work_day_id', 'work_date', 'business_start_time', 'business_end_time',
+                 'task_id', 'task_name', 'total_seconds', 'log_count')
+
+    def __init__(self, work_day_id: int, work_date: str, business_start_time: Optional[int], business_end_time: Optional[int],
+                 task_id: int, task_name: str, total_seconds: int, log_count: int):
+        self.work_day_id = work_day_id
+        self.work_date = work_date
+        self.business_start_time = business_start_time
+        self.business_end_time = business_end_time
+        self.task_id = task_id
+        self.task_name = task_name
+        self.total_seconds = total_seconds
+        self.log_count = log_count
+
+class TaskLogSummary(_Model):
+    """1日分の工数ごとの集計と、表示用のログ文字列 ("HH:MM~HH:MM, ...")。"""
+    __slots__ = ('task_id', 'task_name', 'total_seconds', 'log_count', 'log_texts')
+
+    def __init__(self, task_id: int, task_name: str, total_seconds: int, log_count: int, log_texts: str):
+        self.task_id = task_id
+        self.task_name = task_name
+        self.total_seconds = total_seconds
+        self.log_count = log_count
+        self.log_texts = log_texts
+
+class DayTotal(_Model):
+    """業務日ごとの完了したログの集計。"""
+    __slots__ = ('work_day_id', 'work_date', 'business_start_time', 'business_end_time', 'total_seconds', 'log_count')
+
+    def __init__(self, work_day_id: int, work_date: str, business_start_time: Optional[int], business_end_time: Optional[int],
+                 total_seconds: int, log_count: int):
+        self.work_day_id = work_day_id
+        self.work_date = work_date
+        self.business_start_time = business_start_time
+        self.business_end_time = business_end_time
+        self.total_seconds = total_seconds
+        self.log_count = log_count
+
+class TaskPeriodTotal(_Model):
+    """期間内の工数ごとの完了したログの集計。day_count は作業した業務日の数。"""
+    __slots__ = ('task_id', 'task_name', 'day_count', 'total_seconds', 'log_count')
+
+    def __init__(self, task_id: int, task_name: str, day_count: int, total_seconds: int, log_count: int):
+        self.task_id = task_id
+        self.task_name = task_name
+        self.day_count = day_count
+        self.total_seconds = total_seconds
+        self.log_count = log_count
+
+class PeriodTotal(_Model):
+    """
+    週・月などの期間ごとの集計。
+    net_work_seconds と other_seconds は業務の開始・終了時刻がそろった日(business_day_count日)だけの合計。
+    """
+    __slots__ = ('period', 'day_count', 'business_day_count', 'net_work_seconds', 'total_seconds', 'other_seconds', 'log_count')
+
+    def __init__(self, period: str, day_count: int, business_day_count: int, net_work_seconds: int,
+                 total_seconds: int, other_seconds: int, log_count: int):
+        self.period = period
+        self.day_count = day_count
+        self.business_day_count = business_day_count
+        self.net_work_seconds = net_work_seconds
+        self.total_seconds = total_seconds
+        self.other_seconds = other_seconds
+        self.log_count = log_count
+
+class PeriodTaskTotal(_Model):
+    """期間×工数ごとの集計。"""
+    __slots__ = ('period', 'task_name', 'day_count', 'total_seconds', 'log_count')
+
+    def __init__(self, period: str, task_name: str, day_count: int, total_seconds: int, log_count: int):
+        self.period = period
+        self.task_name = task_name
+        self.day_count = day_count
+        self.total_seconds = total_seconds
+        self.log_count = log_count
+
+class ArchiveStatus(_Model):
+    """
+    年ごとのアーカイブの状態（archive_statusテーブルの行）。
+    state は 'copying' (アーカイブファイルへのコピー中。中断した場合は再実行でやり直す) か 'archived' (移動済み)。
+    file_name はデータベースと同じフォルダにあるアーカイブファイルの名前、updated_at はエポック秒。
+    """
+    __slots__ = ('year', 'file_name', 'state', 'work_day_count', 'time_log_count', 'updated_at')
+
+    def __init__(self, year: int, file_name: str, state: str, work_day_count: int, time_log_count: int, updated_at: int):
+        self.year = year
+        self.file_name = file_name
+        self.state = state
+        self.work_day_count = work_day_count
+        self.time_log_count = time_log_count
+        self.updated_at = updated_at
@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable
+
+class ReadCache:
+    """
+    読み込み結果を保持する、件数上限つきのLRUキャッシュ。
+
+    キーにはDBの PRAGMA data_version を含めるため、DBが更新されると古いエントリは
+    二度と参照されなくなり、上限を超えた時点で古いものから捨てられる。
+    複数のスレッドから同時に呼び出してもよい。
+    """
+    def __init__(self, max_entries: int):
+        """
+        Args:
+            max_entries (int): 保持するエントリの最大数。0以下ならキャッシュしない。
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_call(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        keyのエントリがあればその値を、なければfuncを実行して結果を保存し、その値を返す。
+        funcはロックの外で実行するため、同じキーで同時に呼ばれた場合は両方が実行されることがある。
+        """
+        if self.max_entries <= 0:
+            return func()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = func()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """すべてのエントリを捨てる。ヒット数・ミス数はそのまま。"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット数、ミス数、現在のエントリ数を返す。"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -0,0 +1,187 @@
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple, Any
+
+from db_manager import DatabaseManager
+from aggregation import net_work_seconds, other_seconds
+from models import PeriodTotal, PeriodTaskTotal
+
+# 集計できる期間の単位 -> 表示名
+PERIODS = {
+    'week': '週別',
+    'month': '月別',
+    'year': '年別',
+    'all': '全期間',
+}
+
+# 1つのワーカーに渡す日数。これより短い範囲はワーカーを使わずにその場で集計する
+CHUNK_DAYS = 366
+
+def period_key(work_date: date, period: str) -> str:
+    """
+    日付が属する期間を表す文字列を返す。
+    日は 'YYYY-MM-DD'、週はISO 8601の週番号 ('2024-W05')、月は 'YYYY-MM'、年は 'YYYY'、全期間は 'all'。
+    """
+    if period == 'day':
+        return work_date.isoformat()
+    if period == 'week':
+        iso_year, iso_week, _ = work_date.isocalendar()
+        return f"{iso_year}-W{iso_week:02}"
+    if period == 'month':
+        return f"{work_date.year}-{work_date.month:02}"
+    if period == 'year':
+        return str(work_date.year)
+    if period == 'all':
+        return 'all'
+    raise ValueError(f"期間の単位 '{period}' には対応していません")
+
+def split_date_range(date_from: date, date_to: date, chunk_days: int) -> List[Tuple[date, date]]:
+    """[date_from, date_to] を chunk_days 日ずつの範囲(両端を含む)に分ける。"""
+    ranges = []
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=chunk_days - 1), date_to)
+        ranges.append((start, end))
+        start = end + timedelta(days=1)
+    return ranges
+
+def _aggregate_range(db_path: Path, date_from: date, date_to: date, period: str, break_time_minutes: int) -> Dict[str, Any]:
+    """
+    1つの日付範囲を集計する。ProcessPoolExecutor のワーカーで実行されるため、
+    自分で読み取り専用の接続を開き、結果はpickleできる辞書で返す。
+
+    Returns:
+        Dict[str, Any]: 'periods' (期間 -> [日数, 業務時間のそろった日数, 実働秒数, 工数合計秒数, その他秒数, 件数]) と
+            'tasks' ((期間, 工数名) -> [日数, 合計秒数, 件数])。
+    """
+    conn = DatabaseManager.connect_read_only(db_path)
+    try:
+        # アーカイブ済みの年はそのファイルもATTACHして読む
+        with DatabaseManager.attach_archives(conn, db_path, date_from, date_to) as schemas:
+            work_days = DatabaseManager.query_work_days(conn, date_from, date_to, schemas)
+            task_totals = DatabaseManager.query_task_totals(conn, date_from, date_to, schemas)
+    finally:
+        conn.close()
+
+    # 同じ日付の行が工数の数だけ続くため、日付ごとの期間をキャッシュする
+    period_keys: Dict[str, str] = {}
+    def key_for(work_date: str) -> str:
+        key = period_keys.get(work_date)
+        if key is None:
+            key = period_keys[work_date] = period_key(date.fromisoformat(work_date), period)
+        return key
+
+    # 業務日ごとの工数合計 (「その他」の計算に使う)。業務日のIDはアーカイブのファイルごとの値のため、日付で突き合わせる
+    day_totals: Dict[str, List[int]] = {}
+    tasks: Dict[Tuple[str, str], List[int]] = {}
+    for row in task_totals:
+        day_total = day_totals.setdefault(row.work_date, [0, 0])
+        day_total[0] += row.total_seconds
+        day_total[1] += row.log_count
+        task = tasks.setdefault((key_for(row.work_date), row.task_name), [0, 0, 0])
+        task[0] += 1
+        task[1] += row.total_seconds
+        task[2] += row.log_count
+
+    periods: Dict[str, List[int]] = {}
+    for work_day in work_days:
+        total_seconds, log_count = day_totals.get(work_day.work_date, (0, 0))
+        net = net_work_seconds(work_day.start_time, work_day.end_time, break_time_minutes)
+        if log_count == 0 and net is None:
+            continue # 業務時間もログもない日は数えない
+        totals = periods.setdefault(key_for(work_day.work_date), [0, 0, 0, 0, 0, 0])
+        totals[0] += 1
+        totals[3] += total_seconds
+        totals[5] += log_count
+        if net is not None:
+            # 実働時間と「その他」は get_summary_for_day と同じく、業務時間のそろった日ごとに計算して合計する
+            totals[1] += 1
+            totals[2] += net
+            totals[4] += other_seconds(net, total_seconds)
+    return {'periods': periods, 'tasks': tasks}
+
+def _merge(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """ワーカーごとの集計結果を足し合わせる。週のように範囲の境界をまたぐ期間も正しく合算される。"""
+    merged: Dict[str, Dict[Any, List[int]]] = {'periods': {}, 'tasks': {}}
+    for partial in partials:
+        for name, groups in partial.items():
+            target = merged[name]
+            for key, values in groups.items():
+                if key in target:
+                    target[key] = [a + b for a, b in zip(target[key], values)]
+                else:
+                    target[key] = list(values)
+    return merged
+
+class PeriodReport:
+    """
+    期間ごとの集計結果。
+    periods は期間の昇順の PeriodTotal、tasks は期間の昇順・工数名の昇順の PeriodTaskTotal。
+    """
+    def __init__(self, period: str, date_from: Optional[date], date_to: Optional[date],
+                 periods: List[PeriodTotal], tasks: List[PeriodTaskTotal]):
+        self.period = period
+        self.date_from = date_from
+        self.date_to = date_to
+        self.periods = periods
+        self.tasks = tasks
+
+    def tasks_for(self, period: str) -> List[PeriodTaskTotal]:
+        """指定した期間の工数ごとの集計を返す。"""
+        return [task for task in self.tasks if task.period == period]
+
+def generate_period_report(db: DatabaseManager, period: str = 'month', date_from: Optional[date] = None,
+                           date_to: Optional[date] = None, break_time_minutes: int = 60,
+                           workers: Optional[int] = None, chunk_days: int = CHUNK_DAYS) -> Optional[PeriodReport]:
+    """
+    週・月・年ごと、または全期間の、工数ごとの作業時間と実働時間・「その他」時間を集計する。
+
+    期間を chunk_days 日ずつに分け、各範囲を ProcessPoolExecutor のワーカープロセスで並列に集計してから
+    足し合わせる。各ワーカーは自分の読み取り専用の接続で daily_task_totals を読むため、
+    メインプロセスのDB接続やGILを共有しない。範囲が1つしかない場合や workers=1 の場合はその場で集計する。
+
+    Args:
+        db (DatabaseManager): 集計するデータベース。
+        period (str): 'week', 'month', 'year', 'all' のいずれか。
+        date_from (Optional[date]): 指定した場合はこの日付以降のみを対象とする。
+        date_to (Optional[date]): 指定した場合はこの日付以前のみを対象とする。
+        break_time_minutes (int): 1日あたりの休憩時間(分)。
+        workers (Optional[int]): ワーカープロセスの数。省略した場合はCPUの数。
+        chunk_days (int): 1つのワーカーに渡す日数。
+
+    Returns:
+        Optional[PeriodReport]: 集計結果。失敗した場合はNone。
+    """
+    if period not in PERIODS:
+        print(f"集計エラー: 期間の単位 '{period}' には対応していません")
+        return None
+
+    if date_from is None or date_to is None:
+        date_range = db.get_work_date_range()
+        if date_range is None:
+            return PeriodReport(period, date_from, date_to, [], [])
+        date_from = date_from or date_range[0]
+        date_to = date_to or date_range[1]
+    ranges = split_date_range(date_from, date_to, chunk_days)
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+
+    try:
+        if workers <= 1:
+            partials = [_aggregate_range(db.db_path, start, end, period, break_time_minutes) for start, end in ranges]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_aggregate_range, db.db_path, start, end, period, break_time_minutes)
+                           for start, end in ranges]
+                partials = [future.result() for future in futures]
+    except (sqlite3.Error, OSError, BrokenProcessPool) as e: # ワーカーのDBエラーやプロセスの異常終了
+        print(f"集計エラー: {e}")
+        return None
+
+    merged = _merge(partials)
+    periods = [PeriodTotal(key, *values) for key, values in sorted(merged['periods'].items())]
+    tasks = [PeriodTaskTotal(key, task_name, *values) for (key, task_name), values in sorted(merged['tasks'].items())]
+    return PeriodReport(period, date_from, date_to, periods, tasks)
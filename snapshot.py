@@ -0,0 +1,214 @@
+import ast
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Optional, Dict, Tuple, Sequence
+
+from db_manager import DatabaseManager
+from aggregation import sum_durations_by, get_numpy
+
+class TimeLogSnapshot:
+    """
+    完了した時間ログを列ごとの .npy ファイルに書き出した、分析用のスナップショット。
+
+    各列は int64 (リトルエンディアン) の1次元配列で、NumPyがあれば np.load(mmap_mode='r') で、
+    なければ mmap と memoryview でメモリマップして読み込む。SQLiteから1行ずつ値を取り出す
+    コストを払わずに、年単位のログを集計できる。
+
+    refresh() は前回書き出した最大のID(watermark)より後のログだけを追記する。書き出し済みの範囲の
+    ログが変更・削除された場合は、件数と各列の合計(チェックサム)の不一致で検知して作り直す。
+    アーカイブ済みの年のログも含める。アーカイブファイルが読めない場合は、アーカイブの年を欠いたまま
+    作り直さないよう、更新を失敗させて書き出し済みの内容を残す。
+    """
+    COLUMNS = ('work_day_id', 'task_id', 'start_time', 'end_time')
+    META_FILE = 'meta.json'
+    FORMAT_VERSION = 1
+
+    # .npy のヘッダー。行数が増えてもデータの位置が変わらないよう、長さを HEADER_SIZE バイトに固定する
+    NPY_MAGIC = b'\x93NUMPY\x01\x00'
+    HEADER_SIZE = 128
+    DTYPE = '<i8'
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.meta = self._read_meta()
+
+    @property
+    def watermark(self) -> int:
+        """書き出し済みの最大の時間ログID。"""
+        return self.meta['watermark']
+
+    @property
+    def row_count(self) -> int:
+        """書き出し済みの行数。"""
+        return self.meta['checksum'][0]
+
+    def _column_path(self, column: str) -> Path:
+        return self.directory / f"{column}.npy"
+
+    def _empty_meta(self) -> Dict:
+        return {'version': self.FORMAT_VERSION, 'watermark': 0, 'checksum': [0, 0, 0, 0, 0]}
+
+    def _read_meta(self) -> Dict:
+        """メタデータを読み込む。ないか壊れている場合、または列のファイルと行数が合わない場合は空とみなす。"""
+        try:
+            with open(self.directory / self.META_FILE, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != self.FORMAT_VERSION:
+                return self._empty_meta()
+            for column in self.COLUMNS:
+                if self._read_header(self._column_path(column)) != meta['checksum'][0]:
+                    return self._empty_meta()
+            return meta
+        except (IOError, ValueError, KeyError, IndexError):
+            return self._empty_meta()
+
+    def _write_meta(self):
+        """メタデータを一時ファイル経由で置き換える。"""
+        tmp_path = self.directory / (self.META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.directory / self.META_FILE)
+
+    # --- .npy ファイルの読み書き ---
+
+    def _npy_header(self, rows: int) -> bytes:
+        """rows 行の int64 配列を表す、HEADER_SIZE バイトの .npy ヘッダーを返す。"""
+        header = f"{{'descr': '{self.DTYPE}', 'fortran_order': False, 'shape': ({rows},), }}"
+        body_size = self.HEADER_SIZE - len(self.NPY_MAGIC) - 2
+        return self.NPY_MAGIC + struct.pack('<H', body_size) + header.ljust(body_size - 1).encode('latin1') + b'\n'
+
+    def _read_header(self, path: Path) -> int:
+        """.npy ファイルのヘッダーを確認し、行数を返す。形式が違う場合はValueErrorを送出する。"""
+        with open(path, 'rb') as f:
+            prefix = f.read(len(self.NPY_MAGIC) + 2)
+            if prefix[:len(self.NPY_MAGIC)] != self.NPY_MAGIC:
+                raise ValueError(f"{path} は対応している .npy ファイルではありません")
+            body_size = struct.unpack('<H', prefix[len(self.NPY_MAGIC):])[0]
+            if len(self.NPY_MAGIC) + 2 + body_size != self.HEADER_SIZE:
+                raise ValueError(f"{path} のヘッダーの長さが違います")
+            header = ast.literal_eval(f.read(body_size).decode('latin1'))
+        if header['descr'] != self.DTYPE or header['fortran_order']:
+            raise ValueError(f"{path} の型が違います")
+        return header['shape'][0]
+
+    def _append_column(self, column: str, values: array, total_rows: int):
+        """列のファイルの末尾に値を追記し、ヘッダーの行数を total_rows に更新する。"""
+        path = self._column_path(column)
+        if sys.byteorder != 'little':
+            values = array('q', values)
+            values.byteswap()
+        with open(path, 'r+b' if path.exists() else 'w+b') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                f.write(self._npy_header(0))
+            values.tofile(f)
+            f.seek(0)
+            f.write(self._npy_header(total_rows))
+
+    def _reset(self):
+        """書き出し済みのデータを消して空の状態に戻す。"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for column in self.COLUMNS:
+            with open(self._column_path(column), 'wb') as f:
+                f.write(self._npy_header(0))
+        self.meta = self._empty_meta()
+        self._write_meta()
+
+    # --- 更新と読み込み ---
+
+    def refresh(self, db: DatabaseManager, batch_size: int = 100000) -> Optional[int]:
+        """
+        前回の書き出し以降に完了した時間ログを追記する。
+        書き出し済みの範囲のログが変更・削除されていた場合は、最初から書き出し直す。
+
+        Args:
+            db (DatabaseManager): 書き出し元のデータベース。
+            batch_size (int): 一度に読み込んで追記する行数。
+
+        Returns:
+            Optional[int]: 追記した行数。失敗した場合はNone。
+        """
+        watermark = db.get_closed_log_watermark()
+        if watermark is None:
+            return None
+        try:
+            if self.watermark > 0:
+                checksum = db.get_time_log_checksum(self.watermark)
+                if checksum is None:
+                    return None
+                if list(checksum) != self.meta['checksum']:
+                    self._reset()
+            else:
+                self._reset() # メタデータがない・壊れている場合も、残っている列のファイルを消してから書き出す
+            if watermark <= self.watermark:
+                return 0
+
+            appended = 0
+            checksum = list(self.meta['checksum'])
+            for rows in db.iter_time_log_batches(self.watermark, watermark, batch_size):
+                columns = [array('q', values) for values in zip(*rows)]
+                checksum[0] += len(rows)
+                for index, values in enumerate(columns, start=1):
+                    checksum[index] += sum(values)
+                for column, values in zip(self.COLUMNS, columns):
+                    self._append_column(column, values, checksum[0])
+                appended += len(rows)
+            self.meta = {'version': self.FORMAT_VERSION, 'watermark': watermark, 'checksum': checksum}
+            self._write_meta()
+            return appended
+        except (IOError, OSError, ValueError, sqlite3.Error) as e:
+            print(f"スナップショット更新エラー: {e}")
+            # 列の途中まで追記されている可能性があるため、次回は作り直させる
+            self.meta = self._read_meta()
+            return None
+
+    def load(self) -> Optional[Dict[str, Sequence[int]]]:
+        """
+        各列をメモリマップして返す。
+        NumPyがあれば読み取り専用の numpy.memmap、なければ int64 の memoryview。
+
+        Returns:
+            Optional[Dict[str, Sequence[int]]]: 列名 -> 値の列。スナップショットがない場合はNone。
+        """
+        if self.row_count == 0:
+            return None
+        np = get_numpy() # NumPyがない環境では標準ライブラリのmmapで読み込む
+        columns = {}
+        try:
+            for column in self.COLUMNS:
+                path = self._column_path(column)
+                if np is not None:
+                    columns[column] = np.load(path, mmap_mode='r')[:self.row_count]
+                    continue
+                with open(path, 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                values = memoryview(mapped)[self.HEADER_SIZE:self.HEADER_SIZE + self.row_count * 8].cast('q')
+                if sys.byteorder != 'little':
+                    swapped = array('q', values)
+                    swapped.byteswap()
+                    values = memoryview(swapped)
+                columns[column] = values
+        except (IOError, OSError, ValueError) as e:
+            print(f"スナップショット読み込みエラー: {e}")
+            return None
+        return columns
+
+    def task_totals(self) -> Dict[int, int]:
+        """工数ごとの作業時間の合計秒数 (task_id -> 秒数) を返す。"""
+        columns = self.load()
+        if columns is None:
+            return {}
+        return sum_durations_by(columns['start_time'], columns['end_time'], columns['task_id'])
+
+    def day_task_totals(self) -> Dict[Tuple[int, int], int]:
+        """業務日×工数ごとの作業時間の合計秒数 ((work_day_id, task_id) -> 秒数) を返す。"""
+        columns = self.load()
+        if columns is None:
+            return {}
+        return sum_durations_by(columns['start_time'], columns['end_time'], columns['work_day_id'], columns['task_id'])
@@ -0,0 +1,87 @@
+import unicodedata
+from typing import Optional, Dict, Set, Iterable, Tuple
+
+def normalize(text: str) -> str:
+    """
+    検索用に文字列を正規化する。
+    NFKCで全角英数字・半角カナなどを統一し、casefoldで大文字・小文字を区別しないようにする。
+    """
+    return unicodedata.normalize('NFKC', text).casefold()
+
+class TaskSearchIndex:
+    """
+    工数名の部分一致検索のための、メモリ上の n-gram インデックス。
+
+    工数名を正規化して1文字と2文字の並び(bigram)ごとに工数IDを登録しておき、
+    検索時は検索語のbigramを含む工数だけに絞り込んでから部分一致を確認する。
+    日本語は単語の区切りがないため、形態素解析の代わりにbigramを使う。
+    """
+    def __init__(self):
+        self._names: Dict[int, str] = {} # task_id -> 正規化した工数名
+        self._postings: Dict[str, Set[int]] = {} # 1文字または2文字 -> その並びを含む task_id
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        """文字列に含まれる1文字と2文字の並びをすべて返す。"""
+        return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+    def add(self, task_id: int, task_name: str):
+        """工数を登録する。既に登録されていれば工数名を置き換える。"""
+        self.remove(task_id)
+        name = normalize(task_name)
+        self._names[task_id] = name
+        for gram in self._grams(name):
+            self._postings.setdefault(gram, set()).add(task_id)
+
+    def remove(self, task_id: int):
+        """工数の登録を取り消す。"""
+        name = self._names.pop(task_id, None)
+        if name is None:
+            return
+        for gram in self._grams(name):
+            ids = self._postings[gram]
+            ids.discard(task_id)
+            if not ids:
+                del self._postings[gram]
+
+    def sync(self, tasks: Iterable[Tuple[int, str]]):
+        """
+        登録内容を (task_id, 工数名) の一覧に合わせる。
+        追加・名前の変わった工数だけを登録し直し、なくなった工数を取り除く。
+        """
+        current: Dict[int, str] = {}
+        for task_id, task_name in tasks:
+            current[task_id] = task_name
+            if self._names.get(task_id) != normalize(task_name):
+                self.add(task_id, task_name)
+        for task_id in [task_id for task_id in self._names if task_id not in current]:
+            self.remove(task_id)
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        """
+        工数名に検索語を含む工数のIDを返す。
+
+        Args:
+            query (str): 検索語。前後の空白は無視する。
+
+        Returns:
+            Optional[Set[int]]: 一致した工数のID。検索語が空の場合は絞り込まないことを表すNone。
+        """
+        query = normalize(query.strip())
+        if not query:
+            return None
+        if len(query) == 1:
+            return set(self._postings.get(query, ()))
+
+        # 件数の少ないbigramから順に積集合を取り、候補を絞り込む
+        postings = sorted(
+            (self._postings.get(query[i:i + 2], set()) for i in range(len(query) - 1)),
+            key=len
+        )
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            if not candidates:
+                break
+            candidates &= ids
+        # bigramがすべて含まれていても連続しているとは限らないため、部分一致を確認する
+        return {task_id for task_id in candidates if query in self._names[task_id]}
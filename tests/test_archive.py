@@ -0,0 +1,125 @@
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager
+
+class ArchiveTest(unittest.TestCase):
+    """過去の年のアーカイブと復元で、IDと集計が保たれることを確かめる。"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.db_path = self.dir / 'work.db'
+        self.db = DatabaseManager(self.db_path)
+        self.tasks = [self.db.add_task('設計'), self.db.add_task('実装')]
+        for year in (2022, 2023, 2025):
+            for offset in range(0, 60, 5):
+                self._add_day(date(year, 3, 1) + timedelta(days=offset))
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def _add_day(self, work_date, log_count=2):
+        day = self.db.get_or_create_work_day(work_date)
+        start = datetime.combine(work_date, datetime.min.time()) + timedelta(hours=9)
+        self.db.update_work_day_start_time(day, start)
+        for index in range(log_count):
+            log = self.db.start_time_log(day, self.tasks[index % 2], start + timedelta(hours=index))
+            self.db.end_time_log(log, start + timedelta(hours=index, minutes=20 + work_date.day))
+        self.db.update_work_day_end_time(day, start + timedelta(hours=9))
+        return day
+
+    def _rows(self):
+        """ホットのDBとアーカイブをあわせた業務日・時間ログ・集計を、IDつきで返す。"""
+        logs = [(log.id, log.work_day_id, log.task_id, log.work_date, log.start_time, log.end_time)
+                for log in self.db.get_all_completed_logs()]
+        totals = [(total.work_day_id, total.work_date, total.task_id, total.total_seconds, total.log_count)
+                  for total in self.db.get_daily_task_totals()]
+        days = [(day.id, day.work_date, day.start_time, day.end_time) for day in self._all_pages()]
+        return sorted(logs), sorted(totals), days
+
+    def _all_pages(self, limit=7):
+        days, before = [], None
+        while True:
+            page = self.db.get_work_days_page(before, limit)
+            if not page:
+                return days
+            days.extend(page)
+            before = date.fromisoformat(page[-1].work_date)
+
+    def _hot_count(self, table):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_archive_then_restore_round_trip(self):
+        before = self._rows()
+        self.assertEqual(self.db.archive_year(2022), 24)
+        self.assertEqual(self.db.archive_year(2023), 24)
+        self.assertEqual(self.db.archive_year(2023), 0) # アーカイブ済み
+        self.assertEqual(self._hot_count('time_logs'), 24)
+        self.assertEqual([(status.year, status.state, status.time_log_count) for status in self.db.get_archive_status()],
+                         [(2022, 'archived', 24), (2023, 'archived', 24)])
+
+        # アーカイブした年も読み込みに含まれ、IDもそのまま
+        self.assertEqual(self._rows(), before)
+
+        self.assertEqual(self.db.restore_year(2022), 24)
+        self.assertEqual(self.db.restore_year(2023), 24)
+        self.assertEqual(self.db.get_archive_status(), [])
+        self.assertEqual(self._hot_count('time_logs'), 72)
+        self.assertEqual([path.name for path in self.dir.glob('*_archive_*')], [])
+        self.assertEqual(self._rows(), before)
+
+    def test_ids_are_not_reused_after_archiving(self):
+        # 最後に追加した行 (IDが最大の行) をアーカイブする
+        for offset in range(3):
+            self._add_day(date(2021, 7, 1) + timedelta(days=offset))
+        archived_day_ids = {day.id for day in self._all_pages() if day.work_date < '2022'}
+        archived_log_ids = {log.id for log in self.db.get_all_completed_logs(date_to=date(2021, 12, 31))}
+        self.assertEqual(self.db.archive_year(2021), 6)
+
+        # 後から追加した行は、アーカイブの行と別のIDになる
+        new_day = self._add_day(date(2025, 6, 2))
+        new_logs = {log.id for log in self.db.get_all_completed_logs(date_from=date(2025, 6, 2))}
+        self.assertNotIn(new_day, archived_day_ids)
+        self.assertTrue(new_logs.isdisjoint(archived_log_ids))
+
+        before = self._rows()
+        self.assertEqual(self.db.restore_year(2021), 6)
+        self.assertEqual(self._rows(), before)
+
+    def test_reads_include_archived_years(self):
+        self.db.archive_year(2022)
+        totals = self.db.get_daily_task_totals(date_from=date(2022, 4, 1), date_to=date(2022, 4, 30))
+        self.assertEqual({total.work_date[:7] for total in totals}, {'2022-04'})
+        self.assertEqual(len(self.db.get_daily_task_totals(date_from=date(2025, 1, 1))), 24)
+        self.assertEqual(len(self.db.get_work_days_page(None, 100)), 36)
+
+    def test_refusals(self):
+        this_year = date.today().year
+        self.assertIsNone(self.db.archive_year(this_year))
+        # 計測中のログがある年はアーカイブしない
+        day = self.db.get_or_create_work_day(date(2022, 12, 1))
+        running = self.db.start_time_log(day, self.tasks[0], datetime(2022, 12, 1, 9, 0))
+        self.assertIsNone(self.db.archive_year(2022))
+        self.db.end_time_log(running, datetime(2022, 12, 1, 9, 30))
+        self.assertEqual(self.db.archive_year(2022), 25)
+
+        # アーカイブ済みの年には業務日・ログを追加しない
+        entries = [(date(2022, 12, 2), '設計', datetime(2022, 12, 2, 9), datetime(2022, 12, 2, 10), None, None)]
+        self.assertIsNone(self.db.import_time_log_entries(entries))
+        self.assertIsNone(self.db.restore_year(2021))
+        self.assertEqual(self.db.restore_year(2022), 25)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager
+
+class CompactionTest(unittest.TestCase):
+    """細切れのログの統合で、行数が減り工数ごとの合計が保たれることを確かめる。"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(Path(self._tmp.name) / 'work.db')
+        self.design = self.db.add_task('設計')
+        self.build = self.db.add_task('実装')
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def _add_fragments(self, work_date, task, start_hour, minutes, gap_minutes=0, closed=True):
+        """start_hour 時から minutes 分ずつのログを、gap_minutes 分の隙間をあけて続けて記録する。"""
+        day = self.db.get_or_create_work_day(work_date)
+        start = datetime.combine(work_date, datetime.min.time()) + timedelta(hours=start_hour)
+        for length in minutes:
+            log = self.db.start_time_log(day, task, start)
+            start += timedelta(minutes=length)
+            self.db.end_time_log(log, start)
+            start += timedelta(minutes=gap_minutes)
+        if closed:
+            self.db.update_work_day_end_time(day, datetime.combine(work_date, datetime.min.time()) + timedelta(hours=18))
+        return day
+
+    def _totals(self):
+        """(日付, 工数名) -> (合計秒数, 件数)"""
+        return {(total.work_date, total.task_name): (total.total_seconds, total.log_count)
+                for total in self.db.get_daily_task_totals()}
+
+    def test_touching_logs_keep_task_totals(self):
+        self._add_fragments(date(2025, 1, 6), self.design, 9, [10, 20, 5, 25])
+        self._add_fragments(date(2025, 1, 6), self.build, 10, [15, 15])
+        self._add_fragments(date(2025, 1, 7), self.design, 9, [30, 30])
+        before = self._totals()
+
+        self.assertEqual(self.db.compact_time_logs(), 5)
+        self.assertEqual(self.db.compact_time_logs(), 0) # 2回目は何もしない
+        after = self._totals()
+        self.assertEqual({key: seconds for key, (seconds, _) in after.items()}, {key: seconds for key, (seconds, _) in before.items()})
+        self.assertEqual({count for _, count in after.values()}, {1})
+
+        logs = self.db.get_all_completed_logs(date_from=date(2025, 1, 6), date_to=date(2025, 1, 6))
+        self.assertEqual(sorted((log.task_name, log.duration_seconds) for log in logs), [('実装', 1800), ('設計', 3600)])
+
+    def test_gap_is_only_merged_when_allowed(self):
+        self._add_fragments(date(2025, 1, 6), self.design, 9, [10, 10, 10], gap_minutes=2)
+        self.assertEqual(self.db.compact_time_logs(), 0)
+        self.assertEqual(self.db.compact_time_logs(gap_seconds=60), 0)
+        self.assertEqual(self.db.compact_time_logs(gap_seconds=120), 2)
+        # 隙間も作業時間に含まれるようになる
+        self.assertEqual(self._totals()[('2025-01-06', '設計')], (34 * 60, 1))
+        self.assertIsNone(self.db.compact_time_logs(gap_seconds=-1))
+
+    def test_overlapping_logs_are_merged_once(self):
+        day = self._add_fragments(date(2025, 1, 6), self.design, 9, [60])
+        log = self.db.start_time_log(day, self.design, datetime(2025, 1, 6, 9, 30))
+        self.db.end_time_log(log, datetime(2025, 1, 6, 10, 30))
+        self.assertEqual(self.db.compact_time_logs(), 1)
+        self.assertEqual(self._totals()[('2025-01-06', '設計')], (90 * 60, 1)) # 重なった30分は1回だけ数える
+
+    def test_scope(self):
+        self._add_fragments(date(2025, 1, 6), self.design, 9, [10, 10])
+        self._add_fragments(date(2025, 1, 7), self.design, 9, [10, 10])
+        open_day = self._add_fragments(date(2025, 1, 8), self.design, 9, [10, 10], closed=False)
+        running = self.db.start_time_log(open_day, self.design, datetime(2025, 1, 8, 9, 20)) # 前のログに接する計測中のログ
+
+        self.assertEqual(self.db.compact_time_logs(date_from=date(2025, 1, 7)), 1) # 業務を終えていない日は対象外
+        self.assertEqual(self._totals()[('2025-01-06', '設計')][1], 2)
+        self.assertEqual(self.db.compact_time_logs(closed_days_only=False), 2)
+        self.assertEqual(self._totals()[('2025-01-08', '設計')][1], 1)
+        self.assertTrue(self.db.end_time_log(running, datetime(2025, 1, 8, 9, 30))) # 計測中のログは残っている
+
+    def test_archived_year_is_untouched(self):
+        self._add_fragments(date(2020, 5, 1), self.design, 9, [10, 10])
+        self._add_fragments(date(2025, 1, 6), self.design, 9, [10, 10])
+        self.db.archive_year(2020)
+        self.assertEqual(self.db.compact_time_logs(), 1)
+        self.assertEqual(self._totals()[('2020-05-01', '設計')], (20 * 60, 2))
+
+if __name__ == '__main__':
+    unittest.main()
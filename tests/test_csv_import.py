@@ -0,0 +1,128 @@
+import csv
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager
+from csv_import import import_time_logs_csv, parse_time
+from export import export_data
+
+HEADER = ['date', 'task_name', 'start', 'end', 'business_start', 'business_end']
+ROWS = [
+    ['2025-01-06', '設計', '09:00', '10:30', '09:00', '18:00'],
+    ['2025-01-06', '実装', '10:30', '12:00:15', '', ''],
+    ['2025-01-06', '設計', '13:00', '13:45', '', ''],
+    ['2025/01/07', '実装', '08:30', '09:10', '08:30', ''],
+]
+
+class CsvImportTest(unittest.TestCase):
+    """CSVの取り込みと、エクスポートしたCSVの取り込み直しを確かめる。"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.db = DatabaseManager(self.dir / 'work.db')
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def _write_csv(self, name, rows, header=HEADER):
+        path = self.dir / name
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        return path
+
+    def _logs(self, db=None):
+        """完了したログを (日付, 工数名, 開始, 終了) の組のリストで返す。"""
+        return [(log.work_date, log.task_name, log.start_time, log.end_time)
+                for log in (db or self.db).get_all_completed_logs()]
+
+    def test_import_then_export_round_trip(self):
+        report = import_time_logs_csv(self.db, self._write_csv('in.csv', ROWS), batch_size=2)
+        self.assertEqual((report.total_rows, report.imported, report.skipped, report.error_count), (4, 4, 0, 0))
+
+        # 業務開始・終了時刻は同じ日の行のうち値のあるものが使われる
+        day = self.db.get_or_create_work_day(date(2025, 1, 6))
+        totals = {total.task_name: total.total_seconds for total in self.db.get_daily_task_totals(work_day_id=day)}
+        self.assertEqual(totals, {'設計': 90 * 60 + 45 * 60, '実装': 90 * 60 + 15})
+
+        # 明細のCSVはそのまま別のデータベースに取り込み直せる
+        exported = self.dir / 'out.csv'
+        self.assertEqual(export_data(self.db, exported, 'logs'), 4)
+        other = DatabaseManager(self.dir / 'other.db')
+        try:
+            report = import_time_logs_csv(other, exported)
+            self.assertEqual((report.imported, report.error_count), (4, 0))
+            self.assertEqual(self._logs(other), self._logs())
+        finally:
+            other.close()
+
+    def test_reimport_skips_duplicates(self):
+        path = self._write_csv('in.csv', ROWS)
+        import_time_logs_csv(self.db, path)
+        report = import_time_logs_csv(self.db, path)
+        self.assertEqual((report.imported, report.skipped), (0, 4))
+        self.assertEqual(len(self._logs()), 4)
+
+    def test_invalid_rows_are_reported(self):
+        rows = ROWS[:1] + [
+            ['2025-01-08', '', '09:00', '10:00'], # 工数名が空
+            ['2025-01-08', '設計', '11:00', '10:00'], # 終了が開始より前
+            ['2025-13-01', '設計', '09:00', '10:00'], # 日付が不正
+        ]
+        report = import_time_logs_csv(self.db, self._write_csv('in.csv', rows))
+        self.assertEqual((report.total_rows, report.imported, report.error_count), (4, 1, 3))
+        self.assertEqual([line for line, _ in report.errors], [3, 4, 5])
+
+    def test_missing_column(self):
+        report = import_time_logs_csv(self.db, self._write_csv('in.csv', [], header=['date', 'task_name', 'start']))
+        self.assertEqual(report.error_count, 1)
+        self.assertIn('end', report.errors[0][1])
+
+    def test_offset_aware_times_become_local(self):
+        aware = datetime(2025, 1, 6, 0, 0, tzinfo=timezone.utc)
+        local = aware.astimezone().replace(tzinfo=None)
+        self.assertEqual(parse_time(aware.isoformat(), date(2025, 1, 6)), local)
+        self.assertIsNone(parse_time('2025-01-06T09:00:00', date(2025, 1, 6)).tzinfo)
+
+        rows = [['2025-01-06', '設計', aware.isoformat(), (aware + timedelta(hours=1)).isoformat(), '', '']]
+        report = import_time_logs_csv(self.db, self._write_csv('in.csv', rows))
+        self.assertEqual((report.imported, report.error_count), (1, 0))
+        self.assertEqual(self.db.get_all_completed_logs()[0].duration_seconds, 3600)
+
+    def _archive_2020(self):
+        """2020年に1件のログを記録してアーカイブする。"""
+        day = self.db.get_or_create_work_day(date(2020, 5, 1))
+        task = self.db.add_task('設計')
+        log = self.db.start_time_log(day, task, datetime(2020, 5, 1, 9, 0))
+        self.db.end_time_log(log, datetime(2020, 5, 1, 10, 0))
+        self.assertEqual(self.db.archive_year(2020), 1)
+
+    def test_archived_year_rows_are_refused(self):
+        self._archive_2020()
+        rows = [['2020-05-01', '設計', '09:00', '10:00', '', ''], ['2025-01-06', '設計', '09:00', '10:00', '', '']]
+        report = import_time_logs_csv(self.db, self._write_csv('in.csv', rows))
+        self.assertEqual((report.imported, report.error_count), (1, 1))
+        self.assertEqual(report.errors[0][0], 2)
+
+    def test_failed_nested_write_rolls_back(self):
+        # ライタースレッドの中で失敗した取り込みは、外側のトランザクションにも何も残さない
+        self._archive_2020()
+        entries = [
+            (date(2025, 1, 6), '新しい工数', datetime(2025, 1, 6, 9), datetime(2025, 1, 6, 10), None, None),
+            (date(2020, 5, 1), '新しい工数', datetime(2020, 5, 1, 9), datetime(2020, 5, 1, 10), None, None),
+        ]
+        self.assertIsNone(self.db.submit_write(self.db.import_time_log_entries, entries).result())
+        self.assertEqual(len(self._logs()), 1) # アーカイブ済みの1件だけ
+        self.assertIsNone(self.db.get_work_day_by_date(date(2025, 1, 6)))
+        self.assertNotIn('新しい工数', [task.task_name for task in self.db.get_all_tasks()])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import csv
+import json
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager
+from export import export_data, EXPORT_COLUMNS
+
+# (日付, 工数名, 開始, 終了)
+LOGS = [
+    (date(2025, 1, 6), '設計', '09:00', '10:30'),
+    (date(2025, 1, 6), '実装', '10:30', '12:00'),
+    (date(2025, 1, 7), '設計', '09:00', '09:45'),
+]
+
+class ExportTest(unittest.TestCase):
+    """明細・日別集計・工数別集計のCSV/JSONLへの書き出しを確かめる。"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.db = DatabaseManager(self.dir / 'work.db')
+        tasks = {}
+        for work_date, task_name, start, end in LOGS:
+            day = self.db.get_or_create_work_day(work_date)
+            task = tasks.setdefault(task_name, self.db.add_task(task_name))
+            log = self.db.start_time_log(day, task, datetime.combine(work_date, datetime.strptime(start, '%H:%M').time()))
+            self.db.end_time_log(log, datetime.combine(work_date, datetime.strptime(end, '%H:%M').time()))
+        day = self.db.get_or_create_work_day(date(2025, 1, 6))
+        self.db.update_work_day_start_time(day, datetime(2025, 1, 6, 9, 0))
+        self.db.update_work_day_end_time(day, datetime(2025, 1, 6, 18, 0))
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def _read_csv(self, path):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            return list(csv.reader(f))
+
+    def test_logs_csv(self):
+        path = self.dir / 'logs.csv'
+        self.assertEqual(export_data(self.db, path, 'logs'), 3)
+        rows = self._read_csv(path)
+        self.assertEqual(tuple(rows[0]), EXPORT_COLUMNS['logs'])
+        self.assertEqual(rows[1][:5], ['2025-01-06', '設計', '2025-01-06 09:00:00', '2025-01-06 10:30:00', '5400'])
+        self.assertEqual(rows[1][5:], ['2025-01-06 09:00:00', '2025-01-06 18:00:00'])
+        self.assertEqual(rows[3][5:], ['', '']) # 業務時間のない日は空
+
+    def test_days_jsonl(self):
+        path = self.dir / 'days.jsonl'
+        self.assertEqual(export_data(self.db, path, 'days'), 2)
+        with open(path, 'r', encoding='utf-8') as f:
+            days = [json.loads(line) for line in f]
+        self.assertEqual([(day['date'], day['total_seconds'], day['log_count']) for day in days],
+                         [('2025-01-06', 10800, 2), ('2025-01-07', 2700, 1)])
+        # 実働時間は業務時間9時間から休憩60分を引いたもの
+        self.assertEqual((days[0]['net_work_seconds'], days[0]['other_seconds']), (8 * 3600, 8 * 3600 - 10800))
+        self.assertIsNone(days[1]['net_work_seconds'])
+
+    def test_tasks_with_date_range(self):
+        path = self.dir / 'tasks.csv'
+        self.assertEqual(export_data(self.db, path, 'tasks', date_from=date(2025, 1, 7)), 1)
+        self.assertEqual(self._read_csv(path)[1], ['設計', '1', '2700', '1'])
+
+    def test_unsupported_format(self):
+        self.assertIsNone(export_data(self.db, self.dir / 'logs.txt', 'logs'))
+        self.assertFalse((self.dir / 'logs.txt').exists())
+
+    def test_failed_read_keeps_existing_file(self):
+        # 読み込みが途中で失敗しても、既存のファイルは書きかけのファイルで置き換えない
+        path = self.dir / 'logs.csv'
+        path.write_text('old', encoding='utf-8')
+        first_log = self.db.get_all_completed_logs()[0]
+
+        def failing_logs(date_from=None, date_to=None):
+            yield first_log
+            raise sqlite3.OperationalError('disk I/O error')
+
+        with mock.patch.object(self.db, 'iter_completed_logs', failing_logs):
+            self.assertIsNone(export_data(self.db, path, 'logs'))
+        self.assertEqual(path.read_text(encoding='utf-8'), 'old')
+        self.assertEqual([p.name for p in self.dir.iterdir() if p.name.endswith('.tmp')], [])
+
+if __name__ == '__main__':
+    unittest.main()
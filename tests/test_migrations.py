@@ -0,0 +1,139 @@
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager
+from utils import to_epoch
+
+# DatabaseManager._create_tables が作成する初期(v0)のスキーマ。日時はISO 8601の文字列
+V0_SCHEMA = """
+CREATE TABLE work_days (
+    id INTEGER PRIMARY KEY,
+    work_date TEXT NOT NULL UNIQUE,
+    start_time TEXT,
+    end_time TEXT
+);
+CREATE TABLE tasks (
+    id INTEGER PRIMARY KEY,
+    task_name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE time_logs (
+    id INTEGER PRIMARY KEY,
+    work_day_id INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT,
+    FOREIGN KEY (work_day_id) REFERENCES work_days (id) ON DELETE CASCADE,
+    FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+);
+"""
+
+WORK_DAYS = [
+    (1, '2025-01-06', '2025-01-06 09:00:00', '2025-01-06 18:00:00'),
+    (2, '2025-01-07', '2025-01-07 08:30:00', None),
+]
+TASKS = [(1, '設計'), (2, '実装'), (3, '未使用')]
+TIME_LOGS = [
+    (1, 1, 1, '2025-01-06 09:00:00', '2025-01-06 10:30:00'),
+    (2, 1, 2, '2025-01-06 10:30:00', '2025-01-06 12:00:00'),
+    (3, 1, 1, '2025-01-06 13:00:00', '2025-01-06 13:45:30'),
+    (4, 2, 2, '2025-01-07 08:30:00', '2025-01-07 09:10:00'),
+    (5, 2, 1, '2025-01-07 09:10:00', None), # 計測中
+]
+
+def _epoch(text):
+    return to_epoch(datetime.fromisoformat(text)) if text else None
+
+class MigrationTest(unittest.TestCase):
+    """v0・v1 のデータベースを最新のスキーマに移行し、行と集計が保たれることを確かめる。"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / 'work.db'
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _create_fixture(self, version: int, time_logs=TIME_LOGS):
+        """v0 のスキーマにデータを入れ、MIGRATIONS を version まで適用したデータベースを作る。"""
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(V0_SCHEMA)
+        conn.executemany("INSERT INTO work_days VALUES (?, ?, ?, ?)", WORK_DAYS)
+        conn.executemany("INSERT INTO tasks VALUES (?, ?)", TASKS)
+        conn.executemany("INSERT INTO time_logs VALUES (?, ?, ?, ?, ?)", time_logs)
+        conn.commit()
+        for number, script in enumerate(DatabaseManager.MIGRATIONS[:version], start=1):
+            conn.executescript(f"BEGIN; {script} PRAGMA user_version = {number}; COMMIT;")
+        conn.close()
+
+    def _assert_migrated(self):
+        db = DatabaseManager(self.db_path)
+        try:
+            total_seconds = sum(row.total_seconds for row in db.get_daily_task_totals(date_from=date(2025, 1, 1)))
+        finally:
+            db.close()
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], len(DatabaseManager.MIGRATIONS))
+            self.assertEqual(conn.execute("PRAGMA foreign_key_check").fetchall(), [])
+            self.assertEqual(conn.execute("PRAGMA integrity_check").fetchone()[0], 'ok')
+
+            # 行: 日時はローカル時刻のエポック秒に変換され、IDはそのまま
+            self.assertEqual(
+                conn.execute("SELECT id, work_date, start_time, end_time FROM work_days ORDER BY id").fetchall(),
+                [(id_, work_date, _epoch(start), _epoch(end)) for id_, work_date, start, end in WORK_DAYS]
+            )
+            self.assertEqual(
+                conn.execute("SELECT id, work_day_id, task_id, start_time, end_time FROM time_logs ORDER BY id").fetchall(),
+                [(id_, work_day_id, task_id, _epoch(start), _epoch(end)) for id_, work_day_id, task_id, start, end in TIME_LOGS]
+            )
+            self.assertEqual(conn.execute("SELECT id, task_name FROM tasks ORDER BY id").fetchall(), TASKS)
+
+            # 集計: daily_task_totals は完了したログの合計と一致する
+            expected = {}
+            for _, work_day_id, task_id, start, end in TIME_LOGS:
+                if end is not None:
+                    seconds, count = expected.get((work_day_id, task_id), (0, 0))
+                    expected[(work_day_id, task_id)] = (seconds + _epoch(end) - _epoch(start), count + 1)
+            rows = conn.execute("SELECT work_day_id, task_id, total_seconds, log_count FROM daily_task_totals").fetchall()
+            self.assertEqual({(row[0], row[1]): (row[2], row[3]) for row in rows}, expected)
+            self.assertEqual(total_seconds, sum(seconds for seconds, _ in expected.values()))
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM time_log_intervals").fetchone()[0],
+                sum(1 for log in TIME_LOGS if log[4] is not None)
+            )
+
+            # 最終使用時刻は最後のログの開始時刻
+            self.assertEqual(conn.execute("SELECT last_used_at FROM tasks WHERE id = 1").fetchone()[0], _epoch('2025-01-07 09:10:00'))
+        finally:
+            conn.close()
+
+    def test_migrate_from_v0(self):
+        self._create_fixture(0)
+        self._assert_migrated()
+
+    def test_migrate_from_v1(self):
+        self._create_fixture(1)
+        self._assert_migrated()
+
+    def test_foreign_key_violation_rolls_back(self):
+        # 参照先の工数がないログ。外部キー制約の確認で失敗し、バージョンは上がらない
+        self._create_fixture(0, TIME_LOGS + [(6, 1, 99, '2025-01-06 15:00:00', '2025-01-06 16:00:00')])
+        with self.assertRaises(sqlite3.IntegrityError):
+            DatabaseManager(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 0)
+            self.assertEqual(conn.execute("SELECT start_time FROM time_logs WHERE id = 1").fetchone()[0], '2025-01-06 09:00:00')
+        finally:
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from itertools import combinations
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager
+
+# (日付, 開始, 終了) 。時刻は 'HH:MM'
+LOGS = [
+    (date(2025, 1, 6), '09:00', '10:00'),
+    (date(2025, 1, 6), '10:00', '11:00'), # 前のログと接するだけ
+    (date(2025, 1, 6), '10:30', '10:45'), # 前のログに含まれる
+    (date(2025, 1, 6), '10:40', '12:00'),
+    (date(2025, 1, 6), '13:00', '13:00'), # 長さ0
+    (date(2025, 1, 7), '09:00', '09:30'),
+]
+
+def _at(work_date, text):
+    return datetime.combine(work_date, datetime.strptime(text, '%H:%M').time())
+
+class OverlapTest(unittest.TestCase):
+    """R*Tree による重なりの検索と、期間全体の重なりの点検を確かめる。"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / 'work.db'
+        self.db = DatabaseManager(self.db_path)
+        self.task = self.db.add_task('設計')
+        self.log_ids = [self._add_log(*log) for log in LOGS]
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def _add_log(self, work_date, start, end):
+        day = self.db.get_or_create_work_day(work_date)
+        log = self.db.start_time_log(day, self.task, _at(work_date, start))
+        self.db.end_time_log(log, _at(work_date, end))
+        return log
+
+    def _brute_force_pairs(self):
+        """すべての組を比べて、重なっているログのIDの組を求める。"""
+        logs = sorted(self.db.get_all_completed_logs(), key=lambda log: (log.start_time, log.id))
+        return {
+            (a.id, b.id) for a, b in combinations(logs, 2)
+            if a.start_time < b.end_time and b.start_time < a.end_time
+        }
+
+    def test_find_overlapping_logs(self):
+        ids = lambda logs: [log.id for log in logs]
+        day = date(2025, 1, 6)
+        self.assertEqual(ids(self.db.find_overlapping_logs(_at(day, '10:35'), _at(day, '10:50'))), self.log_ids[1:4])
+        # 端が接するだけのログは重ならない
+        self.assertEqual(ids(self.db.find_overlapping_logs(_at(day, '12:00'), _at(day, '12:30'))), [])
+        # 開始と終了が同じならその時刻に作業中だったログ
+        self.assertEqual(ids(self.db.find_overlapping_logs(_at(day, '09:30'), _at(day, '09:30'))), self.log_ids[:1])
+        self.assertEqual(ids(self.db.find_overlapping_logs(_at(day, '10:00'), _at(day, '11:00'), self.log_ids[1])), self.log_ids[2:4])
+
+    def test_running_log_is_not_indexed(self):
+        day = self.db.get_or_create_work_day(date(2025, 1, 8))
+        running = self.db.start_time_log(day, self.task, datetime(2025, 1, 8, 9, 0))
+        self.assertEqual(self.db.find_overlapping_logs(datetime(2025, 1, 8, 9, 0), datetime(2025, 1, 8, 10, 0)), [])
+        self.db.end_time_log(running, datetime(2025, 1, 8, 9, 30))
+        self.assertEqual([log.id for log in self.db.find_overlapping_logs(datetime(2025, 1, 8, 9, 0), datetime(2025, 1, 8, 10, 0))], [running])
+
+    def test_find_all_overlaps_matches_brute_force(self):
+        pairs = {(a.id, b.id) for a, b in self.db.find_all_overlaps()}
+        self.assertEqual(pairs, self._brute_force_pairs())
+        self.assertEqual(pairs, {(self.log_ids[1], self.log_ids[2]), (self.log_ids[1], self.log_ids[3]), (self.log_ids[2], self.log_ids[3])})
+        self.assertEqual(self.db.find_all_overlaps(date_from=date(2025, 1, 7)), [])
+
+    def test_index_follows_deletes_and_compaction(self):
+        self.db.delete_time_log(self.log_ids[2])
+        self.db.compact_time_logs(closed_days_only=False)
+        self.assertEqual({(a.id, b.id) for a, b in self.db.find_all_overlaps()}, self._brute_force_pairs())
+
+        # R*Tree は完了したログと1対1で対応し、座標(32ビット浮動小数点数)はログの時間帯を含むように丸められる
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute("""
+                SELECT tl.id, r.id, r.start_time <= tl.start_time AND r.end_time >= tl.end_time
+                FROM time_logs tl
+                LEFT JOIN time_log_intervals r ON r.id = tl.id
+                WHERE tl.end_time IS NOT NULL
+            """).fetchall()
+            self.assertEqual([(row[0], row[2]) for row in rows], [(row[1], 1) for row in rows])
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM time_log_intervals").fetchone()[0], len(rows))
+        finally:
+            conn.close()
+
+    def test_archived_logs_are_audited(self):
+        self._add_log(date(2020, 5, 1), '09:00', '10:00')
+        self._add_log(date(2020, 5, 1), '09:30', '10:30')
+        self.assertEqual(self.db.archive_year(2020), 2)
+        overlaps = self.db.find_all_overlaps(date_to=date(2020, 12, 31))
+        self.assertEqual([(a.work_date, b.work_date) for a, b in overlaps], [('2020-05-01', '2020-05-01')])
+        self.assertEqual(len(self.db.find_all_overlaps()), 4)
+
+if __name__ == '__main__':
+    unittest.main()
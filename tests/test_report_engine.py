@@ -0,0 +1,91 @@
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager
+from report_engine import generate_period_report, period_key, split_date_range
+
+FIRST_DAY = date(2024, 12, 23)
+DAY_COUNT = 45
+
+class ReportEngineTest(unittest.TestCase):
+    """期間ごとの集計が、範囲の分け方やアーカイブによらずデータベースの集計と一致することを確かめる。"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(Path(self._tmp.name) / 'work.db')
+        tasks = [self.db.add_task('設計'), self.db.add_task('実装'), self.db.add_task('会議')]
+        for offset in range(DAY_COUNT):
+            work_date = FIRST_DAY + timedelta(days=offset)
+            if work_date.weekday() >= 5:
+                continue
+            day = self.db.get_or_create_work_day(work_date)
+            start = datetime.combine(work_date, datetime.min.time()) + timedelta(hours=9)
+            if offset % 3:
+                # 3日に1日は業務の開始・終了時刻がない
+                self.db.update_work_day_start_time(day, start)
+                self.db.update_work_day_end_time(day, start + timedelta(hours=9))
+            for index in range(offset % 4 + 1):
+                log = self.db.start_time_log(day, tasks[(offset + index) % 3], start + timedelta(hours=index))
+                self.db.end_time_log(log, start + timedelta(hours=index, minutes=15 * (index + 1) + offset))
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def _expected_totals(self, period):
+        """daily_task_totals から期間ごとの (工数合計秒数, 件数) を求める。"""
+        expected = {}
+        for total in self.db.get_daily_task_totals():
+            key = period_key(date.fromisoformat(total.work_date), period)
+            seconds, count = expected.get(key, (0, 0))
+            expected[key] = (seconds + total.total_seconds, count + total.log_count)
+        return expected
+
+    def test_totals_match_database(self):
+        for period in ('week', 'month', 'year', 'all'):
+            report = generate_period_report(self.db, period, workers=1)
+            self.assertEqual({total.period: (total.total_seconds, total.log_count) for total in report.periods},
+                             self._expected_totals(period), period)
+            for total in report.periods:
+                self.assertEqual(sum(task.total_seconds for task in report.tasks_for(total.period)), total.total_seconds)
+
+    def test_chunks_merge_to_same_report(self):
+        # 7日ずつの範囲は月曜始まりではないため、週が範囲の境界をまたぐ
+        for period in ('week', 'month'):
+            single = generate_period_report(self.db, period, workers=1)
+            chunked = generate_period_report(self.db, period, workers=2, chunk_days=7)
+            self.assertEqual(chunked.periods, single.periods, period)
+            self.assertEqual(chunked.tasks, single.tasks, period)
+
+    def test_net_work_and_other(self):
+        report = generate_period_report(self.db, 'all', break_time_minutes=60, workers=1)
+        total = report.periods[0]
+        # 業務時間は9時間、休憩60分を引いた8時間が実働時間
+        self.assertEqual(total.net_work_seconds, total.business_day_count * 8 * 3600)
+        business_seconds = sum(
+            day.total_seconds for day in self.db.iter_day_totals() if day.business_end_time is not None
+        )
+        self.assertEqual(total.other_seconds, total.net_work_seconds - business_seconds)
+        self.assertLess(total.business_day_count, total.day_count)
+
+    def test_includes_archived_year(self):
+        before = generate_period_report(self.db, 'month', workers=1)
+        self.assertGreater(self.db.archive_year(2024), 0)
+        after = generate_period_report(self.db, 'month', workers=2, chunk_days=10)
+        self.assertEqual(after.periods, before.periods)
+        self.assertEqual(after.tasks, before.tasks)
+
+    def test_period_key_and_ranges(self):
+        self.assertEqual(period_key(date(2024, 12, 30), 'week'), '2025-W01') # ISO 8601の週番号
+        self.assertEqual(period_key(date(2025, 2, 3), 'month'), '2025-02')
+        self.assertEqual(split_date_range(date(2025, 1, 1), date(2025, 1, 10), 4),
+                         [(date(2025, 1, 1), date(2025, 1, 4)), (date(2025, 1, 5), date(2025, 1, 8)), (date(2025, 1, 9), date(2025, 1, 10))])
+        self.assertIsNone(generate_period_report(self.db, 'quarter'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager
+from snapshot import TimeLogSnapshot
+
+class SnapshotTest(unittest.TestCase):
+    """スナップショットの追記・作り直しと、集計がデータベースと一致することを確かめる。"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.db = DatabaseManager(self.dir / 'work.db')
+        self.tasks = [self.db.add_task('設計'), self.db.add_task('実装')]
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def _add_logs(self, work_date, count):
+        """work_date に9時から30分ずつ、工数を交互にしたログを count 件記録する。"""
+        day = self.db.get_or_create_work_day(work_date)
+        start = datetime.combine(work_date, datetime.min.time()) + timedelta(hours=9)
+        for index in range(count):
+            log = self.db.start_time_log(day, self.tasks[index % 2], start + timedelta(minutes=30 * index))
+            self.db.end_time_log(log, start + timedelta(minutes=30 * index + 20 + index))
+
+    def _expected_task_totals(self):
+        totals = {}
+        for log in self.db.get_all_completed_logs():
+            totals[log.task_id] = totals.get(log.task_id, 0) + log.duration_seconds
+        return totals
+
+    def test_append_is_idempotent(self):
+        snapshot = TimeLogSnapshot(self.dir / 'snapshot')
+        self._add_logs(date(2025, 1, 6), 3)
+        self.assertEqual(snapshot.refresh(self.db), 3)
+        self.assertEqual(snapshot.refresh(self.db), 0)
+
+        self._add_logs(date(2025, 1, 7), 2)
+        self.assertEqual(snapshot.refresh(self.db, batch_size=1), 2)
+        self.assertEqual(snapshot.refresh(self.db), 0)
+        self.assertEqual(snapshot.row_count, 5)
+        self.assertEqual(snapshot.task_totals(), self._expected_task_totals())
+
+        # 開き直しても同じ内容で、追記するものはない
+        reopened = TimeLogSnapshot(self.dir / 'snapshot')
+        self.assertEqual((reopened.row_count, reopened.watermark), (snapshot.row_count, snapshot.watermark))
+        self.assertEqual(reopened.refresh(self.db), 0)
+        expected = {(total.work_day_id, total.task_id): total.total_seconds for total in self.db.get_daily_task_totals()}
+        self.assertEqual(reopened.day_task_totals(), expected)
+
+    def test_running_log_holds_watermark(self):
+        snapshot = TimeLogSnapshot(self.dir / 'snapshot')
+        self._add_logs(date(2025, 1, 6), 1)
+        day = self.db.get_or_create_work_day(date(2025, 1, 6))
+        running = self.db.start_time_log(day, self.tasks[0], datetime(2025, 1, 6, 12, 0))
+        self._add_logs(date(2025, 1, 7), 1) # 計測中のログより後のIDは書き出さない
+        self.assertEqual(snapshot.refresh(self.db), 1)
+
+        self.db.end_time_log(running, datetime(2025, 1, 6, 12, 30))
+        self.assertEqual(snapshot.refresh(self.db), 2)
+        self.assertEqual(snapshot.task_totals(), self._expected_task_totals())
+
+    def test_rebuild_after_delete(self):
+        snapshot = TimeLogSnapshot(self.dir / 'snapshot')
+        self._add_logs(date(2025, 1, 6), 4)
+        snapshot.refresh(self.db)
+        self.db.delete_time_log(self.db.get_all_completed_logs()[1].id)
+        self.assertEqual(snapshot.refresh(self.db), 3) # 書き出し済みの範囲が変わったため作り直す
+        self.assertEqual(snapshot.task_totals(), self._expected_task_totals())
+
+    def test_includes_archived_years(self):
+        snapshot = TimeLogSnapshot(self.dir / 'snapshot')
+        self._add_logs(date(2020, 5, 1), 2)
+        self._add_logs(date(2025, 1, 6), 2)
+        self.assertEqual(snapshot.refresh(self.db), 4)
+        self.assertEqual(self.db.archive_year(2020), 2)
+        self.assertEqual(snapshot.refresh(self.db), 0) # アーカイブに移しても作り直さない
+        self.assertEqual(snapshot.task_totals(), self._expected_task_totals())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,34 @@
-from datetime import timedelta
+import os
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# アプリのデータ (DB・設定・セッション) を保存するフォルダ名
+APP_DIR_NAME = "WorkManagementApp"
+
+def get_app_data_dir() -> Path:
+    """
+    アプリのデータを保存するフォルダを返す。なければ作成する。
+    AppData/Roaming (環境変数 APPDATA が指す 'C:\\Users\\ユーザー名\\AppData\\Roaming') の下に置く。
+    これはアプリケーションがデータを保存するための標準的な場所で、APPDATAがない環境ではドキュメントフォルダを使う。
+    """
+    app_data_dir = Path(os.getenv('APPDATA', Path.home() / 'Documents')) / APP_DIR_NAME
+    app_data_dir.mkdir(parents=True, exist_ok=True)
+    return app_data_dir
 
 def format_timedelta(td: timedelta) -> str:
     """timedeltaオブジェクトを HH:MM:SS 形式の文字列に変換する。"""
-    total_seconds = int(td.total_seconds())
+    return format_seconds(int(td.total_seconds()))
+
+def format_seconds(total_seconds: int) -> str:
+    """秒数を HH:MM:SS 形式の文字列に変換する。"""
     hours, remainder = divmod(total_seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
-    return f"{hours:02}:{minutes:02}:{seconds:02}"
\ No newline at end of file
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+def to_epoch(dt: datetime) -> int:
+    """ローカル時刻のdatetimeをエポック秒(整数)に変換する。DB保存用。"""
+    return int(dt.timestamp())
+
+def from_epoch(epoch_seconds: int) -> datetime:
+    """エポック秒(整数)をローカル時刻のdatetimeに変換する。"""
+    return datetime.fromtimestamp(epoch_seconds)
@@ -0,0 +1,338 @@
+"""
+工数管理システムのコマンドライン版。GUIを起動せずに集計・エクスポート・取り込みを行う。
+
+    python -m workmanagement daily [--date YYYY-MM-DD]
+    python -m workmanagement report --from YYYY-MM-DD --to YYYY-MM-DD [--by task|day|week|month|year] [--tasks]
+    python -m workmanagement pivot PATH --from YYYY-MM-DD --to YYYY-MM-DD [--period day|week|month]
+    python -m workmanagement export PATH [--kind logs|days|tasks] [--format csv|jsonl] [--from ...] [--to ...]
+    python -m workmanagement import CSV [--errors PATH] [--keep-duplicates]
+    python -m workmanagement snapshot [--dir PATH]
+    python -m workmanagement overlaps [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python -m workmanagement compact [--gap SECONDS] [--include-open-days] [--from ...] [--to ...]
+    python -m workmanagement archive [YEAR] [--vacuum]
+    python -m workmanagement restore YEAR
+
+バッチ処理から呼ばれることを想定し、tkinter は読み込まない。起動を速くするため、
+サブコマンド専用のモジュールはそのサブコマンドの実行時に読み込む。
+"""
+import argparse
+import sqlite3
+import sys
+import unicodedata
+from pathlib import Path
+from datetime import date, datetime
+from typing import Optional, List, Sequence
+
+from db_manager import DatabaseManager
+from config_manager import ConfigManager
+from aggregation import build_day_summary, net_work_seconds, other_seconds
+from utils import format_seconds, from_epoch, get_app_data_dir
+
+def _parse_date(text: str) -> date:
+    """コマンドライン引数の日付 (YYYY-MM-DD または YYYY/MM/DD) を読み取る。"""
+    try:
+        return date.fromisoformat(text.strip().replace('/', '-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日付は YYYY-MM-DD の形式で指定してください: '{text}'")
+
+def _display_width(text: str) -> int:
+    """全角文字を2桁として、端末での表示幅を返す。"""
+    return sum(2 if unicodedata.east_asian_width(char) in ('F', 'W') else 1 for char in text)
+
+def _format_optional_seconds(seconds: Optional[int]) -> str:
+    """秒数を HH:MM:SS 形式に変換する。Noneは 'N/A'。"""
+    return format_seconds(seconds) if seconds is not None else "N/A"
+
+def _format_clock(epoch_seconds: Optional[int]) -> str:
+    """エポック秒を HH:MM:SS 形式の時刻に変換する。Noneは '--:--:--'。"""
+    return from_epoch(epoch_seconds).strftime('%H:%M:%S') if epoch_seconds else "--:--:--"
+
+def _print_table(header: Sequence[str], rows: List[Sequence[str]]):
+    """列幅をそろえて表を出力する。1列目は左寄せ、それ以外は右寄せ。"""
+    table = [header] + rows
+    widths = [max(_display_width(row[index]) for row in table) for index in range(len(header))]
+    for row in table:
+        cells = []
+        for index, value in enumerate(row):
+            padding = ' ' * (widths[index] - _display_width(value))
+            cells.append(value + padding if index == 0 else padding + value)
+        print("  ".join(cells).rstrip())
+
+# --- サブコマンド ---
+
+def cmd_daily(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """1日の作業サマリーを出力する。"""
+    target_date = args.date or date.today()
+    work_day = db.get_work_day_by_date(target_date)
+    if not work_day:
+        print(f"{target_date} の記録はありません。")
+        return 1
+
+    break_time_minutes = config.get('break_time_minutes', 60)
+    task_totals = db.get_daily_task_totals(work_day.id)
+    if not work_day.start_time or (not work_day.end_time and target_date != date.today()):
+        # 業務の開始・終了時刻がそろわない日は、工数ごとの作業時間だけを出力する
+        print(f"{target_date} (業務時間の記録なし)")
+        _print_table(("工数名", "作業時間"), [(row.task_name, format_seconds(row.total_seconds)) for row in task_totals])
+        return 0
+
+    in_progress = not work_day.end_time
+    business_start = from_epoch(work_day.start_time)
+    business_end = datetime.now().replace(microsecond=0) if in_progress else from_epoch(work_day.end_time)
+    summary = build_day_summary([(row.task_name, row.total_seconds) for row in task_totals],
+                                business_start, business_end, break_time_minutes)
+
+    print(f"{target_date}{' (業務中)' if in_progress else ''}")
+    print(f"業務時間: {business_start.strftime('%H:%M:%S')} ~ {business_end.strftime('%H:%M:%S')} ({summary['total_work_time']})")
+    print(f"総労働時間: {summary['net_work_time']} (休憩 {break_time_minutes}分を除く)")
+    print()
+    rows = [(detail['name'], detail['duration_str']) for detail in summary['task_details']]
+    rows.append(("その他", summary['other_time']))
+    _print_table(("工数名", "作業時間"), rows)
+    return 0
+
+def cmd_report(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """期間内の工数別・日別・週別・月別・年別の集計を出力する。"""
+    if args.by in ('week', 'month', 'year'):
+        return _report_by_period(db, config, args)
+    try:
+        return _report_by_task_or_day(db, config, args)
+    except sqlite3.Error as e:
+        print(f"集計エラー: {e}")
+        return 1
+
+def _report_by_task_or_day(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """工数別・日別の集計を出力する。読み込みに失敗した場合は sqlite3.Error を送出する。"""
+    period = f"{args.date_from or '最初'} ~ {args.date_to or '最後'}"
+    if args.by == 'day':
+        break_time_minutes = config.get('break_time_minutes', 60)
+        rows = []
+        total_seconds = 0
+        for day in db.iter_day_totals(args.date_from, args.date_to):
+            net = net_work_seconds(day.business_start_time, day.business_end_time, break_time_minutes)
+            rows.append((day.work_date, _format_clock(day.business_start_time), _format_clock(day.business_end_time),
+                         format_seconds(day.total_seconds), _format_optional_seconds(net),
+                         _format_optional_seconds(other_seconds(net, day.total_seconds))))
+            total_seconds += day.total_seconds
+        print(f"日別集計 {period} ({len(rows)}日)")
+        _print_table(("日付", "業務開始", "業務終了", "工数合計", "総労働時間", "その他"), rows)
+    else:
+        rows = []
+        total_seconds = 0
+        for total in db.iter_task_period_totals(args.date_from, args.date_to):
+            rows.append((total.task_name, str(total.day_count), str(total.log_count), format_seconds(total.total_seconds)))
+            total_seconds += total.total_seconds
+        print(f"工数別集計 {period}")
+        _print_table(("工数名", "日数", "件数", "作業時間"), rows)
+    print(f"合計: {format_seconds(total_seconds)}")
+    return 0
+
+def _report_by_period(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """週別・月別・年別の集計を出力する。集計は report_engine で複数のプロセスに分けて行う。"""
+    from report_engine import PERIODS, generate_period_report
+
+    report = generate_period_report(db, args.by, args.date_from, args.date_to,
+                                    config.get('break_time_minutes', 60), args.workers)
+    if report is None:
+        return 1
+    print(f"{PERIODS[args.by]}集計 {report.date_from or '最初'} ~ {report.date_to or '最後'}")
+    rows = [(total.period, str(total.day_count), format_seconds(total.total_seconds),
+             format_seconds(total.net_work_seconds), format_seconds(total.other_seconds)) for total in report.periods]
+    _print_table(("期間", "日数", "工数合計", "総労働時間", "その他"), rows)
+    print(f"合計: {format_seconds(sum(total.total_seconds for total in report.periods))}")
+
+    if args.tasks:
+        for total in report.periods:
+            print()
+            print(total.period)
+            _print_table(("工数名", "日数", "件数", "作業時間"),
+                         [(task.task_name, str(task.day_count), str(task.log_count), format_seconds(task.total_seconds))
+                          for task in report.tasks_for(total.period)])
+    return 0
+
+def cmd_pivot(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """工数×期間の集計表をCSVまたはHTMLに書き出す。"""
+    from pivot import build_pivot
+
+    date_to = args.date_to or date.today()
+    date_from = args.date_from or date_to.replace(day=1)
+    pivot = build_pivot(db, date_from, date_to, args.period)
+    if pivot is None or not pivot.write(args.path):
+        return 1
+    print(f"{len(pivot.rows)}工数 × {len(pivot.columns)}列の集計表を書き出しました: {args.path}")
+    return 0
+
+def cmd_export(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """ログや集計をCSV・JSONLに書き出す。"""
+    from export import export_data
+
+    count = export_data(db, args.path, args.kind, args.format, args.date_from, args.date_to,
+                        config.get('break_time_minutes', 60))
+    if count is None:
+        return 1
+    print(f"{count}行を書き出しました: {args.path}")
+    return 0
+
+def cmd_import(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """CSVファイルから過去の時間ログを取り込む。"""
+    from csv_import import import_time_logs_csv
+
+    report = import_time_logs_csv(db, args.csv_path, skip_duplicates=not args.keep_duplicates)
+    print(report.summary())
+    if report.errors:
+        if args.errors:
+            report.write_errors(args.errors)
+            print(f"エラーの詳細を書き出しました: {args.errors}")
+        else:
+            for line_number, message in report.errors[:10]:
+                print(f"  {line_number}行目: {message}")
+    return 0 if report.error_count == 0 else 1
+
+def cmd_snapshot(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """分析用スナップショットを更新する。"""
+    from snapshot import TimeLogSnapshot
+
+    snapshot = TimeLogSnapshot(args.dir or get_app_data_dir() / "snapshot")
+    appended = snapshot.refresh(db)
+    if appended is None:
+        return 1
+    print(f"{appended}件を追記しました (合計 {snapshot.row_count}件): {snapshot.directory}")
+    return 0
+
+def cmd_overlaps(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """時間帯が重なっているログの組を出力する。重なりがあれば終了コード1を返す。"""
+    overlaps = db.find_all_overlaps(args.date_from, args.date_to)
+    if not overlaps:
+        print("時間帯が重なっているログはありません。")
+        return 0
+
+    rows = []
+    for first, second in overlaps:
+        overlap_seconds = min(first.end_time, second.end_time) - max(first.start_time, second.start_time)
+        rows.append([first.work_date,
+                     f"{first.task_name} {_format_clock(first.start_time)}-{_format_clock(first.end_time)}",
+                     f"{second.task_name} {_format_clock(second.start_time)}-{_format_clock(second.end_time)}",
+                     format_seconds(overlap_seconds)])
+    _print_table(["日付", "ログ1", "ログ2", "重なり"], rows)
+    print(f"{len(overlaps)}組のログの時間帯が重なっています。")
+    return 1
+
+def cmd_compact(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """同じ業務日・同じ工数の続いているログを1つにまとめる。"""
+    reclaimed = db.compact_time_logs(args.gap, args.date_from, args.date_to, closed_days_only=not args.include_open_days)
+    if reclaimed is None:
+        return 1
+    print(f"{reclaimed}件のログを統合しました。")
+    return 0
+
+def cmd_archive(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """過去の年をアーカイブファイルに移す。年を省略した場合はアーカイブの一覧を出力する。"""
+    if args.year is None:
+        statuses = db.get_archive_status()
+        if not statuses:
+            print("アーカイブはありません。")
+            return 0
+        _print_table(["年", "状態", "業務日", "ログ", "ファイル"],
+                     [[str(status.year), "アーカイブ済み" if status.state == 'archived' else "中断 (再実行してください)",
+                       str(status.work_day_count), str(status.time_log_count), status.file_name] for status in statuses])
+        return 0
+
+    moved = db.archive_year(args.year)
+    if moved is None:
+        return 1
+    print(f"{args.year}年の{moved}件のログをアーカイブしました。")
+    if args.vacuum and not db.vacuum():
+        return 1
+    return 0
+
+def cmd_restore(db: DatabaseManager, config: ConfigManager, args: argparse.Namespace) -> int:
+    """アーカイブした年をデータベースに戻す。"""
+    restored = db.restore_year(args.year)
+    if restored is None:
+        return 1
+    print(f"{args.year}年の{restored}件のログを戻しました。")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを作る。"""
+    parser = argparse.ArgumentParser(prog="workmanagement", description="工数管理システムのコマンドライン版")
+    parser.add_argument('--db', type=Path, help="データベースファイル (既定: アプリのデータフォルダの work_management.db)")
+    parser.add_argument('--config', type=Path, help="設定ファイル (既定: アプリのデータフォルダの config.json)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    daily = subparsers.add_parser('daily', help="1日の作業サマリーを出力する")
+    daily.add_argument('--date', type=_parse_date, help="対象の日付 (既定: 今日)")
+    daily.set_defaults(func=cmd_daily)
+
+    def add_period(subparser: argparse.ArgumentParser):
+        subparser.add_argument('--from', dest='date_from', type=_parse_date, help="この日付以降を対象とする")
+        subparser.add_argument('--to', dest='date_to', type=_parse_date, help="この日付以前を対象とする")
+
+    report = subparsers.add_parser('report', help="期間内の集計を出力する")
+    add_period(report)
+    report.add_argument('--by', choices=('task', 'day', 'week', 'month', 'year'), default='task',
+                        help="工数別 (task)、日別 (day)、週別 (week)、月別 (month)、年別 (year)")
+    report.add_argument('--tasks', action='store_true', help="週別・月別・年別の場合に、期間ごとの工数の内訳も出力する")
+    report.add_argument('--workers', type=int, help="週別・月別・年別の集計に使うプロセス数 (既定: CPUの数)")
+    report.set_defaults(func=cmd_report)
+
+    pivot = subparsers.add_parser('pivot', help="工数×期間の集計表をCSV・HTMLに書き出す")
+    pivot.add_argument('path', type=Path, help="出力先のファイル (.csv または .html)")
+    pivot.add_argument('--period', choices=('day', 'week', 'month'), default='day', help="列の単位")
+    pivot.add_argument('--from', dest='date_from', type=_parse_date, help="この日付以降を対象とする (既定: --to の月初)")
+    pivot.add_argument('--to', dest='date_to', type=_parse_date, help="この日付以前を対象とする (既定: 今日)")
+    pivot.set_defaults(func=cmd_pivot)
+
+    export = subparsers.add_parser('export', help="ログや集計をCSV・JSONLに書き出す")
+    export.add_argument('path', type=Path, help="出力先のファイル")
+    export.add_argument('--kind', choices=('logs', 'days', 'tasks'), default='logs', help="明細 (logs)、日別 (days)、工数別 (tasks)")
+    export.add_argument('--format', choices=('csv', 'jsonl'), help="出力形式 (既定: 出力先の拡張子)")
+    add_period(export)
+    export.set_defaults(func=cmd_export)
+
+    csv_import = subparsers.add_parser('import', help="CSVファイルから過去の時間ログを取り込む")
+    csv_import.add_argument('csv_path', type=Path, help="取り込むCSVファイル")
+    csv_import.add_argument('--errors', type=Path, help="不正な行の一覧を書き出すCSVファイル")
+    csv_import.add_argument('--keep-duplicates', action='store_true', help="既にあるログと同じ行も取り込む")
+    csv_import.set_defaults(func=cmd_import)
+
+    snapshot = subparsers.add_parser('snapshot', help="分析用スナップショットを更新する")
+    snapshot.add_argument('--dir', type=Path, help="スナップショットのフォルダ (既定: アプリのデータフォルダの snapshot)")
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    overlaps = subparsers.add_parser('overlaps', help="時間帯が重なっているログの組を出力する")
+    add_period(overlaps)
+    overlaps.set_defaults(func=cmd_overlaps)
+
+    compact = subparsers.add_parser('compact', help="同じ業務日・同じ工数の続いているログを1つにまとめる (アーカイブ済みの年は対象外)")
+    compact.add_argument('--gap', type=int, default=0, help="この秒数以内の隙間はつながっているとみなす (隙間も作業時間に含まれる)")
+    compact.add_argument('--include-open-days', action='store_true', help="業務終了時刻が記録されていない業務日も対象にする")
+    add_period(compact)
+    compact.set_defaults(func=cmd_compact)
+
+    archive = subparsers.add_parser('archive', help="過去の年を年ごとのアーカイブファイルに移す")
+    archive.add_argument('year', type=int, nargs='?', help="アーカイブする年 (省略するとアーカイブの一覧を出力する)")
+    archive.add_argument('--vacuum', action='store_true', help="移した後にデータベースファイルを小さくする")
+    archive.set_defaults(func=cmd_archive)
+
+    restore = subparsers.add_parser('restore', help="アーカイブした年をデータベースに戻す")
+    restore.add_argument('year', type=int, help="戻す年")
+    restore.set_defaults(func=cmd_restore)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    db_path = args.db or get_app_data_dir() / "work_management.db"
+    if args.command != 'import' and not db_path.exists():
+        print(f"データベースが見つかりません: {db_path}")
+        return 1
+
+    config = ConfigManager(args.config or get_app_data_dir() / "config.json")
+    db = DatabaseManager(db_path)
+    try:
+        return args.func(db, config, args)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())